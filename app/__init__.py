@@ -17,4 +17,22 @@ def create_app(config_class="config.DevelopmentConfig"):
     from app.samples import bp as samples_bp
     app.register_blueprint(samples_bp, url_prefix='/samples')
 
+    from app.exports import bp as exports_bp
+    app.register_blueprint(exports_bp, url_prefix='/export')
+
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+
+    # persistent catalog (no-op for the default in-memory backend)
+    from app import storage
+    storage.init_app(app)
+
+    # background job queue (geochemistry reductions)
+    from app import jobs
+    jobs.init_app(app)
+
+    # rendered template fragments ({% cache %} blocks)
+    from app import fragments
+    fragments.init_app(app)
+
     return app
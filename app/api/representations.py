@@ -0,0 +1,98 @@
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from threading import Lock
+
+
+def jsonable(value):
+    """Copy ``value`` into plain JSON types (dates as ISO strings, tuples as lists)."""
+    if isinstance(value, dict):
+        return {str(key): jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def parse_fields(value):
+    """``"a,b.c"`` -> ``(("a",), ("b", "c"))``; None when every field is wanted."""
+    paths = tuple(
+        tuple(part for part in field.strip().split(".") if part)
+        for field in (value or "").split(",")
+        if field.strip()
+    )
+    return tuple(sorted(set(path for path in paths if path))) or None
+
+
+def select_fields(resource, fields):
+    """Keep only the dotted ``fields`` paths of a resource; missing paths are skipped."""
+    if fields is None:
+        return resource
+    selected = {}
+    for path in fields:
+        source, target = resource, selected
+        for depth, key in enumerate(path):
+            if not isinstance(source, dict) or key not in source:
+                break
+            if depth == len(path) - 1:
+                target[key] = source[key]
+            else:
+                source = source[key]
+                target = target.setdefault(key, {})
+    return selected
+
+
+def etag_for(payload):
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+class RepresentationCache:
+    """LRU of API representations keyed by ``(kind, key, version, fields)``.
+
+    Each entry holds the selected resource and a strong ETag (a digest of
+    its canonical JSON), so a record is serialized and hashed once per
+    version and field selection. Versions come from the live catalogs;
+    the digest keeps ETags identical across worker processes whose local
+    version counters differ.
+    """
+
+    def __init__(self, sample_index, project_registry, maxsize=4096):
+        self.maxsize = maxsize
+        self.sample_versions = {}
+        self.project_versions = {}
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        sample_index.subscribe(self._bump_sample)
+        project_registry.subscribe(self._bump_project)
+
+    def _bump_sample(self, sample_code):
+        with self._lock:
+            self.sample_versions[sample_code] = self.sample_versions.get(sample_code, 0) + 1
+
+    def _bump_project(self, project_id):
+        with self._lock:
+            self.project_versions[project_id] = self.project_versions.get(project_id, 0) + 1
+
+    def version(self, kind, key):
+        """Projects have their own counter; every other kind follows its sample."""
+        versions = self.project_versions if kind == "project" else self.sample_versions
+        return versions.get(key, 0)
+
+    def get(self, kind, key, fields, build):
+        """Return ``(etag, resource)``; ``build()`` runs only on a miss."""
+        cache_key = (kind, key, self.version(kind, key), fields)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                return entry
+        resource = select_fields(jsonable(build()), fields)
+        entry = (etag_for(resource), resource)
+        with self._lock:
+            self._entries[cache_key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
@@ -0,0 +1,152 @@
+import hashlib
+
+from flask import Response, abort, jsonify, request, url_for
+
+from app.api import bp
+from app.api.representations import RepresentationCache, parse_fields
+from app.projects.routes import project_registry, user_has_project_access
+from app.samples.routes import get_formatted_sample, grain_size_index, sample_index
+
+
+API_PAGE_SIZES = (10, 20, 50, 100, 500)
+ANALYSIS_SECTIONS = ("physical_analysis", "physical_microanalysis", "geochemical_analysis")
+
+representations = RepresentationCache(sample_index, project_registry)
+
+
+def conditional_json(etag, payload):
+    """Answer with 304 when the client already holds ``etag``, else the JSON payload."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def combined_etag(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def page_args():
+    per_page = request.args.get("per_page", 50, type=int)
+    if per_page not in API_PAGE_SIZES:
+        per_page = 50
+    return max(request.args.get("page", 1, type=int), 1), per_page
+
+
+def accessible_project(project_id):
+    project = project_registry.get(project_id)
+    if project is None or not user_has_project_access(project):
+        abort(404)
+    return project
+
+
+def sample_visible(sample_code, project_ids):
+    """A sample is visible when it is unlinked or in at least one of ``project_ids``."""
+    record = sample_index.record(sample_code)
+    return record is not None and (not record.project_ids or not project_ids.isdisjoint(record.project_ids))
+
+
+def accessible_project_ids():
+    return frozenset(project.id for project in project_registry.all() if user_has_project_access(project))
+
+
+def accessible_sample(sample_code):
+    sample = sample_index.get(sample_code)
+    if sample is None or not sample_visible(sample_code, accessible_project_ids()):
+        abort(404)
+    return sample
+
+
+def project_resource(project):
+    data = project.to_dict()
+    data["samples_url"] = url_for("api.api_samples", project=project.id)
+    return data
+
+
+def sample_resource(sample):
+    data = dict(sample)
+    data["grain_size"] = grain_size_index.for_sample(sample["sample_code"])
+    return data
+
+
+def analyses_resource(sample):
+    formatted = get_formatted_sample(sample)
+    data = {section: formatted.get(section) for section in ANALYSIS_SECTIONS}
+    data["sample_code"] = sample["sample_code"]
+    data["grain_size"] = formatted.get("grain_size")
+    return data
+
+
+def list_response(kind, keys, build, total, page, per_page, fields):
+    """Page of resources whose ETag is derived from the member ETags."""
+    entries = [representations.get(kind, key, fields, lambda key=key: build(key)) for key in keys]
+    etag = combined_etag(kind, page, per_page, total, fields, *(tag for tag, _ in entries))
+    return conditional_json(
+        etag,
+        {
+            "items": [resource for _, resource in entries],
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+        },
+    )
+
+
+@bp.route('/projects')
+def api_projects():
+    fields = parse_fields(request.args.get("fields"))
+    page, per_page = page_args()
+    visible = [project for project in project_registry.all() if user_has_project_access(project)]
+    start = (page - 1) * per_page
+    by_id = {project.id: project for project in visible[start:start + per_page]}
+    return list_response(
+        "project", list(by_id), lambda project_id: project_resource(by_id[project_id]),
+        len(visible), page, per_page, fields,
+    )
+
+
+@bp.route('/projects/<int:project_id>')
+def api_project(project_id):
+    project = accessible_project(project_id)
+    fields = parse_fields(request.args.get("fields"))
+    return conditional_json(*representations.get("project", project_id, fields, lambda: project_resource(project)))
+
+
+@bp.route('/samples')
+def api_samples():
+    fields = parse_fields(request.args.get("fields"))
+    page, per_page = page_args()
+    project_id = request.args.get("project", type=int)
+    if project_id is not None:
+        accessible_project(project_id)
+    codes = sample_index.filter_codes(
+        project_id=project_id,
+        status=request.args.get("status") or None,
+        storage_location=request.args.get("storage") or None,
+        flag=request.args.get("flag") or None,
+    )
+    project_ids = accessible_project_ids()
+    codes = [code for code in codes if sample_visible(code, project_ids)]
+    start = (page - 1) * per_page
+    return list_response(
+        "sample", codes[start:start + per_page], lambda code: sample_resource(sample_index.get(code)),
+        len(codes), page, per_page, fields,
+    )
+
+
+@bp.route('/samples/<sample_code>')
+def api_sample(sample_code):
+    sample = accessible_sample(sample_code)
+    fields = parse_fields(request.args.get("fields"))
+    return conditional_json(*representations.get("sample", sample_code, fields, lambda: sample_resource(sample)))
+
+
+@bp.route('/samples/<sample_code>/analyses')
+def api_sample_analyses(sample_code):
+    sample = accessible_sample(sample_code)
+    fields = parse_fields(request.args.get("fields"))
+    return conditional_json(*representations.get("analyses", sample_code, fields, lambda: analyses_resource(sample)))
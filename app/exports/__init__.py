@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+bp = Blueprint('exports', __name__)
+
+from app.exports import routes
@@ -0,0 +1,191 @@
+import io
+import json
+import struct
+import zlib
+from datetime import date
+
+import numpy as np
+
+
+MAGIC = b"GLCOL1\n"
+ROW_GROUP_SIZE = 65536
+COMPRESSION_LEVEL = 6
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# column type -> numpy dtype of the stored values ("str" stores dictionary indices)
+COLUMN_TYPES = {
+    "f8": np.float64,
+    "i8": np.int64,
+    "bool": np.uint8,
+    "date": np.int32,
+    "str": None,
+}
+
+
+def _shuffle(values):
+    """Byte-transpose fixed-width values so zlib sees runs of similar bytes."""
+    width = values.dtype.itemsize
+    return values.view(np.uint8).reshape(-1, width).T.tobytes()
+
+
+def _unshuffle(data, dtype, count):
+    width = np.dtype(dtype).itemsize
+    return np.frombuffer(data, np.uint8).reshape(width, count).T.copy().view(dtype).reshape(count)
+
+
+def _index_dtype(size):
+    return np.uint8 if size < 2 ** 8 else np.uint16 if size < 2 ** 16 else np.uint32
+
+
+def _encode_column(kind, values):
+    """Encode one column chunk; returns ``(payload, chunk metadata)`` before compression."""
+    meta = {}
+    if kind == "str":
+        # dictionary encoding; index 0 is null
+        dictionary, indices = {}, []
+        for value in values:
+            if value is None:
+                indices.append(0)
+            else:
+                indices.append(dictionary.setdefault(str(value), len(dictionary) + 1))
+        words = [word.encode("utf-8") for word in dictionary]
+        lengths = np.array([len(word) for word in words], dtype=np.uint32)
+        dtype = _index_dtype(len(dictionary) + 1)
+        meta.update(dictionary_size=len(words), index_dtype=np.dtype(dtype).str)
+        payload = lengths.tobytes() + b"".join(words) + np.array(indices, dtype=dtype).tobytes()
+        return payload, meta
+    nulls = np.array([value is None for value in values], dtype=bool)
+    if kind == "f8":
+        array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        nulls[:] = False  # NaN marks missing floats
+    elif kind == "date":
+        array = np.array(
+            [0 if value is None else value.toordinal() - EPOCH_ORDINAL for value in values], dtype=np.int32
+        )
+    else:
+        array = np.array([0 if value is None else value for value in values], dtype=COLUMN_TYPES[kind])
+    payload = b""
+    if nulls.any():
+        meta["nulls"] = True
+        payload = np.packbits(nulls).tobytes()
+    return payload + _shuffle(array), meta
+
+
+def _decode_column(kind, data, count, meta):
+    if kind == "str":
+        size = meta["dictionary_size"]
+        lengths = np.frombuffer(data, np.uint32, size)
+        offset = 4 * size
+        words = [None]
+        for length in lengths.tolist():
+            words.append(data[offset:offset + length].decode("utf-8"))
+            offset += length
+        indices = np.frombuffer(data[offset:], np.dtype(meta["index_dtype"]), count)
+        return np.array(words, dtype=object)[indices]
+    nulls = None
+    if meta.get("nulls"):
+        mask_bytes = (count + 7) // 8
+        nulls = np.unpackbits(np.frombuffer(data[:mask_bytes], np.uint8), count=count).astype(bool)
+        data = data[mask_bytes:]
+    values = _unshuffle(data, COLUMN_TYPES[kind], count)
+    if kind == "date":
+        values = values.astype("datetime64[D]")
+    elif kind == "bool":
+        values = values.astype(bool)
+    return np.ma.MaskedArray(values, mask=nulls) if nulls is not None else values
+
+
+def columnar_stream(schema, rows, row_group_size=ROW_GROUP_SIZE, metadata=None):
+    """Yield a compressed column-oriented file for ``rows`` written in row groups.
+
+    ``schema`` is a sequence of ``(name, type)`` with types from
+    ``COLUMN_TYPES``. Each row group buffers at most ``row_group_size`` rows
+    and is emitted as one zlib-compressed chunk per column: fixed-width
+    values are byte-shuffled (missing ints, dates and booleans get a null
+    bitmap, missing floats are NaN) and strings are dictionary-encoded per
+    row group. A JSON footer with the schema and chunk offsets follows the
+    last group, then its length and the magic bytes, so readers seek from
+    the end.
+    """
+    names = [name for name, _ in schema]
+    for name, kind in schema:
+        if kind not in COLUMN_TYPES:
+            raise ValueError(f"Unknown column type {kind!r} for {name}")
+    yield MAGIC
+    offset = len(MAGIC)
+    groups = []
+    buffer = {name: [] for name in names}
+    count = 0
+
+    def flush():
+        nonlocal offset
+        chunks, metas = [], []
+        for name, kind in schema:
+            payload, meta = _encode_column(kind, buffer[name])
+            chunk = zlib.compress(payload, COMPRESSION_LEVEL)
+            meta.update(offset=offset, length=len(chunk), raw_length=len(payload))
+            offset += len(chunk)
+            chunks.append(chunk)
+            metas.append(meta)
+            buffer[name] = []
+        groups.append({"rows": count, "columns": metas})
+        return b"".join(chunks)
+
+    for row in rows:
+        for name in names:
+            buffer[name].append(row.get(name))
+        count += 1
+        if count >= row_group_size:
+            yield flush()
+            count = 0
+    if count or not groups:
+        yield flush()
+    footer = json.dumps(
+        {
+            "version": 1,
+            "schema": [{"name": name, "type": kind} for name, kind in schema],
+            "row_groups": groups,
+            "metadata": metadata or {},
+        }
+    ).encode("utf-8")
+    yield footer + struct.pack("<Q", len(footer)) + MAGIC
+
+
+def read_footer(data):
+    if data[:len(MAGIC)] != MAGIC or data[-len(MAGIC):] != MAGIC:
+        raise ValueError("Not a columnar export file")
+    end = len(data) - len(MAGIC) - 8
+    (length,) = struct.unpack("<Q", data[end:end + 8])
+    return json.loads(data[end - length:end])
+
+
+def read_columnar(source, columns=None):
+    """Load a columnar export into ``{name: numpy array}``.
+
+    ``source`` is bytes, a path or a binary file object; ``columns``
+    limits decoding to the named columns. Strings come back as object
+    arrays, dates as ``datetime64[D]`` and nullable integer, date and
+    boolean columns as masked arrays.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+    elif isinstance(source, io.IOBase):
+        data = source.read()
+    else:
+        with open(source, "rb") as handle:
+            data = handle.read()
+    footer = read_footer(data)
+    schema = [(column["name"], column["type"]) for column in footer["schema"]]
+    wanted = set(columns) if columns is not None else None
+    parts = {name: [] for name, _ in schema if wanted is None or name in wanted}
+    for group in footer["row_groups"]:
+        for (name, kind), meta in zip(schema, group["columns"]):
+            if name not in parts:
+                continue
+            chunk = zlib.decompress(data[meta["offset"]:meta["offset"] + meta["length"]])
+            parts[name].append(_decode_column(kind, chunk, group["rows"], meta))
+    result = {}
+    for name, arrays in parts.items():
+        masked = any(isinstance(array, np.ma.MaskedArray) for array in arrays)
+        result[name] = (np.ma.concatenate if masked else np.concatenate)(arrays) if arrays else np.empty(0)
+    return result
@@ -0,0 +1,143 @@
+from app.projects.records import parse_date
+from app.samples.routes import grain_size_index, sample_index
+
+
+SAMPLE_SCHEMA = (
+    ("sample_code", "str"),
+    ("name", "str"),
+    ("igsn", "str"),
+    ("status", "str"),
+    ("primary_project_id", "i8"),
+    ("collected_on", "date"),
+    ("site_name", "str"),
+    ("station", "str"),
+    ("stratum", "str"),
+    ("depth_cm", "f8"),
+    ("lat", "f8"),
+    ("lon", "f8"),
+    ("storage_location", "str"),
+    ("workflow_stage", "str"),
+    ("is_flagged_for_review", "bool"),
+)
+GEOCHEMISTRY_SCHEMA = (
+    ("sample_code", "str"),
+    ("source_file", "str"),
+    ("oxide", "str"),
+    ("mean_wt_percent", "f8"),
+    ("sd", "f8"),
+    ("sigma", "f8"),
+    ("spots", "i8"),
+    ("rejected_spots", "i8"),
+    ("analytical_total", "f8"),
+    ("fe3_ratio", "f8"),
+    ("reduced_on", "date"),
+)
+PARTICLE_SIZE_SCHEMA = (
+    ("sample_code", "str"),
+    ("fraction", "str"),
+    ("coarse_um", "f8"),
+    ("fine_um", "f8"),
+    ("wet_mass_g", "f8"),
+    ("dry_mass_g", "f8"),
+    ("weight_percent", "f8"),
+    ("expected_percent", "f8"),
+    ("deviation_percent", "f8"),
+    ("mass_recovery_percent", "f8"),
+    ("mean_phi", "f8"),
+    ("sorting_phi", "f8"),
+    ("skewness", "f8"),
+    ("kurtosis", "f8"),
+)
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def sample_rows(codes):
+    for code in codes:
+        record = sample_index.record(code)
+        if record is None:
+            continue
+        yield {
+            "sample_code": record.sample_code,
+            "name": record.name,
+            "igsn": record.igsn or None,
+            "status": record.status,
+            "primary_project_id": record.primary_project_id,
+            "collected_on": record.collected_on,
+            "site_name": record.site_name or None,
+            "station": record.station or None,
+            "stratum": record.stratum or None,
+            "depth_cm": record.depth_cm,
+            "lat": record.lat,
+            "lon": record.lon,
+            "storage_location": record.storage_location or None,
+            "workflow_stage": record.workflow_stage or None,
+            "is_flagged_for_review": record.is_flagged_for_review,
+        }
+
+
+def geochemistry_rows(codes):
+    """One row per sample, reduced upload and oxide (long format)."""
+    for code in codes:
+        sample = sample_index.get(code)
+        if sample is None:
+            continue
+        reductions = (sample.get("geochemistry") or {}).get("reductions") or {}
+        for source_file, summary in reductions.items():
+            shared = {
+                "sample_code": code,
+                "source_file": source_file,
+                "spots": summary.get("spots"),
+                "rejected_spots": summary.get("rejected_spots"),
+                "analytical_total": _number(summary.get("analytical_total")),
+                "fe3_ratio": _number(summary.get("fe3_ratio")),
+                "reduced_on": parse_date(summary.get("reduced_on")),
+            }
+            for oxide, stats in (summary.get("oxides") or {}).items():
+                yield dict(
+                    shared,
+                    oxide=oxide,
+                    mean_wt_percent=_number(stats.get("mean")),
+                    sd=_number(stats.get("sd")),
+                    sigma=_number(stats.get("sigma")),
+                )
+
+
+def particle_size_rows(codes):
+    """One row per sample and sieve fraction, with the sample's graphic statistics."""
+    for code in codes:
+        sample = sample_index.get(code)
+        stats = grain_size_index.for_sample(code) if sample is not None else None
+        if not stats:
+            continue
+        folk_ward = stats.get("folk_ward") or {}
+        entries = {entry.get("fraction"): entry for entry in (sample.get("processing") or {}).get("mass_entries") or []}
+        for fraction in stats["fractions"]:
+            entry = entries.get(fraction["fraction"]) or {}
+            coarse, fine = fraction["bounds_um"] or (None, None)
+            yield {
+                "sample_code": code,
+                "fraction": fraction["fraction"],
+                "coarse_um": coarse,
+                "fine_um": fine,
+                "wet_mass_g": _number(entry.get("wet_mass_g")),
+                "dry_mass_g": _number(entry.get("dry_mass_g")),
+                "weight_percent": fraction["percent"],
+                "expected_percent": fraction["expected_percent"],
+                "deviation_percent": fraction["deviation_percent"],
+                "mass_recovery_percent": stats["mass_recovery_percent"],
+                "mean_phi": folk_ward.get("mean_phi"),
+                "sorting_phi": folk_ward.get("sorting_phi"),
+                "skewness": folk_ward.get("skewness"),
+                "kurtosis": folk_ward.get("kurtosis"),
+            }
+
+
+# dataset -> (typed schema, rows(codes))
+DATASETS = {
+    "samples": (SAMPLE_SCHEMA, sample_rows),
+    "geochemistry": (GEOCHEMISTRY_SCHEMA, geochemistry_rows),
+    "particle-size": (PARTICLE_SIZE_SCHEMA, particle_size_rows),
+}
@@ -0,0 +1,180 @@
+from flask import Response, abort, request, session
+
+from app.exports import bp
+from app.exports.columnar import columnar_stream
+from app.exports.datasets import DATASETS
+from app.exports.writers import FORMATS
+from app.projects.routes import project_registry, user_has_project_access
+from app.samples.routes import admin_aggregates, sample_index
+
+
+PROJECT_SAMPLE_COLUMNS = (
+    "sample_code",
+    "name",
+    "igsn",
+    "status",
+    "collected_on",
+    "collected_by",
+    "project_role",
+    "site_name",
+    "station",
+    "stratum",
+    "depth_cm",
+    "lat",
+    "lon",
+    "datum",
+    "storage_location",
+    "workflow_stage",
+    "metadata_flags",
+)
+ADMIN_COLUMNS = {
+    "samples": (
+        "sample_id", "lab_catalog", "short_description", "project_title", "project_owner",
+        "collection_date", "status", "has_physical", "has_micro", "has_geochem",
+    ),
+    "geochemical": (
+        "sample_id", "lab_catalog", "project_title", "analysis_type", "run_date",
+        "analyst", "elements_analyzed", "status", "qc_status",
+    ),
+    "microanalysis": (
+        "sample_id", "lab_catalog", "project_title", "analysis_type", "run_date",
+        "analyst", "minerals_analyzed", "points_analyzed", "status", "qc_status",
+    ),
+    "physical": (
+        "sample_id", "lab_catalog", "project_title", "analysis_type", "run_date",
+        "analyst", "parameters", "total_mass", "status",
+    ),
+}
+COLUMNAR_FORMAT = "glc"
+# Row-level filters applied to admin rows after the index narrowed the samples.
+ADMIN_ROW_FILTERS = ("analysis_type", "qc_status")
+
+
+def require_export_permission():
+    if not session.get('is_authenticated') or not session.get('user', {}).get('can_export_data'):
+        abort(403)
+
+
+def accessible_project_ids():
+    """Ids of the projects the current user may read; resolved before streaming starts."""
+    return frozenset(project.id for project in project_registry.all() if user_has_project_access(project))
+
+
+def accessible_codes(codes, project_ids):
+    """Codes of samples that are unlinked or belong to at least one of ``project_ids``."""
+    for code in codes:
+        record = sample_index.record(code)
+        if record is None:
+            continue
+        if not record.project_ids or not project_ids.isdisjoint(record.project_ids):
+            yield code
+
+
+def index_filters():
+    """Sample-level filters from the query string, answered by the sample index."""
+    return {
+        "status": request.args.get("status") or None,
+        "storage_location": request.args.get("storage") or None,
+        "flag": request.args.get("flag") or None,
+    }
+
+
+def stream_export(name, fmt, columns, rows, schema=None):
+    """Stream ``rows`` as a download; the columnar format needs a typed ``schema``."""
+    if fmt == COLUMNAR_FORMAT and schema is not None:
+        body, mimetype = columnar_stream(schema, rows, metadata={"dataset": name}), "application/octet-stream"
+    elif fmt in FORMATS:
+        writer, mimetype = FORMATS[fmt]
+        body = writer(columns, rows)
+    else:
+        abort(404)
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+def project_sample_rows(project_id, codes):
+    for code in codes:
+        record = sample_index.record(code)
+        if record is None:
+            continue
+        yield {
+            "sample_code": record.sample_code,
+            "name": record.name,
+            "igsn": record.igsn,
+            "status": record.status,
+            "collected_on": record.collected_on,
+            "collected_by": record.collected_by,
+            "project_role": dict(record.project_links).get(project_id),
+            "site_name": record.site_name,
+            "station": record.station,
+            "stratum": record.stratum,
+            "depth_cm": record.depth_cm,
+            "lat": record.lat,
+            "lon": record.lon,
+            "datum": record.datum,
+            "storage_location": record.storage_location,
+            "workflow_stage": record.workflow_stage,
+            "metadata_flags": record.metadata_flags,
+        }
+
+
+@bp.route('/project/<int:project_id>/samples.<fmt>')
+def export_project_samples(project_id, fmt):
+    require_export_permission()
+    project = project_registry.get(project_id)
+    if not project:
+        abort(404)
+    if not user_has_project_access(project):
+        abort(403)
+    codes = sample_index.iter_codes(project_id=project_id, **index_filters())
+    return stream_export(f"{project.slug or project_id}-samples", fmt, PROJECT_SAMPLE_COLUMNS,
+                         project_sample_rows(project_id, codes))
+
+
+def filtered_admin_rows(table, codes, row_filters):
+    for row in table.iter_rows(codes):
+        if all(row.get(field) == value for field, value in row_filters.items()):
+            yield row
+
+
+@bp.route('/admin/<view>.<fmt>')
+def export_admin_view(view, fmt):
+    require_export_permission()
+    if view not in ADMIN_COLUMNS:
+        abort(404)
+    filters = index_filters()
+    project_id = request.args.get("project", type=int)
+    table = admin_aggregates[view]
+    if project_id is not None or any(filters.values()):
+        codes = sample_index.iter_codes(project_id=project_id, **filters)
+    else:
+        codes = list(table.by_code)
+    row_filters = {field: request.args[field] for field in ADMIN_ROW_FILTERS if request.args.get(field)}
+    if view != "samples" and request.args.get("analysis_status"):
+        row_filters["status"] = request.args["analysis_status"]
+    rows = filtered_admin_rows(table, accessible_codes(codes, accessible_project_ids()), row_filters)
+    return stream_export(f"all-{view}", fmt, ADMIN_COLUMNS[view], rows)
+
+
+@bp.route('/datasets/<dataset>.<fmt>')
+def export_dataset(dataset, fmt):
+    """Analytical datasets with typed columns (CSV, NDJSON or the columnar binary format)."""
+    require_export_permission()
+    if dataset not in DATASETS:
+        abort(404)
+    schema, build_rows = DATASETS[dataset]
+    project_id = request.args.get("project", type=int)
+    if project_id is not None:
+        project = project_registry.get(project_id)
+        if not project:
+            abort(404)
+        if not user_has_project_access(project):
+            abort(403)
+    codes = accessible_codes(
+        sample_index.iter_codes(project_id=project_id, **index_filters()), accessible_project_ids()
+    )
+    name = f"{dataset}-project-{project_id}" if project_id is not None else dataset
+    return stream_export(name, fmt, [column for column, _ in schema], build_rows(codes), schema=schema)
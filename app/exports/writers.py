@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+
+FLUSH_ROWS = 500
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return "; ".join(str(item) for item in value)
+    return value
+
+
+def csv_stream(columns, rows, flush_rows=FLUSH_ROWS):
+    """Yield UTF-8 CSV chunks for ``rows`` (mappings), ``flush_rows`` rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([_plain(row.get(column)) for column in columns])
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_stream(columns, rows, flush_rows=FLUSH_ROWS):
+    """Yield newline-delimited JSON chunks, one object per row."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: row.get(column) for column in columns}, default=_json_value))
+        if len(lines) >= flush_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# format -> (writer, mimetype)
+FORMATS = {
+    "csv": (csv_stream, "text/csv"),
+    "ndjson": (ndjson_stream, "application/x-ndjson"),
+}
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app, has_request_context, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Size-bounded LRU of rendered template fragments.
+
+    Entries are keyed by whatever identifies the fragment's inputs (record
+    versions, view flags) plus the current user's permission set, and the
+    cache evicts least recently used fragments once their total UTF-8 size
+    exceeds ``max_bytes``. A ``max_bytes`` of 0 disables caching.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        nbytes = len(value.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def get_or_render(self, key, render):
+        """Return the cached fragment for ``key``, rendering and storing it on a miss."""
+        if not self.max_bytes:
+            return Markup(render())
+        value = self.get(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = Markup(render())
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def permission_key():
+    """The current user's permission set, part of every fragment key."""
+    if not has_request_context():
+        return ()
+    user = session.get('user') or {}
+    return (
+        bool(session.get('is_authenticated')),
+        user.get('role'),
+        tuple(sorted(name for name, value in user.items() if name.startswith('can_') and value)),
+    )
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache "name", key, ... %}...{% endcache %}`` backed by the app's ``FragmentCache``."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        return get_fragment_cache().get_or_render((_freeze(parts), permission_key()), caller)
+
+
+def get_fragment_cache():
+    return current_app.extensions["fragment_cache"]
+
+
+def init_app(app):
+    app.extensions["fragment_cache"] = FragmentCache(app.config.get("FRAGMENT_CACHE_BYTES", 32 * 1024 * 1024))
+    app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,305 @@
+from threading import RLock
+
+import numpy as np
+
+from app.geochem.engine import ATOMIC_WEIGHTS
+from app.geochem.kdtree import KDTree
+
+
+# Glass major oxides compared between tephra samples (FeO as total iron, FeO*).
+VECTOR_OXIDES = ("SiO2", "TiO2", "Al2O3", "FeO", "MnO", "MgO", "CaO", "Na2O", "K2O")
+MIN_OXIDES = 6
+FEO_PER_FE2O3 = 2 * (ATOMIC_WEIGHTS["Fe"] + ATOMIC_WEIGHTS["O"]) / (2 * ATOMIC_WEIGHTS["Fe"] + 3 * ATOMIC_WEIGHTS["O"])
+
+# Oxides below this concentration are left out of the similarity coefficient
+# (Borchardt et al. 1972), where small absolute errors dominate the ratio.
+SC_MIN_WT_PERCENT = 1.0
+# 95 % chi-square critical values by degrees of freedom, for the D^2 test
+# of Perkins et al. (1995).
+CHI2_95 = {1: 3.841, 2: 5.991, 3: 7.815, 4: 9.488, 5: 11.070, 6: 12.592, 7: 14.067, 8: 15.507, 9: 16.919}
+
+CANDIDATE_FACTOR = 4
+# The standardization is refitted (and every suggestion refreshed) once the
+# library size has drifted by this fraction since the last fit.
+RESCALE_FRACTION = 0.25
+MIN_SUGGESTED_SC = 0.90
+
+
+def glass_composition(sample):
+    """Return ``(means, sds)`` arrays over ``VECTOR_OXIDES`` for a sample, or None.
+
+    Combines every stored reduction of the sample weighted by spot count,
+    converts Fe2O3 back to FeO* and renormalizes to 100 %. Oxides the sample
+    was not analysed for are NaN.
+    """
+    reductions = ((sample.get("geochemistry") or {}).get("reductions") or {}).values()
+    means = np.zeros(len(VECTOR_OXIDES))
+    variances = np.zeros(len(VECTOR_OXIDES))
+    weights = np.zeros(len(VECTOR_OXIDES))
+    for summary in reductions:
+        oxides = dict(summary.get("oxides") or {})
+        if "Fe2O3" in oxides:
+            fe2o3 = oxides.pop("Fe2O3")
+            feo = oxides.get("FeO", {"mean": 0.0, "sd": 0.0})
+            oxides["FeO"] = {
+                "mean": feo["mean"] + fe2o3["mean"] * FEO_PER_FE2O3,
+                "sd": float(np.hypot(feo["sd"], fe2o3["sd"] * FEO_PER_FE2O3)),
+            }
+        spots = max(summary.get("spots") or 1, 1)
+        for j, oxide in enumerate(VECTOR_OXIDES):
+            if oxide in oxides:
+                means[j] += oxides[oxide]["mean"] * spots
+                variances[j] += oxides[oxide]["sd"] ** 2 * spots
+                weights[j] += spots
+    present = weights > 0
+    if present.sum() < MIN_OXIDES or not present[0]:
+        return None
+    means = np.where(present, means / np.where(present, weights, 1), np.nan)
+    sds = np.where(present, np.sqrt(variances / np.where(present, weights, 1)), np.nan)
+    scale = 100.0 / np.nansum(means)
+    return means * scale, sds * scale
+
+
+def _wt_percent(value, label):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value) or value < 0:
+        raise ValueError(f"{label} must be a non-negative number")
+    return float(value)
+
+
+def parse_composition(oxides):
+    """Return ``(means, sds)`` arrays over ``VECTOR_OXIDES`` from a submitted composition.
+
+    Values are wt% numbers or ``{"mean": wt%, "sd": sd}``; oxides that are
+    missing or null are NaN. Raises ValueError for anything else.
+    """
+    if not isinstance(oxides, dict):
+        raise ValueError("composition must be an object of oxide values")
+    means = np.full(len(VECTOR_OXIDES), np.nan)
+    sds = np.full(len(VECTOR_OXIDES), np.nan)
+    for j, oxide in enumerate(VECTOR_OXIDES):
+        value = oxides.get(oxide)
+        if isinstance(value, dict):
+            means[j] = _wt_percent(value.get("mean"), f"{oxide} mean")
+            if value.get("sd") is not None:
+                sds[j] = _wt_percent(value["sd"], f"{oxide} sd")
+        elif value is not None:
+            means[j] = _wt_percent(value, oxide)
+    return means, sds
+
+
+def similarity_coefficient(x, y):
+    """Borchardt similarity coefficient: mean of min/max ratios over shared major oxides."""
+    shared = ~np.isnan(x) & ~np.isnan(y) & (np.fmin(x, y) >= SC_MIN_WT_PERCENT)
+    if not shared.any():
+        return 0.0
+    return float(np.mean(np.minimum(x[shared], y[shared]) / np.maximum(x[shared], y[shared])))
+
+
+def statistical_distance(x, sx, y, sy):
+    """Perkins D^2 and its degrees of freedom over oxides with a known spread."""
+    variance = np.nan_to_num(sx) ** 2 + np.nan_to_num(sy) ** 2
+    shared = ~np.isnan(x) & ~np.isnan(y) & (variance > 0)
+    if not shared.any():
+        return None, 0
+    return float(np.sum((x[shared] - y[shared]) ** 2 / variance[shared])), int(shared.sum())
+
+
+def match_confidence(sc, d2, dof):
+    if sc >= 0.95 and (d2 is None or d2 <= CHI2_95.get(dof, CHI2_95[9])):
+        return "High"
+    if sc >= 0.92:
+        return "Moderate"
+    return "Low"
+
+
+class CorrelationIndex:
+    """Top-k search over sample glass compositions.
+
+    Compositions come from each sample's stored geochemistry reductions and
+    are kept current through the sample index subscription. Candidates are
+    retrieved from a k-d tree over compositions standardized by the library
+    spread (missing minor oxides imputed with the library mean), then
+    re-ranked by similarity coefficient and statistical distance. The tree
+    is rebuilt lazily on the first query after a composition changes. The
+    standardization is kept between rebuilds and refitted only once the
+    library size has drifted by ``RESCALE_FRACTION``.
+
+    ``version_of(code)`` changes only when that sample's tracked suggestions
+    may have changed. Tracked queries remember their candidate pool and its
+    radius. A changed composition bumps the changed sample and every sample
+    whose pool held it. Once the tree is rebuilt, it also bumps every
+    sample whose pool radius now reaches the new position. A refit changes
+    every sample's version.
+    """
+
+    def __init__(self, sample_index):
+        self.sample_index = sample_index
+        self.compositions = {}
+        self.versions = {}
+        self._tree = None
+        self._codes = []
+        self._rows = {}
+        self._means = self._sds = self._center = self._scale = None
+        self._scaled_size = 0
+        self._epoch = 0
+        self._pools = {}
+        self._pooled_by = {}
+        self._moved = set()
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code, notify=False)
+        sample_index.subscribe(self.refresh)
+
+    def __len__(self):
+        return len(self.compositions)
+
+    def version_of(self, sample_code):
+        """Version of the suggestions for ``sample_code``."""
+        if self._moved:
+            self._ensure_tree()
+        return self._epoch, self.versions.get(sample_code, 0)
+
+    def _bump(self, codes):
+        for code in codes:
+            self.versions[code] = self.versions.get(code, 0) + 1
+
+    def refresh(self, sample_code, notify=True):
+        sample = self.sample_index.get(sample_code)
+        composition = glass_composition(sample) if sample is not None else None
+        with self._lock:
+            current = self.compositions.get(sample_code)
+            if composition is None:
+                if current is None:
+                    return
+                del self.compositions[sample_code]
+                self._track(sample_code, ())
+            elif current is not None and all(np.array_equal(a, b, equal_nan=True) for a, b in zip(current, composition)):
+                return
+            else:
+                self.compositions[sample_code] = composition
+            self._tree = None
+            if notify:
+                self._bump({sample_code} | self._pooled_by.get(sample_code, set()))
+                if composition is not None:
+                    self._moved.add(sample_code)
+
+    def _track(self, sample_code, pool, radius=np.inf):
+        """Remember the candidate pool of a tracked query (an empty pool forgets it)."""
+        for code in self._pools.pop(sample_code, ((), None))[0]:
+            self._pooled_by.get(code, set()).discard(sample_code)
+        if pool:
+            self._pools[sample_code] = (tuple(pool), radius)
+            for code in pool:
+                self._pooled_by.setdefault(code, set()).add(sample_code)
+
+    def _ensure_tree(self):
+        with self._lock:
+            if self._tree is not None:
+                return
+            self._codes = list(self.compositions)
+            self._rows = {code: i for i, code in enumerate(self._codes)}
+            if not self._codes:
+                self._tree = KDTree(np.empty((0, len(VECTOR_OXIDES))))
+                self._moved.clear()
+                return
+            self._means = np.array([self.compositions[code][0] for code in self._codes])
+            self._sds = np.array([self.compositions[code][1] for code in self._codes])
+            if self._center is None or abs(len(self._codes) - self._scaled_size) > RESCALE_FRACTION * self._scaled_size:
+                self._center = np.nanmean(self._means, axis=0)
+                spread = np.nanstd(self._means, axis=0) if len(self._codes) > 1 else np.zeros(len(VECTOR_OXIDES))
+                self._scale = np.maximum(np.nan_to_num(spread), 0.05)
+                self._scaled_size = len(self._codes)
+                self._epoch += 1
+                self._moved.clear()
+            self._tree = KDTree(self._standardize(self._means))
+            self._reach_moved()
+
+    def _reach_moved(self):
+        """Bump the tracked samples whose candidate radius reaches a moved composition."""
+        moved = [self._rows[code] for code in self._moved if code in self._rows]
+        self._moved.clear()
+        owners = [code for code in self._pools if code in self._rows]
+        if not moved or not owners:
+            return
+        points = self._tree.points
+        radii = np.array([self._pools[code][1] for code in owners])
+        origins = points[[self._rows[code] for code in owners]]
+        for row in moved:
+            reached = np.linalg.norm(origins - points[row], axis=1) <= radii
+            self._bump(code for code, hit in zip(owners, reached.tolist()) if hit)
+
+    def _standardize(self, means):
+        return (np.where(np.isnan(means), self._center, means) - self._center) / self._scale
+
+    def search(self, means, sds=None, k=5, exclude=None):
+        """Rank library samples against one composition (arrays over ``VECTOR_OXIDES``)."""
+        return self._search(means, sds, k, exclude)[0]
+
+    def _search(self, means, sds, k, exclude):
+        self._ensure_tree()
+        with self._lock:
+            tree, codes = self._tree, self._codes
+            library_means, library_sds = self._means, self._sds
+            if not len(tree):
+                return [], (), np.inf
+            query = self._standardize(np.asarray(means, dtype=float)[None, :])[0]
+        sds = np.full(len(VECTOR_OXIDES), np.nan) if sds is None else np.asarray(sds, dtype=float)
+        count = k * CANDIDATE_FACTOR + 1
+        distances, indices = tree.query(query, count)
+        matches = []
+        for distance, index in zip(distances.tolist(), indices.tolist()):
+            if codes[index] == exclude:
+                continue
+            sc = similarity_coefficient(means, library_means[index])
+            d2, dof = statistical_distance(means, sds, library_means[index], library_sds[index])
+            matches.append(
+                {
+                    "sample_code": codes[index],
+                    "similarity_coefficient": round(sc, 3),
+                    "statistical_distance": round(d2, 2) if d2 is not None else None,
+                    "degrees_of_freedom": dof,
+                    "distance": round(distance, 3),
+                    "confidence": match_confidence(sc, d2, dof),
+                }
+            )
+        matches.sort(key=lambda match: (-match["similarity_coefficient"], match["distance"]))
+        # A short pool (small library) would take in any newcomer, so its radius is unbounded.
+        radius = float(distances[-1]) if len(indices) == count else np.inf
+        return matches[:k], [codes[index] for index in indices.tolist()], radius
+
+    def similar_to(self, sample_code, k=5, track=False):
+        """Top-k matches for a library sample.
+
+        With ``track`` the candidate pool is remembered so ``version_of``
+        follows changes that could alter this answer.
+        """
+        composition = self.compositions.get(sample_code)
+        if composition is None:
+            return []
+        matches, pool, radius = self._search(*composition, k=k, exclude=sample_code)
+        if track:
+            with self._lock:
+                self._track(sample_code, pool, radius)
+        return matches
+
+    def score_batch(self, compositions, k=5):
+        """Score a new set of samples against the whole library.
+
+        ``compositions`` maps an id to ``{oxide: wt%}`` or
+        ``{oxide: {"mean": wt%, "sd": sd}}``; returns the top-k matches per id.
+        Raises ValueError for a composition ``parse_composition`` rejects.
+        """
+        parsed = {}
+        for key, oxides in compositions.items():
+            try:
+                parsed[key] = parse_composition(oxides)
+            except ValueError as exc:
+                raise ValueError(f"{key}: {exc}") from exc
+        results = {}
+        for key, (means, sds) in parsed.items():
+            if np.isnan(means).sum() > len(VECTOR_OXIDES) - MIN_OXIDES or np.isnan(means[0]):
+                results[key] = []
+                continue
+            scale = 100.0 / np.nansum(means)
+            results[key] = self.search(means * scale, sds * scale, k=k)
+        return results
@@ -0,0 +1,251 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+ATOMIC_WEIGHTS = {
+    "O": 15.999,
+    "Si": 28.0855,
+    "Ti": 47.867,
+    "Al": 26.9815,
+    "Cr": 51.996,
+    "Fe": 55.845,
+    "Mn": 54.938,
+    "Mg": 24.305,
+    "Ca": 40.078,
+    "Na": 22.990,
+    "K": 39.098,
+    "P": 30.974,
+}
+
+# oxide -> (cation, cations per formula, oxygens per formula); FeO is total iron (FeO*).
+OXIDE_FORMULAS = {
+    "SiO2": ("Si", 1, 2),
+    "TiO2": ("Ti", 1, 2),
+    "Al2O3": ("Al", 2, 3),
+    "Cr2O3": ("Cr", 2, 3),
+    "FeO": ("Fe", 1, 1),
+    "MnO": ("Mn", 1, 1),
+    "MgO": ("Mg", 1, 1),
+    "CaO": ("Ca", 1, 1),
+    "Na2O": ("Na", 2, 1),
+    "K2O": ("K", 2, 1),
+    "P2O5": ("P", 2, 5),
+}
+OXIDES = tuple(OXIDE_FORMULAS)
+ELEMENT_OXIDES = {cation: oxide for oxide, (cation, _, _) in OXIDE_FORMULAS.items()}
+
+# Oxide wt% per element wt%, e.g. 2.139 for Si -> SiO2.
+OXIDE_FACTORS = np.array([
+    (cations * ATOMIC_WEIGHTS[cation] + oxygens * ATOMIC_WEIGHTS["O"]) / (cations * ATOMIC_WEIGHTS[cation])
+    for cation, cations, oxygens in OXIDE_FORMULAS.values()
+])
+FE2O3_PER_FEO = (2 * ATOMIC_WEIGHTS["Fe"] + 3 * ATOMIC_WEIGHTS["O"]) / (2 * (ATOMIC_WEIGHTS["Fe"] + ATOMIC_WEIGHTS["O"]))
+
+# Column suffixes carrying a 1-sigma absolute uncertainty for the named column.
+SIGMA_SUFFIXES = ("_err", "_sd", "_1s")
+LABEL_COLUMNS = ("spot", "point", "analysis", "label", "sample", "sample_code")
+
+# Acceptable anhydrous analytical totals before normalization.
+DEFAULT_TOTAL_RANGE = (95.0, 101.5)
+
+
+@dataclass(frozen=True)
+class Reduction:
+    """Normalized oxide wt% for many spots at once.
+
+    ``values`` and ``sigma`` are ``spots x oxides`` arrays (columns named by
+    ``oxides``), ``totals`` the analytical totals the spots were normalized
+    from and ``passed`` whether each total fell inside the accepted range.
+    """
+
+    labels: np.ndarray
+    oxides: tuple
+    values: np.ndarray
+    sigma: np.ndarray
+    totals: np.ndarray
+    passed: np.ndarray
+    fe3_ratio: float = 0.0
+
+    def __len__(self):
+        return len(self.labels)
+
+    def summary(self, groups=None):
+        """Per-oxide mean, spread and propagated uncertainty of the passing spots.
+
+        With ``groups`` (one key per spot, e.g. sample codes) the summary is
+        computed for every group in one pass and returned keyed by group.
+        """
+        keep = self.passed if self.passed.any() else np.ones(len(self), dtype=bool)
+        values, sigma, totals = self.values[keep], self.sigma[keep], self.totals[keep]
+        if groups is None:
+            return _summarize(self.oxides, values, sigma, totals, np.zeros(len(values), dtype=np.intp), 1)[0]
+        keys, inverse = np.unique(np.asarray(groups)[keep], return_inverse=True)
+        return dict(zip(keys.tolist(), _summarize(self.oxides, values, sigma, totals, inverse, len(keys))))
+
+
+def _summarize(oxides, values, sigma, totals, inverse, count):
+    n = np.bincount(inverse, minlength=count).astype(float)
+    safe_n = np.maximum(n, 1)[:, None]
+    sums = np.zeros((count, values.shape[1]))
+    squares = np.zeros_like(sums)
+    sigma_sums = np.zeros_like(sums)
+    np.add.at(sums, inverse, values)
+    np.add.at(squares, inverse, values ** 2)
+    np.add.at(sigma_sums, inverse, sigma)
+    means = sums / safe_n
+    variance = (squares - safe_n * means ** 2) / np.maximum(n - 1, 1)[:, None]
+    sds = np.where(n[:, None] > 1, np.sqrt(np.clip(variance, 0, None)), 0.0)
+    mean_sigma = sigma_sums / safe_n
+    mean_totals = np.bincount(inverse, weights=totals, minlength=count) / np.maximum(n, 1)
+    return [
+        {
+            "spots": int(n[g]),
+            "analytical_total": round(float(mean_totals[g]), 2),
+            "oxides": {
+                oxide: {
+                    "mean": round(float(means[g, j]), 3),
+                    "sd": round(float(sds[g, j]), 3),
+                    "sigma": round(float(mean_sigma[g, j]), 3),
+                }
+                for j, oxide in enumerate(oxides)
+            },
+        }
+        for g in range(count)
+    ]
+
+
+def to_float_matrix(rows, indices):
+    """Convert the selected columns of ``rows`` to a float array (NaN for blanks)."""
+    cells = np.array([[row[i] if i < len(row) else None for i in indices] for row in rows], dtype=object)
+    if cells.size == 0:
+        return np.empty((len(rows), len(indices)))
+    text = np.char.strip(cells.astype(str))
+    text[np.isin(text, ("", "None", "nan", "NaN", "-", "—", "n.d.", "bdl"))] = "nan"
+    try:
+        return text.astype(float)
+    except ValueError:
+        return np.vectorize(_parse_float, otypes=[float])(text)
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def oxide_matrix(data, sigma, columns, sensitivity=None, background=None):
+    """Map raw columns onto ``OXIDES`` as oxide wt%.
+
+    Oxide columns are taken as wt% oxide. Element columns are wt% element,
+    or raw counts when ``sensitivity`` (counts per wt% element) is given for
+    that element, with an optional ``background`` subtracted first. Missing
+    oxides are NaN; oxide columns win over element columns for the same oxide.
+    """
+    n = data.shape[0]
+    values = np.full((n, len(OXIDES)), np.nan)
+    errors = np.zeros((n, len(OXIDES)))
+    sensitivity = sensitivity or {}
+    background = background or {}
+    index = {name: i for i, name in enumerate(columns)}
+    for j, oxide in enumerate(OXIDES):
+        if oxide in index:
+            values[:, j] = data[:, index[oxide]]
+            errors[:, j] = sigma[:, index[oxide]]
+            continue
+        cation = OXIDE_FORMULAS[oxide][0]
+        if cation not in index:
+            continue
+        scale = OXIDE_FACTORS[j]
+        if cation in sensitivity:
+            scale = scale / sensitivity[cation]
+            values[:, j] = (data[:, index[cation]] - background.get(cation, 0.0)) * scale
+        else:
+            values[:, j] = data[:, index[cation]] * scale
+        errors[:, j] = sigma[:, index[cation]] * abs(scale)
+    return values, errors
+
+
+def recast_iron(values, sigma, oxides, fe3_ratio):
+    """Split total iron (FeO*) into FeO and Fe2O3 for a given Fe3+/sum-Fe ratio."""
+    if not fe3_ratio or "FeO" not in oxides:
+        return values, sigma, oxides
+    j = oxides.index("FeO")
+    fe2o3 = values[:, j] * fe3_ratio * FE2O3_PER_FEO
+    fe2o3_sigma = sigma[:, j] * fe3_ratio * FE2O3_PER_FEO
+    values = values.copy()
+    sigma = sigma.copy()
+    values[:, j] *= 1 - fe3_ratio
+    sigma[:, j] *= 1 - fe3_ratio
+    oxides = oxides[:j] + ("Fe2O3",) + oxides[j:]
+    return np.insert(values, j, fe2o3, axis=1), np.insert(sigma, j, fe2o3_sigma, axis=1), oxides
+
+
+def normalize(values, sigma):
+    """Normalize each spot to 100 % anhydrous and propagate 1-sigma uncertainties.
+
+    For x_i = 100 a_i / T with T = sum(a), first-order propagation with
+    independent errors gives
+    var(x_i) = (100 / T)^2 * (s_i^2 (1 - 2 a_i / T) + (a_i / T)^2 * sum(s^2)).
+    """
+    totals = values.sum(axis=1)
+    safe_totals = np.where(totals > 0, totals, np.nan)[:, None]
+    share = values / safe_totals
+    variance = (100.0 / safe_totals) ** 2 * (
+        sigma ** 2 * (1 - 2 * share) + share ** 2 * (sigma ** 2).sum(axis=1, keepdims=True)
+    )
+    return share * 100.0, np.sqrt(np.clip(variance, 0, None)), totals
+
+
+def reduce(data, columns, sigma=None, labels=None, fe3_ratio=0.0, total_range=DEFAULT_TOTAL_RANGE,
+           sensitivity=None, background=None):
+    """Reduce a ``spots x columns`` matrix of raw data to normalized oxide wt%."""
+    data = np.asarray(data, dtype=float)
+    sigma = np.zeros_like(data) if sigma is None else np.nan_to_num(np.asarray(sigma, dtype=float))
+    values, errors = oxide_matrix(data, sigma, columns, sensitivity, background)
+    present = ~np.isnan(values).all(axis=0)
+    if not present.any():
+        raise ValueError(f"No oxide or element columns found (expected any of {', '.join(OXIDES)})")
+    oxides = tuple(np.array(OXIDES)[present].tolist())
+    values = np.nan_to_num(values[:, present])
+    errors = errors[:, present]
+    values, errors, oxides = recast_iron(values, errors, oxides, fe3_ratio)
+    normalized, normalized_sigma, totals = normalize(values, errors)
+    usable = totals > 0
+    low, high = total_range
+    labels = np.arange(1, len(data) + 1).astype(str) if labels is None else np.asarray(labels, dtype=str)
+    return Reduction(
+        labels=labels[usable],
+        oxides=oxides,
+        values=normalized[usable],
+        sigma=normalized_sigma[usable],
+        totals=totals[usable],
+        passed=(totals[usable] >= low) & (totals[usable] <= high),
+        fe3_ratio=fe3_ratio,
+    )
+
+
+def reduce_table(columns, rows, **options):
+    """Reduce a raw table (header plus rows) as read from a CSV/XLSX upload."""
+    columns = [str(column).strip() for column in columns]
+    lowered = [column.lower() for column in columns]
+    label_index = next((i for i, column in enumerate(lowered) if column in LABEL_COLUMNS), None)
+    data_names = [
+        column for column in columns
+        if column in OXIDE_FORMULAS or column in ELEMENT_OXIDES
+    ]
+    data_indices = [columns.index(name) for name in data_names]
+    sigma_indices = [
+        next((lowered.index(name.lower() + suffix) for suffix in SIGMA_SUFFIXES if name.lower() + suffix in lowered), None)
+        for name in data_names
+    ]
+    data = to_float_matrix(rows, data_indices)
+    sigma = np.zeros_like(data)
+    with_sigma = [(k, i) for k, i in enumerate(sigma_indices) if i is not None]
+    if with_sigma:
+        sigma[:, [k for k, _ in with_sigma]] = np.nan_to_num(to_float_matrix(rows, [i for _, i in with_sigma]))
+    labels = None
+    if label_index is not None:
+        labels = [row[label_index] if label_index < len(row) else "" for row in rows]
+    return reduce(data, data_names, sigma=sigma, labels=labels, **options)
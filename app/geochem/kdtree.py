@@ -0,0 +1,89 @@
+import heapq
+
+import numpy as np
+
+
+class KDTree:
+    """Static k-d tree over an ``n x d`` array for k-nearest-neighbour queries.
+
+    Nodes split on the dimension with the widest spread at the median and
+    keep their bounding box, so a best-first search can skip any subtree
+    whose box is farther than the current k-th neighbour. Leaves hold up to
+    ``leaf_size`` points and are scanned with one vectorized distance
+    computation. Rebuild the tree when the point set changes.
+    """
+
+    def __init__(self, points, leaf_size=32):
+        self.points = np.asarray(points, dtype=float)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.points))
+        # per node: start, end (into order), left child, right child (-1 for leaves)
+        self.nodes = []
+        self.lower = []
+        self.upper = []
+        if len(self.points):
+            self._build()
+        self.lower = np.array(self.lower)
+        self.upper = np.array(self.upper)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self):
+        self._add_node(0, len(self.points))
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            start, end = self.nodes[node][:2]
+            block = self.points[self.order[start:end]]
+            self.lower[node] = block.min(axis=0)
+            self.upper[node] = block.max(axis=0)
+            if end - start <= self.leaf_size:
+                continue
+            dim = int(np.argmax(self.upper[node] - self.lower[node]))
+            middle = (end - start) // 2
+            part = np.argpartition(block[:, dim], middle)
+            self.order[start:end] = self.order[start:end][part]
+            left = self._add_node(start, start + middle)
+            right = self._add_node(start + middle, end)
+            self.nodes[node][2:] = [left, right]
+            stack.extend((left, right))
+
+    def _add_node(self, start, end):
+        self.nodes.append([start, end, -1, -1])
+        self.lower.append(None)
+        self.upper.append(None)
+        return len(self.nodes) - 1
+
+    def _box_distance(self, node, point):
+        gap = np.maximum(0.0, np.maximum(self.lower[node] - point, point - self.upper[node]))
+        return float(gap @ gap)
+
+    def query(self, point, k=1):
+        """Return ``(distances, indices)`` of the ``k`` nearest points, closest first."""
+        point = np.asarray(point, dtype=float)
+        k = min(k, len(self.points))
+        if k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.intp)
+        best = []  # max-heap of (-squared distance, index)
+        frontier = [(0.0, 0)]
+        while frontier:
+            bound, node = heapq.heappop(frontier)
+            if len(best) == k and bound > -best[0][0]:
+                break
+            start, end, left, right = self.nodes[node]
+            if left >= 0:
+                for child in (left, right):
+                    child_bound = self._box_distance(child, point)
+                    if len(best) < k or child_bound <= -best[0][0]:
+                        heapq.heappush(frontier, (child_bound, child))
+                continue
+            indices = self.order[start:end]
+            offsets = self.points[indices] - point
+            for distance, index in zip(np.einsum("ij,ij->i", offsets, offsets).tolist(), indices.tolist()):
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+        best.sort(reverse=True)
+        return np.sqrt([-distance for distance, _ in best]), np.array([index for _, index in best], dtype=np.intp)
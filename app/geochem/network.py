@@ -0,0 +1,218 @@
+from threading import RLock
+
+
+# Curated correlation confidence, strongest first.
+CONFIDENCE_LEVELS = ("High", "Moderate", "Low")
+CONFIDENCE_RANK = {level: len(CONFIDENCE_LEVELS) - i for i, level in enumerate(CONFIDENCE_LEVELS)}
+
+
+def confidence_rank(confidence):
+    """Rank of a confidence label (High 3, Moderate 2, Low 1); unknown labels count as Low."""
+    if isinstance(confidence, str):
+        return CONFIDENCE_RANK.get(confidence.strip().capitalize(), 1)
+    return 1
+
+
+class UnionFind:
+    """Disjoint sets with union by size and path halving; each root keeps its member list."""
+
+    def __init__(self):
+        self.parent = {}
+        self.members = {}
+
+    def find(self, item):
+        parent = self.parent
+        if item not in parent:
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        for item in (a, b):
+            if item not in self.parent:
+                self.parent[item] = item
+                self.members[item] = [item]
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.members[a].extend(self.members.pop(b))
+
+    def group(self, item):
+        return self.members.get(self.find(item), [item])
+
+
+class CorrelationNetwork:
+    """Tephra families: connected components of the curated correlation graph.
+
+    Every sample's ``correlation.targets`` declares undirected links to
+    other samples; a link is as strong as the highest confidence either
+    side gives it. One union-find forest per confidence threshold holds the
+    families reachable through links at least that strong, so transitive
+    queries ("everything correlated with this layer at Moderate or better")
+    are a ``find`` per sample. New or strengthened links are merged into the
+    forests in place; a removed or weakened link cannot be split out of a
+    union-find, so the affected forests are dropped and rebuilt on the next
+    query. ``version_of(code)`` changes whenever the family of that sample
+    (the connected component at any confidence) gains, loses or relinks a
+    member, which covers every family listing and linkage shown for it.
+    """
+
+    def __init__(self, sample_index):
+        self.sample_index = sample_index
+        self.declared = {}
+        self.links = {}
+        self.versions = {}
+        self._forests = {}
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code, notify=False)
+        sample_index.subscribe(self.refresh)
+
+    def refresh(self, sample_code, notify=True):
+        sample = self.sample_index.get(sample_code)
+        targets = {}
+        for target in ((sample or {}).get("correlation") or {}).get("targets") or []:
+            code = target.get("sample_code")
+            if code and code != sample_code:
+                targets[code] = max(targets.get(code, 0), confidence_rank(target.get("confidence")))
+        with self._lock:
+            current = self.declared.get(sample_code, {})
+            if targets == current:
+                return
+            seeds = {sample_code} | set(current) | set(targets)
+            affected = self._component(seeds) if notify else ()
+            if targets:
+                self.declared[sample_code] = targets
+            else:
+                self.declared.pop(sample_code, None)
+            for other in set(current) | set(targets):
+                self._relink(sample_code, other)
+            if notify:
+                for code in affected | self._component(seeds):
+                    self.versions[code] = self.versions.get(code, 0) + 1
+
+    def version_of(self, sample_code):
+        return self.versions.get(sample_code, 0)
+
+    def _component(self, seeds):
+        """Every sample linked to one of ``seeds`` at any confidence (breadth-first)."""
+        seen = set(seeds)
+        frontier = list(seeds)
+        while frontier:
+            for other in self.links.get(frontier.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append(other)
+        return seen
+
+    def _relink(self, a, b):
+        before = self.links.get(a, {}).get(b, 0)
+        after = max(self.declared.get(a, {}).get(b, 0), self.declared.get(b, {}).get(a, 0))
+        if after == before:
+            return
+        for x, y in ((a, b), (b, a)):
+            if after:
+                self.links.setdefault(x, {})[y] = after
+            else:
+                neighbours = self.links.get(x, {})
+                neighbours.pop(y, None)
+                if not neighbours:
+                    self.links.pop(x, None)
+        for threshold in list(self._forests):
+            if after >= threshold > before:
+                self._forests[threshold].union(a, b)
+            elif before >= threshold > after:
+                del self._forests[threshold]
+
+    def _forest(self, threshold):
+        with self._lock:
+            forest = self._forests.get(threshold)
+            if forest is None:
+                forest = UnionFind()
+                for a, neighbours in self.links.items():
+                    for b, strength in neighbours.items():
+                        if strength >= threshold and a < b:
+                            forest.union(a, b)
+                self._forests[threshold] = forest
+            return forest
+
+    def neighbours(self, sample_code, min_confidence="Low"):
+        threshold = confidence_rank(min_confidence)
+        return {
+            code: CONFIDENCE_LEVELS[-strength]
+            for code, strength in self.links.get(sample_code, {}).items()
+            if strength >= threshold
+        }
+
+    def family(self, sample_code, min_confidence="Low"):
+        """Every sample transitively correlated with ``sample_code`` (itself included), sorted."""
+        forest = self._forest(confidence_rank(min_confidence))
+        with self._lock:
+            return sorted(forest.group(sample_code))
+
+    def linkage(self, a, b):
+        """Strongest confidence at which two samples share a family, or None."""
+        for level in CONFIDENCE_LEVELS:
+            forest = self._forest(CONFIDENCE_RANK[level])
+            with self._lock:
+                if forest.find(a) == forest.find(b) and a in forest.parent:
+                    return level
+        return None
+
+    def families(self, min_confidence="Low"):
+        """All families with at least two samples, largest first."""
+        forest = self._forest(confidence_rank(min_confidence))
+        with self._lock:
+            groups = [sorted(codes) for codes in forest.members.values()]
+        return sorted(groups, key=lambda codes: (-len(codes), codes[0]))
+
+    def summarize(self, codes, min_confidence="Low"):
+        """Size, link count, weakest link and projects of one family."""
+        threshold = confidence_rank(min_confidence)
+        members = set(codes)
+        strengths = [
+            strength
+            for code in codes
+            for other, strength in self.links.get(code, {}).items()
+            if other in members and code < other and strength >= threshold
+        ]
+        project_ids = set()
+        missing = []
+        for code in codes:
+            record = self.sample_index.record(code)
+            if record is None:
+                missing.append(code)
+            else:
+                project_ids.update(record.project_ids)
+        return {
+            "family": codes[0],
+            "size": len(codes),
+            "samples": list(codes),
+            "links": len(strengths),
+            "weakest_confidence": CONFIDENCE_LEVELS[-min(strengths)] if strengths else None,
+            "project_ids": sorted(project_ids),
+            "missing_samples": missing,
+        }
+
+    def project_families(self, project_id, min_confidence="Low", visible=None):
+        """Summaries of the families that include at least one sample of the project.
+
+        ``visible(code)`` drops the samples it rejects from each family first.
+        """
+        project_codes = set(self.sample_index.codes_for_project(project_id))
+        summaries = []
+        for codes in self.families(min_confidence):
+            if visible is not None:
+                codes = [code for code in codes if visible(code)]
+            in_project = [code for code in codes if code in project_codes]
+            if not in_project:
+                continue
+            summary = self.summarize(codes, min_confidence)
+            summary["project_samples"] = in_project
+            summaries.append(summary)
+        return summaries
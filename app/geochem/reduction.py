@@ -0,0 +1,91 @@
+import csv
+import os
+from datetime import date
+
+from app.geochem.engine import reduce_table
+
+
+def read_table(path):
+    """Return ``(columns, rows)`` from a CSV or XLSX file of one analysis per row."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            reader = csv.reader(handle)
+            columns = next(reader, [])
+            return [column.strip() for column in columns], [row for row in reader if any(row)]
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            columns = [str(value or "").strip() for value in next(rows, ())]
+            return columns, [list(row) for row in rows if row and any(value not in (None, "") for value in row)]
+        finally:
+            workbook.close()
+    raise ValueError(f"Unsupported raw data format: {os.path.basename(path)}")
+
+
+def read_calibration(path):
+    """Read ``element, sensitivity[, background]`` rows for count-based raw data."""
+    sensitivity, background = {}, {}
+    if not os.path.exists(path):
+        return sensitivity, background
+    columns, rows = read_table(path)
+    index = {column.lower(): i for i, column in enumerate(columns)}
+    for row in rows:
+        element = str(row[index["element"]]).strip()
+        sensitivity[element] = float(row[index["sensitivity"]])
+        if "background" in index and row[index["background"]] not in (None, ""):
+            background[element] = float(row[index["background"]])
+    return sensitivity, background
+
+
+def reduce_upload(payload):
+    """Reduce one raw upload to anhydrous-normalized oxide wt%.
+
+    Runs in a job worker process. The whole raw table is reduced as one
+    matrix by ``engine.reduce_table``; the per-spot results are written as a
+    processed CSV next to the raw file and a JSON-serializable summary is
+    returned. Count-based uploads are calibrated with an optional
+    ``<stem>_calibration.csv`` sidecar.
+    """
+    path = payload["path"]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Raw upload {payload['filename']} is not in the upload folder")
+    stem, _ = os.path.splitext(payload["filename"])
+    sensitivity, background = read_calibration(os.path.join(os.path.dirname(path), f"{stem}_calibration.csv"))
+    columns, rows = read_table(path)
+    reduction = reduce_table(
+        columns,
+        rows,
+        fe3_ratio=payload.get("fe3_ratio") or 0.0,
+        sensitivity=sensitivity,
+        background=background,
+    )
+    if not len(reduction):
+        raise ValueError(f"{payload['filename']} has no analyses with a usable oxide total")
+
+    processed_file = f"{stem.removesuffix('_raw')}_processed.csv"
+    with open(os.path.join(os.path.dirname(path), processed_file), "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(
+            ["spot", *reduction.oxides, *(f"{oxide}_1s" for oxide in reduction.oxides), "analytical_total", "qc"]
+        )
+        writer.writerows(
+            [label, *values, *sigma, total, "pass" if passed else "fail"]
+            for label, values, sigma, total, passed in zip(
+                reduction.labels.tolist(),
+                reduction.values.round(3).tolist(),
+                reduction.sigma.round(3).tolist(),
+                reduction.totals.round(2).tolist(),
+                reduction.passed.tolist(),
+            )
+        )
+
+    return dict(
+        reduction.summary(),
+        processed_file=processed_file,
+        rejected_spots=int((~reduction.passed).sum()),
+        fe3_ratio=reduction.fe3_ratio,
+        reduced_on=date.today().isoformat(),
+    )
@@ -0,0 +1,109 @@
+import os
+from copy import deepcopy
+from datetime import date
+
+from app.geochem.reduction import reduce_upload
+
+
+REDUCE_KIND = "geochem.reduce"
+WORKFLOW_STEP = "Geochemical Analysis"
+
+_upload_folder = "uploads"
+_fe3_ratio = 0.0
+_subscribed = False
+
+
+def configure(upload_folder, fe3_ratio=0.0):
+    global _upload_folder, _fe3_ratio
+    _upload_folder = upload_folder
+    _fe3_ratio = fe3_ratio
+
+
+def raw_upload_path(sample_code, filename):
+    return os.path.join(_upload_folder, sample_code, filename)
+
+
+def pending_reductions(sample):
+    """Raw uploads of an auto-processed sample that have no reduction or recorded failure yet."""
+    geochem = sample.get("geochemistry") or {}
+    if not str(geochem.get("auto_processing") or "").startswith("Enabled"):
+        return []
+    finished = set(geochem.get("reductions") or {}) | set(geochem.get("reduction_errors") or {})
+    return [filename for filename in geochem.get("raw_uploads") or [] if filename not in finished]
+
+
+def schedule_reductions(sample_code):
+    from app.jobs import get_job_queue, get_job_runner
+    from app.samples.routes import sample_index
+
+    queue = get_job_queue()
+    sample = sample_index.get(sample_code)
+    if queue is None or sample is None:
+        return
+    queued = False
+    for filename in pending_reductions(sample):
+        path = raw_upload_path(sample_code, filename)
+        if not os.path.isfile(path):
+            continue  # listed but not stored here; picked up on a later write or restart
+        payload = {
+            "sample_code": sample_code,
+            "filename": filename,
+            "path": path,
+            "fe3_ratio": _fe3_ratio,
+        }
+        queued |= queue.enqueue(REDUCE_KIND, f"{sample_code}/{filename}", payload)
+    if queued and get_job_runner() is not None:
+        get_job_runner().wake()
+
+
+def schedule_all_reductions():
+    """Queue every pending reduction and keep queueing as samples change."""
+    global _subscribed
+    from app.samples.routes import sample_index
+
+    for sample_code in sample_index.codes():
+        schedule_reductions(sample_code)
+    if not _subscribed:
+        sample_index.subscribe(schedule_reductions)
+        _subscribed = True
+
+
+def _update_geochemistry(sample_code, change):
+    from app.samples.routes import sample_index, update_sample
+
+    sample = sample_index.get(sample_code)
+    if sample is None:
+        return
+    geochem = deepcopy(sample.get("geochemistry") or {})
+    workflow = deepcopy(sample.get("workflow_status") or [])
+    change(geochem, workflow)
+    update_sample(sample_code, geochemistry=geochem, workflow_status=workflow)
+
+
+def record_reduction(payload, result):
+    """Store a finished reduction on the sample and advance its workflow."""
+    def change(geochem, workflow):
+        geochem.setdefault("reductions", {})[payload["filename"]] = result
+        (geochem.get("reduction_errors") or {}).pop(payload["filename"], None)
+        processed = geochem.setdefault("processed_uploads", [])
+        if result["processed_file"] not in processed:
+            processed.append(result["processed_file"])
+        step = next((step for step in workflow if step.get("name") == WORKFLOW_STEP), None)
+        if step is None:
+            step = {"name": WORKFLOW_STEP}
+            workflow.append(step)
+        step.update(state="Processed", updated=date.today().isoformat())
+
+    _update_geochemistry(payload["sample_code"], change)
+
+
+def record_reduction_failure(payload, error):
+    def change(geochem, workflow):
+        geochem.setdefault("reduction_errors", {})[payload["filename"]] = error
+
+    _update_geochemistry(payload["sample_code"], change)
+
+
+TASKS = {
+    REDUCE_KIND: {"run": reduce_upload, "done": record_reduction, "failed": record_reduction_failure},
+}
@@ -0,0 +1,48 @@
+import os
+
+from app.jobs.queue import SqliteJobQueue
+from app.jobs.runner import JobRunner
+from app.storage import get_repository
+from app.storage.sqlite import JOBS_SCHEMA, SqliteEngine
+
+
+_queue = None
+_runner = None
+
+
+def get_job_queue():
+    """Return the active job queue (in the catalog database, or a jobs database for the in-memory catalog)."""
+    return _queue
+
+
+def get_job_runner():
+    return _runner
+
+
+def init_app(app):
+    """Create the job queue and a runner that starts lazily in each worker process."""
+    global _queue, _runner
+    from app.geochem.tasks import TASKS, configure, schedule_all_reductions
+
+    configure(
+        app.config.get("UPLOAD_FOLDER") or os.path.join(app.instance_path, "uploads"),
+        fe3_ratio=app.config.get("GEOCHEM_FE3_RATIO", 0.0),
+    )
+    repository = get_repository()
+    if repository is not None:
+        engine = repository.engine
+    else:
+        path = app.config.get("JOB_DATABASE_PATH") or os.path.join(app.instance_path, "jobs.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        engine = SqliteEngine(path, pool_size=app.config.get("DATABASE_POOL_SIZE", 4))
+        engine.create_schema(JOBS_SCHEMA)
+    _queue = SqliteJobQueue(engine)
+    _runner = JobRunner(
+        _queue,
+        TASKS,
+        max_workers=app.config.get("JOB_WORKERS", 0),
+        poll_interval=app.config.get("JOB_POLL_INTERVAL", 2.0),
+    )
+    schedule_all_reductions()
+    app.before_request(_runner.start)
+    app.extensions["job_queue"] = _queue
@@ -0,0 +1,81 @@
+import time
+
+from app.storage.sqlite import from_json, to_json
+
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+class SqliteJobQueue:
+    """Job queue kept in SQLite so queued work survives restarts.
+
+    Jobs are rows with ``id``, ``kind``, ``key``, ``payload``, ``state``,
+    ``attempts``, ``max_attempts``, ``run_after`` and ``last_error``, unique
+    per ``(kind, key)``: enqueueing work that is already queued or running
+    is a no-op, while enqueueing a done or failed job queues it again with
+    fresh attempts. Every gunicorn worker may poll the same table; ``claim``
+    selects and marks jobs inside one IMMEDIATE transaction, so each job is
+    handed to exactly one worker.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def enqueue(self, kind, key, payload, max_attempts=3):
+        with self.engine.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, job_key, payload, max_attempts) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, job_key) DO UPDATE SET payload = excluded.payload, "
+                "max_attempts = excluded.max_attempts, state = 'queued', attempts = 0, run_after = 0, "
+                "claimed_at = NULL, last_error = NULL WHERE jobs.state IN ('done', 'failed')",
+                (kind, key, to_json(payload), max_attempts),
+            )
+        return cursor.rowcount > 0
+
+    def get(self, kind, key):
+        with self.engine.connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE kind = ? AND job_key = ?", (kind, key)).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def claim(self, limit):
+        now = time.time()
+        with self.engine.transaction() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' AND run_after <= ? ORDER BY run_after, id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, claimed_at = ? WHERE id = ?",
+                [(now, row["id"]) for row in rows],
+            )
+        return [
+            dict(self._job_from_row(row), state="running", attempts=row["attempts"] + 1, claimed_at=now)
+            for row in rows
+        ]
+
+    def complete(self, job_id):
+        self._set(job_id, "state = 'done', last_error = NULL")
+
+    def retry(self, job_id, error, delay):
+        self._set(job_id, "state = 'queued', last_error = ?, run_after = ?", error, time.time() + delay)
+
+    def fail(self, job_id, error):
+        self._set(job_id, "state = 'failed', last_error = ?", error)
+
+    def requeue_expired(self, lease_seconds):
+        with self.engine.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'queued' WHERE state = 'running' AND claimed_at < ?",
+                (time.time() - lease_seconds,),
+            )
+
+    def _set(self, job_id, assignments, *params):
+        with self.engine.transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*params, job_id))
+
+    @staticmethod
+    def _job_from_row(row):
+        job = dict(row)
+        job["key"] = job.pop("job_key")
+        job["payload"] = from_json(job["payload"])
+        return job
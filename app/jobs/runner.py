@@ -0,0 +1,133 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Event, Lock, Thread
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30.0  # seconds; doubled after every failed attempt
+LEASE_SECONDS = 15 * 60  # a running job not finished by then is handed out again
+
+
+class JobRunner:
+    """Feeds queued jobs to a process pool from a background thread.
+
+    ``tasks`` maps a job kind to ``{"run": fn, "done": fn, "failed": fn}``.
+    ``run(payload)`` executes in a worker process (so it must be a picklable
+    module-level function) and returns a result; ``done(payload, result)``
+    and ``failed(payload, error)`` run back in this process to record the
+    outcome. Failures are retried with exponential backoff until the job's
+    ``max_attempts`` is used up.
+
+    The pool uses the ``spawn`` start method and the runner is started per
+    process, so each gunicorn worker gets its own pool after forking rather
+    than inheriting threads from the master.
+    """
+
+    def __init__(self, queue, tasks, max_workers=2, poll_interval=2.0):
+        self.queue = queue
+        self.tasks = tasks
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._executor = None
+        self._thread = None
+        self._pid = None
+        self._in_flight = 0
+        self._lock = Lock()
+        self._stop = Event()
+        self._wake = Event()
+
+    def start(self):
+        """Start the polling thread in this process (safe to call on every request)."""
+        if self._pid == os.getpid() or not self.max_workers:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._executor = None
+            self._in_flight = 0
+            self._stop.clear()
+            self._thread = Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        self._pid = None
+
+    def wake(self):
+        """Poll immediately instead of waiting for the next interval."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.queue.requeue_expired(LEASE_SECONDS)
+                self._dispatch()
+            except Exception:
+                logger.exception("Job runner poll failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _dispatch(self):
+        with self._lock:
+            free = self.max_workers - self._in_flight
+        if free <= 0:
+            return
+        for job in self.queue.claim(free):
+            task = self.tasks.get(job["kind"])
+            if task is None:
+                self.queue.fail(job["id"], f"No task registered for {job['kind']!r}")
+                continue
+            with self._lock:
+                self._in_flight += 1
+            try:
+                future = self._pool().submit(task["run"], job["payload"])
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._pool().submit(task["run"], job["payload"])
+            future.add_done_callback(lambda future, job=job: self._finished(job, future))
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _finished(self, job, future):
+        task = self.tasks[job["kind"]]
+        try:
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                self._executor = None
+                raise
+            task["done"](job["payload"], result)
+            self.queue.complete(job["id"])
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if job["attempts"] < job["max_attempts"]:
+                delay = RETRY_BASE_DELAY * 2 ** (job["attempts"] - 1)
+                logger.warning("Job %s (%s) failed, retrying in %ss: %s", job["id"], job["key"], delay, error)
+                self.queue.retry(job["id"], error, delay)
+            else:
+                logger.error("Job %s (%s) failed permanently: %s", job["id"], job["key"], error)
+                self.queue.fail(job["id"], error)
+                try:
+                    task["failed"](job["payload"], error)
+                except Exception:
+                    logger.exception("Recording failure for job %s failed", job["id"])
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._wake.set()
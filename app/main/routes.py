@@ -1,34 +1,13 @@
-from flask import render_template, redirect, url_for, request
-from datetime import datetime
+from flask import abort, render_template, redirect, session, url_for, request
 
 from app.main import bp
-from app.projects.routes import projects as project_catalog
-from app.samples.routes import samples as sample_catalog, format_sample
+from app.projects.ordering import SORT_KEYS as PROJECT_SORT_KEYS
+from app.projects.routes import project_registry, project_search, project_orderings, user_has_project_access
+from app.samples.routes import admin_aggregates, format_sample, people_graph, sample_index, sample_visibility
 
 
-def format_relative_time(date_string):
-    """Convert date string to relative time (e.g., '2 days ago')"""
-    try:
-        date_obj = datetime.strptime(date_string, '%Y-%m-%d')
-        delta = datetime.now() - date_obj
-
-        if delta.days == 0:
-            return "today"
-        elif delta.days == 1:
-            return "1 day ago"
-        elif delta.days < 7:
-            return f"{delta.days} days ago"
-        elif delta.days < 30:
-            weeks = delta.days // 7
-            return f"{weeks} week{'s' if weeks != 1 else ''} ago"
-        elif delta.days < 365:
-            months = delta.days // 30
-            return f"{months} month{'s' if months != 1 else ''} ago"
-        else:
-            years = delta.days // 365
-            return f"{years} year{'s' if years != 1 else ''} ago"
-    except:
-        return date_string
+DASHBOARD_RECENT_SAMPLES = 25
+DASHBOARD_COWORKERS = 12
 
 
 @bp.route('/')
@@ -36,8 +15,10 @@ def index():
     # Get search query from request
     search_query = request.args.get('search', '').strip().lower()
 
-    # Get sort parameters
-    sort_by = request.args.get('sort_by', 'title')  # Default sort by title
+    # Get sort parameters (searches default to relevance ranking)
+    sort_by = request.args.get('sort_by', 'relevance' if search_query else 'title')
+    if sort_by == 'relevance' and not search_query:
+        sort_by = 'title'
     sort_order = request.args.get('sort_order', 'asc')  # Default ascending
 
     # Get pagination parameter (projects per page)
@@ -57,43 +38,52 @@ def index():
     except ValueError:
         page = 1
 
-    # Filter projects based on search query
-    filtered_projects = project_catalog
+    # Keyset cursors from the previous/next links take precedence over page
+    after_cursor = request.args.get('after')
+    before_cursor = request.args.get('before')
+
+    if sort_by not in PROJECT_SORT_KEYS and sort_by != 'relevance':
+        sort_by = 'title'
+    if sort_order not in ('asc', 'desc'):
+        sort_order = 'asc'
+
+    next_cursor = prev_cursor = None
     if search_query:
-        filtered_projects = [
-            project for project in project_catalog
-            if search_query in project.get("title", "").lower() or
-               search_query in project.get("owner", "").lower()
-        ]
-
-    # Sort projects
-    reverse = (sort_order == 'desc')
-    if sort_by == 'owner':
-        filtered_projects = sorted(filtered_projects, key=lambda x: x.get('owner', '').lower(), reverse=reverse)
-    elif sort_by == 'last_updated':
-        filtered_projects = sorted(filtered_projects, key=lambda x: x.get('last_updated', ''), reverse=reverse)
-    else:  # Default to title
-        filtered_projects = sorted(filtered_projects, key=lambda x: x.get('title', '').lower(), reverse=reverse)
-
-    # Calculate pagination
-    total_projects = len(filtered_projects)
-    total_pages = (total_projects + per_page - 1) // per_page  # Ceiling division
-
-    # Ensure page is within bounds
-    if page > total_pages and total_pages > 0:
-        page = total_pages
-
-    # Get projects for current page
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    paginated_projects = filtered_projects[start_idx:end_idx]
-
-    # Format dates as relative time for display
-    for project in paginated_projects:
-        if 'last_updated' in project:
-            project['last_updated_relative'] = format_relative_time(project['last_updated'])
-        else:
-            project['last_updated_relative'] = 'Unknown'
+        # Filter projects based on search query (ranked by the inverted index)
+        filtered_projects = project_search.search(search_query)
+        if sort_by != 'relevance':
+            key = PROJECT_SORT_KEYS[sort_by]
+            filtered_projects = sorted(
+                filtered_projects,
+                key=lambda x: (key(x), x.id),
+                reverse=(sort_order == 'desc'),
+            )
+        total_projects = len(filtered_projects)
+        total_pages = (total_projects + per_page - 1) // per_page  # Ceiling division
+        if page > total_pages and total_pages > 0:
+            page = total_pages
+        start_idx = (page - 1) * per_page
+        paginated_projects = filtered_projects[start_idx:start_idx + per_page]
+    else:
+        # Unfiltered listings read straight from the maintained sort orders
+        total_projects = len(project_orderings)
+        total_pages = (total_projects + per_page - 1) // per_page  # Ceiling division
+        if page > total_pages and total_pages > 0:
+            page = total_pages
+        start_idx = (page - 1) * per_page
+        try:
+            if after_cursor:
+                start_idx = project_orderings.position_after(sort_by, sort_order, after_cursor)
+            elif before_cursor:
+                start_idx = max(project_orderings.position_before(sort_by, sort_order, before_cursor) - per_page, 0)
+        except ValueError:
+            pass
+        page = start_idx // per_page + 1
+        paginated_projects = project_orderings.slice(sort_by, sort_order, start_idx, per_page)
+        if paginated_projects and start_idx + per_page < total_projects:
+            next_cursor = project_orderings.cursor_for(sort_by, paginated_projects[-1])
+        if paginated_projects and start_idx > 0:
+            prev_cursor = project_orderings.cursor_for(sort_by, paginated_projects[0])
 
     # Pagination info
     pagination = {
@@ -101,10 +91,12 @@ def index():
         'per_page': per_page,
         'total_projects': total_projects,
         'total_pages': total_pages,
-        'has_prev': page > 1,
-        'has_next': page < total_pages,
+        'has_prev': start_idx > 0,
+        'has_next': start_idx + per_page < total_projects,
         'prev_page': page - 1 if page > 1 else None,
         'next_page': page + 1 if page < total_pages else None,
+        'prev_cursor': prev_cursor,
+        'next_cursor': next_cursor,
     }
 
     # Sort info
@@ -128,238 +120,118 @@ def fake_login():
     return redirect(url_for('auth.login'))
 
 
+def _project_visible(project_id):
+    project = project_registry.get(project_id)
+    return project is not None and user_has_project_access(project)
+
+
+def _sample_visible(sample_code):
+    project_ids = people_graph.sample_projects.get(sample_code, ())
+    return not project_ids or any(_project_visible(project_id) for project_id in project_ids)
+
+
+def _render_dashboard(person, title):
+    """Projects, collected samples and co-workers of one person, read from the people graph."""
+    projects = samples = coworkers = []
+    collected = project_sample_count = 0
+    if person is not None:
+        projects = sorted(
+            (
+                (project_registry.get(project_id), role)
+                for project_id, role in people_graph.projects_for(person.key).items()
+                if _project_visible(project_id)
+            ),
+            key=lambda item: item[0].title.lower(),
+        )
+        codes = [code for code in people_graph.samples_collected_by(person.key) if _sample_visible(code)]
+        collected = len(codes)
+        records = [record for record in map(sample_index.record, codes) if record is not None]
+        records.sort(key=lambda record: (record.collected_on is not None, record.collected_on, record.sample_code), reverse=True)
+        samples = records[:DASHBOARD_RECENT_SAMPLES]
+        project_sample_count = sum(
+            1 for code in people_graph.samples_in_projects_of(person.key) if _sample_visible(code)
+        )
+        visible_counts = people_graph.coworkers(
+            person.key, project_ids=[project.id for project, _ in projects], sample_codes=codes
+        )
+        coworkers = sorted(
+            ((people_graph.people[key], shared) for key, shared in visible_counts.items()),
+            key=lambda item: (-item[1], item[0].full_name),
+        )[:DASHBOARD_COWORKERS]
+    return render_template(
+        "main/person_dashboard.html",
+        title=title,
+        person=person,
+        projects=projects,
+        samples=samples,
+        collected_count=collected,
+        project_sample_count=project_sample_count,
+        coworkers=coworkers,
+    )
+
+
+@bp.route('/dashboard')
+def my_dashboard():
+    """Dashboard for the logged-in user (matched to the people graph by name)."""
+    if not session.get('is_authenticated'):
+        return redirect(url_for('auth.login'))
+    username = session.get('user', {}).get('username', '')
+    return _render_dashboard(people_graph.person(username), title="My Dashboard")
+
+
+@bp.route('/people/<slug>')
+def person_dashboard(slug):
+    person = people_graph.by_slug.get(slug)
+    if person is None:
+        abort(404)
+    return _render_dashboard(person, title=person.full_name)
+
+
 @bp.route('/admin/all-samples')
 def all_samples():
     """Admin view: All samples across all projects"""
-    # Mock data for all samples
-    all_samples_data = [
-        {
-            'sample_id': 'JL20-01A-1',
-            'lab_catalog': 'LAB-2025-001',
-            'short_description': 'Mount St. Helens Tephra Layer A',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'project_owner': 'Dr. Jessica Lane',
-            'collection_date': '2025-09-15',
-            'status': 'Active',
-            'has_physical': False,
-            'has_micro': False,
-            'has_geochem': False,
-        },
-        {
-            'sample_id': 'JL20-01A-2',
-            'lab_catalog': 'LAB-2025-002',
-            'short_description': 'Volcanic Ash Sample - Site B',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'project_owner': 'Dr. Jessica Lane',
-            'collection_date': '2025-08-02',
-            'status': 'Active',
-            'has_physical': True,
-            'has_micro': True,
-            'has_geochem': False,
-        },
-        {
-            'sample_id': 'MC19-05B-1',
-            'lab_catalog': 'LAB-2025-009',
-            'short_description': 'Basalt Core - Mid-Ocean Ridge',
-            'project_title': 'Mid-Atlantic Ridge Basalt Study',
-            'project_owner': 'Dr. Maria Chen',
-            'collection_date': '2025-07-12',
-            'status': 'Active',
-            'has_physical': True,
-            'has_micro': False,
-            'has_geochem': True,
-        },
-        {
-            'sample_id': 'TR24-02C-3',
-            'lab_catalog': 'LAB-2024-156',
-            'short_description': 'Rhyolite Dome Fragment',
-            'project_title': 'Cascadia Volcanic Arc Survey',
-            'project_owner': 'Dr. Thomas Rodriguez',
-            'collection_date': '2024-11-20',
-            'status': 'Archived',
-            'has_physical': True,
-            'has_micro': True,
-            'has_geochem': True,
-        },
-        {
-            'sample_id': 'SD23-08A-5',
-            'lab_catalog': 'LAB-2023-442',
-            'short_description': 'Obsidian Flow Sample',
-            'project_title': 'Holocene Volcanism Timeline',
-            'project_owner': 'Dr. Sarah Davis',
-            'collection_date': '2023-06-15',
-            'status': 'Active',
-            'has_physical': True,
-            'has_micro': False,
-            'has_geochem': True,
-        },
-    ]
-
+    rows, totals = admin_aggregates.snapshot("samples", sample_visibility()[1])
     return render_template(
         "main/all_samples.html",
         title="All Samples",
-        samples=all_samples_data
+        samples=rows,
+        totals=totals,
     )
 
 
 @bp.route('/admin/all-geochemical')
 def all_geochemical():
     """Admin view: All geochemical analyses across all projects"""
-    geochem_data = [
-        {
-            'sample_id': 'MC19-05B-1',
-            'lab_catalog': 'LAB-2025-009',
-            'project_title': 'Mid-Atlantic Ridge Basalt Study',
-            'analysis_type': 'ICP-MS',
-            'run_date': '2025-10-15',
-            'analyst': 'Dr. James Wilson',
-            'elements_analyzed': 'REE, Trace Elements (45 elements)',
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-        {
-            'sample_id': 'SD23-08A-5',
-            'lab_catalog': 'LAB-2023-442',
-            'project_title': 'Holocene Volcanism Timeline',
-            'analysis_type': 'XRF (Whole Rock)',
-            'run_date': '2023-08-20',
-            'analyst': 'Lab Field Team',
-            'elements_analyzed': 'Major Elements (10 elements)',
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-        {
-            'sample_id': 'TR24-02C-3',
-            'lab_catalog': 'LAB-2024-156',
-            'project_title': 'Cascadia Volcanic Arc Survey',
-            'analysis_type': 'LA-ICP-MS',
-            'run_date': '2024-12-05',
-            'analyst': 'Dr. Maria Chen',
-            'elements_analyzed': 'In-situ trace elements',
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-        {
-            'sample_id': 'JL20-01A-4',
-            'lab_catalog': 'LAB-2025-004',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'analysis_type': 'SIMS',
-            'run_date': '2025-10-28',
-            'analyst': 'Dr. Sarah Davis',
-            'elements_analyzed': 'O, H isotopes',
-            'status': 'In Progress',
-            'qc_status': 'Pending'
-        },
-    ]
-
+    rows, totals = admin_aggregates.snapshot("geochemical", sample_visibility()[1])
     return render_template(
         "main/all_geochemical.html",
         title="All Geochemical Analysis",
-        analyses=geochem_data
+        analyses=rows,
+        totals=totals,
     )
 
 
 @bp.route('/admin/all-microanalysis')
 def all_microanalysis():
     """Admin view: All microanalysis data across all projects"""
-    micro_data = [
-        {
-            'sample_id': 'JL20-01A-2',
-            'lab_catalog': 'LAB-2025-002',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'analysis_type': 'EPMA/SEM',
-            'run_date': '2025-09-10',
-            'analyst': 'Dr. Thomas Rodriguez',
-            'minerals_analyzed': 'Plagioclase, Pyroxene, Fe-Ti oxides',
-            'points_analyzed': 127,
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-        {
-            'sample_id': 'TR24-02C-3',
-            'lab_catalog': 'LAB-2024-156',
-            'project_title': 'Cascadia Volcanic Arc Survey',
-            'analysis_type': 'EPMA/SEM',
-            'run_date': '2024-12-01',
-            'analyst': 'Dr. Jessica Lane',
-            'minerals_analyzed': 'Quartz, K-feldspar, Biotite',
-            'points_analyzed': 85,
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-        {
-            'sample_id': 'JL20-01A-4',
-            'lab_catalog': 'LAB-2025-004',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'analysis_type': 'Micro-XRF',
-            'run_date': '2025-09-25',
-            'analyst': 'Lab Field Team',
-            'minerals_analyzed': 'Zircon mapping',
-            'points_analyzed': 450,
-            'status': 'Complete',
-            'qc_status': 'Passed'
-        },
-    ]
-
+    rows, totals = admin_aggregates.snapshot("microanalysis", sample_visibility()[1])
     return render_template(
         "main/all_microanalysis.html",
         title="All Microanalysis",
-        analyses=micro_data
+        analyses=rows,
+        totals=totals,
     )
 
 
 @bp.route('/admin/all-physical')
 def all_physical():
     """Admin view: All physical analysis data across all projects"""
-    physical_data = [
-        {
-            'sample_id': 'JL20-01A-2',
-            'lab_catalog': 'LAB-2025-002',
-            'project_title': 'Mount St. Helens Eruption Analysis',
-            'analysis_type': 'Sieve Analysis',
-            'run_date': '2025-08-15',
-            'analyst': 'Lab Field Team',
-            'parameters': 'Grain size distribution (2mm - 63µm)',
-            'total_mass': '245.8 g',
-            'status': 'Complete',
-        },
-        {
-            'sample_id': 'MC19-05B-1',
-            'lab_catalog': 'LAB-2025-009',
-            'project_title': 'Mid-Atlantic Ridge Basalt Study',
-            'analysis_type': 'Density Separation',
-            'run_date': '2025-07-28',
-            'analyst': 'Dr. James Wilson',
-            'parameters': 'Heavy liquid separation (2.85 g/cm³)',
-            'total_mass': '156.2 g',
-            'status': 'Complete',
-        },
-        {
-            'sample_id': 'TR24-02C-3',
-            'lab_catalog': 'LAB-2024-156',
-            'project_title': 'Cascadia Volcanic Arc Survey',
-            'analysis_type': 'Magnetic Separation',
-            'run_date': '2024-11-30',
-            'analyst': 'Lab Field Team',
-            'parameters': 'Frantz separation (0.5A - 1.5A)',
-            'total_mass': '89.5 g',
-            'status': 'Complete',
-        },
-        {
-            'sample_id': 'SD23-08A-5',
-            'lab_catalog': 'LAB-2023-442',
-            'project_title': 'Holocene Volcanism Timeline',
-            'analysis_type': 'Loss on Ignition',
-            'run_date': '2023-06-22',
-            'analyst': 'Dr. Sarah Davis',
-            'parameters': '550°C, 950°C',
-            'total_mass': '10.2 g',
-            'status': 'Complete',
-        },
-    ]
-
+    rows, totals = admin_aggregates.snapshot("physical", sample_visibility()[1])
+    analysis_types = totals["count"]["analysis_type"]
     return render_template(
         "main/all_physical.html",
         title="All Physical Analysis",
-        analyses=physical_data
+        analyses=rows,
+        totals=totals,
+        most_common=max(analysis_types, key=analysis_types.get) if analysis_types else "—",
     )
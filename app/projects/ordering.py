@@ -0,0 +1,109 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+from threading import RLock
+
+
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+
+# Keys must be JSON-serializable so they can be embedded in cursors.
+SORT_KEYS = {
+    "title": lambda project: project.title.lower(),
+    "owner": lambda project: project.owner.lower(),
+    "last_updated": lambda project: project.last_updated.isoformat() if project.last_updated else "",
+    "priority": lambda project: PRIORITY_RANK.get(project.priority.lower(), len(PRIORITY_RANK)),
+    "status": lambda project: project.status.lower(),
+}
+# Type of each column's sort key, checked when a cursor is decoded.
+SORT_KEY_TYPES = {"title": str, "owner": str, "last_updated": str, "priority": int, "status": str}
+
+
+def encode_cursor(entry):
+    return base64.urlsafe_b64encode(json.dumps(list(entry)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_by=None):
+    """Decode a cursor back into its ``(sort key, project id)`` entry.
+
+    Raises ValueError for tokens that were not produced by ``encode_cursor``
+    (for ``sort_by``, when given), so they never reach the bisection.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, project_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    key_type = SORT_KEY_TYPES.get(sort_by, (str, int))
+    if isinstance(key, bool) or not isinstance(key, key_type) or type(project_id) is not int:
+        raise ValueError(f"Invalid cursor for {sort_by or 'any'} order: {cursor!r}")
+    return (key, project_id)
+
+
+class ProjectOrderings:
+    """Maintained sort orders over the project registry.
+
+    Each sortable column keeps an ascending list of ``(sort key, project id)``
+    entries updated by bisection on every registry write. Descending order is
+    read from the same list back to front, and the project id breaks ties so
+    every entry -- and therefore every cursor -- is unique.
+
+    Pages are fetched either by offset or by keyset cursor; both cost
+    O(log n + page size).
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.orders = {column: [] for column in SORT_KEYS}
+        self._entries = {}
+        self._lock = RLock()
+        for project in registry.all():
+            self.refresh(project.id)
+        registry.subscribe(self.refresh)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self, project_id):
+        with self._lock:
+            for column, entry in self._entries.pop(project_id, {}).items():
+                order = self.orders[column]
+                del order[bisect_left(order, entry)]
+            project = self.registry.get(project_id)
+            if project is None:
+                return
+            entries = {column: (key(project), project_id) for column, key in SORT_KEYS.items()}
+            for column, entry in entries.items():
+                insort(self.orders[column], entry)
+            self._entries[project_id] = entries
+
+    def cursor_for(self, sort_by, project):
+        return encode_cursor(self._entries[project.id][sort_by])
+
+    def slice(self, sort_by, sort_order, start, limit):
+        """Return ``limit`` projects starting at logical position ``start``."""
+        with self._lock:
+            order = self.orders[sort_by]
+            if sort_order == "desc":
+                stop = max(len(order) - start, 0)
+                entries = order[max(stop - limit, 0):stop][::-1]
+            else:
+                entries = order[start:start + limit]
+            return [self.registry.get(project_id) for _, project_id in entries]
+
+    def position_after(self, sort_by, sort_order, cursor):
+        """Logical position of the first entry after ``cursor``."""
+        entry = decode_cursor(cursor, sort_by)
+        with self._lock:
+            order = self.orders[sort_by]
+            if sort_order == "desc":
+                return len(order) - bisect_left(order, entry)
+            return bisect_right(order, entry)
+
+    def position_before(self, sort_by, sort_order, cursor):
+        """Logical position of the entry at ``cursor`` (the end of the previous page)."""
+        entry = decode_cursor(cursor, sort_by)
+        with self._lock:
+            order = self.orders[sort_by]
+            if sort_order == "desc":
+                return len(order) - bisect_right(order, entry)
+            return bisect_left(order, entry)
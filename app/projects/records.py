@@ -0,0 +1,101 @@
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+
+
+def parse_date(value):
+    """Parse a ``YYYY-MM-DD`` string (or pass through a date) once at load time."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+
+def relative_time(date_value, today=None):
+    """Convert a date to relative time (e.g., '2 days ago')"""
+    if not isinstance(date_value, date):
+        return "Unknown"
+    delta = (today or date.today()) - date_value
+    if delta.days <= 0:
+        return "today"
+    if delta.days == 1:
+        return "1 day ago"
+    if delta.days < 7:
+        return f"{delta.days} days ago"
+    if delta.days < 30:
+        weeks = delta.days // 7
+        return f"{weeks} week{'s' if weeks != 1 else ''} ago"
+    if delta.days < 365:
+        months = delta.days // 30
+        return f"{months} month{'s' if months != 1 else ''} ago"
+    years = delta.days // 365
+    return f"{years} year{'s' if years != 1 else ''} ago"
+
+
+def _names(value):
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(name.strip() for name in value if name and name.strip())
+
+
+@dataclass(frozen=True, slots=True)
+class ProjectRecord:
+    """Immutable, typed project parsed once when it enters the registry.
+
+    Records are shared by every request and thread, so per-request values
+    (such as ``last_updated_relative``) are computed on access rather than
+    written back onto the record.
+    """
+
+    id: int
+    title: str
+    slug: str
+    owner: str
+    status: str
+    type: str
+    is_private: bool
+    last_updated: date
+    priority: str
+    collaborator_names: tuple
+    tags: tuple
+    description: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data["id"],
+            title=data.get("title") or "",
+            slug=data.get("slug") or "",
+            owner=(data.get("owner") or "").strip(),
+            status=data.get("status") or "",
+            type=data.get("type") or "",
+            is_private=bool(data.get("is_private")),
+            last_updated=parse_date(data.get("last_updated")),
+            priority=data.get("priority") or "",
+            collaborator_names=_names(data.get("collaborators") or data.get("collaborator_names")),
+            tags=tuple(data.get("tags") or ()),
+            description=data.get("description") or "",
+        )
+
+    def to_dict(self):
+        data = {field.name: getattr(self, field.name) for field in fields(self)}
+        data["last_updated"] = self.last_updated.isoformat() if self.last_updated else None
+        data["collaborators"] = self.collaborators
+        data["tags"] = list(self.tags)
+        del data["collaborator_names"]
+        return data
+
+    @property
+    def collaborators(self):
+        return ", ".join(self.collaborator_names)
+
+    @property
+    def last_updated_relative(self):
+        return relative_time(self.last_updated)
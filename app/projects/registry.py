@@ -0,0 +1,113 @@
+from threading import RLock
+
+from app.projects.records import ProjectRecord
+
+
+def member_key(name):
+    """Normalize a person's name for exact (case-insensitive) membership checks."""
+    return " ".join(name.split()).casefold() if isinstance(name, str) else ""
+
+
+class ProjectRegistry:
+    """Project catalog indexed by id and slug with precomputed member sets.
+
+    Projects are stored as immutable ``ProjectRecord`` instances; raw dicts
+    passed to ``add`` are parsed on the way in and ``update`` swaps in a new
+    record rather than editing the shared one.
+
+    Owners and collaborators are parsed once per write into a per-project
+    member set and a reverse ``member -> project ids`` map, so access checks
+    are set lookups rather than substring tests against the comma-joined
+    collaborators string.
+
+    Callbacks registered with ``subscribe`` receive the project id after every
+    write so dependent caches can invalidate themselves.
+    """
+
+    def __init__(self, projects=()):
+        self.by_id = {}
+        self.by_slug = {}
+        self.members = {}
+        self.projects_by_member = {}
+        self._listeners = []
+        self._lock = RLock()
+        for project in projects:
+            self.add(project)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def all(self):
+        return list(self.by_id.values())
+
+    def get(self, project_id):
+        return self.by_id.get(project_id)
+
+    def get_by_slug(self, slug):
+        return self.by_slug.get(slug)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, project_id):
+        for callback in self._listeners:
+            callback(project_id)
+
+    def _member_keys(self, project):
+        names = (project.owner,) + project.collaborator_names
+        return frozenset(member_key(name) for name in names if member_key(name))
+
+    def add(self, project):
+        if not isinstance(project, ProjectRecord):
+            project = ProjectRecord.from_dict(project)
+        project_id = project.id
+        with self._lock:
+            if project_id in self.by_id:
+                self._unlink(project_id)
+            self.by_id[project_id] = project
+            if project.slug:
+                self.by_slug[project.slug] = project
+            members = self._member_keys(project)
+            self.members[project_id] = members
+            for key in members:
+                self.projects_by_member.setdefault(key, set()).add(project_id)
+        self._notify(project_id)
+        return project
+
+    def update(self, project_id, **changes):
+        with self._lock:
+            project = self.by_id.get(project_id)
+            if project is None:
+                return None
+            project = ProjectRecord.from_dict(dict(project.to_dict(), **changes))
+            return self.add(project)
+
+    def remove(self, project_id):
+        with self._lock:
+            project = self._unlink(project_id)
+        if project is not None:
+            self._notify(project_id)
+        return project
+
+    def _unlink(self, project_id):
+        project = self.by_id.pop(project_id, None)
+        if project is None:
+            return None
+        if self.by_slug.get(project.slug) is project:
+            del self.by_slug[project.slug]
+        for key in self.members.pop(project_id, ()):
+            project_ids = self.projects_by_member.get(key)
+            if project_ids is not None:
+                project_ids.discard(project_id)
+                if not project_ids:
+                    del self.projects_by_member[key]
+        return project
+
+    def members_of(self, project_id):
+        return self.members.get(project_id, frozenset())
+
+    def project_ids_for(self, username):
+        return frozenset(self.projects_by_member.get(member_key(username), ()))
+
+    def is_member(self, project_id, username):
+        return member_key(username) in self.members.get(project_id, ())
@@ -1,11 +1,16 @@
 from flask import render_template, session
 from app.projects import bp
+from app.projects.ordering import ProjectOrderings
+from app.projects.records import ProjectRecord
+from app.projects.registry import ProjectRegistry
+from app.projects.search import ProjectSearchIndex
+from app.storage import get_repository
 
 
 def user_has_project_access(project):
     """Check if current user has access to this project"""
     # Public projects are accessible to everyone
-    if not project.get('is_private'):
+    if not project.is_private:
         return True
 
     # Check if user is logged in
@@ -19,17 +24,11 @@ def user_has_project_access(project):
     if user.get('role') == 'Administrator':
         return True
 
-    # Check if user is the project owner
-    if project.get('owner') == username:
-        return True
-
-    # Check if user is a collaborator
-    collaborators = project.get('collaborators', '')
-    if collaborators and username in collaborators:
-        return True
-
-    return False
+    # Owners and collaborators are exact matches against the registry's
+    # precomputed member set (so "Ian" no longer matches "Ian Keitlan")
+    return project_registry.is_member(project.id, username)
 
+# Seed data; project_registry holds the live catalog as immutable records
 projects = [
     {
         "id": 1,
@@ -383,32 +382,62 @@ projects = [
     }
 ]
 
+project_registry = ProjectRegistry(projects)
+project_search = ProjectSearchIndex(project_registry)
+project_orderings = ProjectOrderings(project_registry)
+
+
+def add_project(project):
+    """Register a new project, persist it and index it."""
+    if not isinstance(project, ProjectRecord):
+        project = ProjectRecord.from_dict(project)
+    repository = get_repository()
+    if repository is not None:
+        repository.save_project(project)
+    return project_registry.add(project)
+
+
+def update_project(project_id, **changes):
+    """Replace a project with an updated record, persist it and re-index it."""
+    current = project_registry.get(project_id)
+    if current is None:
+        return None
+    return add_project(dict(current.to_dict(), **changes))
+
+
+def delete_project(project_id):
+    """Remove a project from storage, the catalog and its indexes."""
+    repository = get_repository()
+    if repository is not None:
+        repository.delete_project(project_id)
+    return project_registry.remove(project_id)
+
 # We are going to have to change this to be the homepage (where the projects are now)
 @bp.route('/')
 def project_list():
-    return render_template("projects/project_list.html", title="Projects", projects=projects)
+    return render_template("projects/project_list.html", title="Projects", projects=project_registry.all())
 
 @bp.route('/<int:project_id>')
 def project_detail(project_id):
-    project = next((p for p in projects if p["id"] == project_id), None)
+    project = project_registry.get(project_id)
     if not project:
         return "Project not found", 404
 
     has_access = user_has_project_access(project)
     return render_template("projects/project_detail.html",
-                         title=project["title"],
+                         title=project.title,
                          project=project,
                          has_access=has_access)
 
 @bp.route('/<slug>')
 def project_detail_by_slug(slug):
-    project = next((p for p in projects if p["slug"] == slug), None)
+    project = project_registry.get_by_slug(slug)
     if not project:
         return "Project not found", 404
 
     has_access = user_has_project_access(project)
     return render_template("projects/project_detail.html",
-                         title=project["title"],
+                         title=project.title,
                          project=project,
                          has_access=has_access)
 
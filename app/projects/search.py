@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from threading import RLock
+
+
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+# Relative weight of a match in each indexed field.
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "owner": 2.0,
+    "collaborators": 2.0,
+    "tags": 2.0,
+    "type": 1.5,
+    "description": 1.0,
+}
+
+# Score multipliers for how a query term matched an indexed token.
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.75
+INFIX_MATCH = 0.5
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold()) if isinstance(text, str) else []
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class ProjectSearchIndex:
+    """In-process inverted index over project text fields.
+
+    Postings map each token to ``{project_id: weight}``. Query terms match
+    tokens exactly, by prefix (binary search over the sorted vocabulary) or,
+    for terms of three or more characters, anywhere inside a token via a
+    trigram index. Every term must match for a project to be returned; results
+    are ranked by summed weight.
+
+    The index subscribes to the registry and re-indexes a project on every
+    write, so it never has to be rebuilt wholesale.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.postings = defaultdict(dict)
+        self.vocabulary = []
+        self.trigrams = defaultdict(set)
+        self._project_tokens = {}
+        self._lock = RLock()
+        for project in registry.all():
+            self.refresh(project.id)
+        registry.subscribe(self.refresh)
+
+    def _field_tokens(self, project):
+        fields = {
+            "title": project.title,
+            "owner": project.owner,
+            "collaborators": " ".join(project.collaborator_names),
+            "tags": " ".join(project.tags),
+            "type": project.type,
+            "description": project.description,
+        }
+        weights = defaultdict(float)
+        for field, text in fields.items():
+            for token in set(tokenize(text)):
+                weights[token] += FIELD_WEIGHTS[field]
+        return weights
+
+    def refresh(self, project_id):
+        with self._lock:
+            self._remove(project_id)
+            project = self.registry.get(project_id)
+            if project is None:
+                return
+            weights = self._field_tokens(project)
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    insort(self.vocabulary, token)
+                    for gram in _trigrams(token):
+                        self.trigrams[gram].add(token)
+                self.postings[token][project_id] = weight
+            self._project_tokens[project_id] = tuple(weights)
+
+    def _remove(self, project_id):
+        for token in self._project_tokens.pop(project_id, ()):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(project_id, None)
+            if posting:
+                continue
+            del self.postings[token]
+            del self.vocabulary[bisect_left(self.vocabulary, token)]
+            for gram in _trigrams(token):
+                self.trigrams[gram].discard(token)
+                if not self.trigrams[gram]:
+                    del self.trigrams[gram]
+
+    def _matching_tokens(self, term):
+        """Yield ``(token, multiplier)`` for every indexed token matching term."""
+        seen = set()
+        vocabulary = self.vocabulary
+        # Walk the sorted vocabulary by index so only the matching prefix run is touched.
+        for index in range(bisect_left(vocabulary, term), len(vocabulary)):
+            token = vocabulary[index]
+            if not token.startswith(term):
+                break
+            seen.add(token)
+            yield token, EXACT_MATCH if token == term else PREFIX_MATCH
+
+        if len(term) < 3:
+            return
+        grams = sorted((self.trigrams.get(gram, set()) for gram in _trigrams(term)), key=len)
+        if not grams or not grams[0]:
+            return
+        for token in grams[0].intersection(*grams[1:]):
+            if token not in seen and term in token:
+                yield token, INFIX_MATCH
+
+    def search(self, query):
+        """Return matching projects ordered by descending relevance."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            scores = None
+            for term in dict.fromkeys(terms):
+                term_scores = defaultdict(float)
+                for token, multiplier in self._matching_tokens(term):
+                    for project_id, weight in self.postings[token].items():
+                        term_scores[project_id] = max(term_scores[project_id], weight * multiplier)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {
+                        project_id: score + term_scores[project_id]
+                        for project_id, score in scores.items()
+                        if project_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+        projects = {project_id: self.registry.get(project_id) for project_id in scores}
+        ranked = sorted(
+            (project_id for project_id, project in projects.items() if project is not None),
+            key=lambda project_id: (-scores[project_id], projects[project_id].title.lower()),
+        )
+        return [projects[project_id] for project_id in ranked]
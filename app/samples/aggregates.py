@@ -0,0 +1,123 @@
+from collections import Counter
+from threading import RLock
+
+
+class AggregateTable:
+    """Materialized rows derived from each sample, with running totals.
+
+    ``builder(sample)`` returns the rows one sample contributes. Rows are
+    stored per sample code, so a write only rebuilds that sample's rows;
+    the value counts of ``count_fields`` and the sums of ``sum_fields`` are
+    adjusted by the difference instead of being recounted.
+    """
+
+    def __init__(self, builder, count_fields=(), sum_fields=()):
+        self.builder = builder
+        self.count_fields = tuple(count_fields)
+        self.sum_fields = tuple(sum_fields)
+        self.by_code = {}
+        self.counts = {field: Counter() for field in self.count_fields}
+        self.sums = dict.fromkeys(self.sum_fields, 0)
+        self._rows = None
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.by_code.values())
+
+    def replace(self, sample_code, rows):
+        rows = tuple(rows)
+        previous = self.by_code.pop(sample_code, ()) if not rows else self.by_code.get(sample_code, ())
+        if previous == rows:
+            return False
+        self._apply(previous, -1)
+        self._apply(rows, 1)
+        if rows:
+            self.by_code[sample_code] = rows
+        self._rows = None
+        return True
+
+    def _apply(self, rows, sign):
+        for row in rows:
+            for field in self.count_fields:
+                counter = self.counts[field]
+                counter[row.get(field)] += sign
+                if counter[row.get(field)] <= 0:
+                    del counter[row.get(field)]
+            for field in self.sum_fields:
+                self.sums[field] += sign * (row.get(field) or 0)
+
+    def rows(self):
+        """Every row in catalog order; the list is reused until the next change."""
+        if self._rows is None:
+            self._rows = [row for rows in self.by_code.values() for row in rows]
+        return self._rows
+
+    def iter_rows(self, codes=None):
+        """Yield rows lazily, optionally only those of ``codes`` (in that order)."""
+        if codes is None:
+            yield from self.rows()
+            return
+        for code in codes:
+            yield from self.by_code.get(code, ())
+
+    def totals(self):
+        return {
+            "rows": len(self.rows()),
+            "count": {field: dict(counter) for field, counter in self.counts.items()},
+            "sum": dict(self.sums),
+        }
+
+    def totals_of(self, rows):
+        """The same totals as ``totals()``, counted over a subset of rows."""
+        return {
+            "rows": len(rows),
+            "count": {field: dict(Counter(row.get(field) for row in rows)) for field in self.count_fields},
+            "sum": {field: sum(row.get(field) or 0 for row in rows) for field in self.sum_fields},
+        }
+
+
+class CatalogAggregates:
+    """Named ``AggregateTable`` instances kept in step with the catalog.
+
+    Subscribes to the sample index (rebuilding one sample's rows after each
+    write) and to the project registry (rebuilding the rows of the project's
+    samples, whose project titles and owners are denormalized into rows).
+    """
+
+    def __init__(self, sample_index, project_registry, tables):
+        self.sample_index = sample_index
+        self.tables = dict(tables)
+        self.version = 0
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code)
+        sample_index.subscribe(self.refresh)
+        project_registry.subscribe(self.refresh_project)
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def refresh(self, sample_code):
+        sample = self.sample_index.get(sample_code)
+        with self._lock:
+            changed = False
+            for table in self.tables.values():
+                changed |= table.replace(sample_code, table.builder(sample) if sample is not None else ())
+            if changed:
+                self.version += 1
+
+    def refresh_project(self, project_id):
+        for sample_code in self.sample_index.codes_for_project(project_id):
+            self.refresh(sample_code)
+
+    def snapshot(self, name, visible=None):
+        """``(rows, totals)`` of one table, read consistently.
+
+        ``visible(sample_code)`` restricts the rows (and totals) to the
+        samples it accepts; without it the maintained totals are returned.
+        """
+        with self._lock:
+            table = self.tables[name]
+            if visible is None:
+                return table.rows(), table.totals()
+            rows = [row for code, rows in table.by_code.items() if visible(code) for row in rows]
+            return rows, table.totals_of(rows)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from types import MappingProxyType
+
+
+class FormattedSampleCache:
+    """LRU cache of formatted samples keyed by sample code.
+
+    Every entry is stamped with an etag made of the sample's version, the
+    versions of the projects and correlation targets it references and the
+    day it was built (audit log entries carry relative times), plus the
+    value of every ``dependency(sample_code)`` (callables returning the
+    sample's version in derived data the builder reads, such as correlation
+    suggestions). A lookup whose etag no longer matches rebuilds the entry,
+    so writers only need to call ``invalidate_sample`` /
+    ``invalidate_project`` after changing a record.
+
+    Cached values are shared between requests and threads, so they are
+    handed out as read-only mapping proxies.
+    """
+
+    def __init__(self, builder, maxsize=1024, dependencies=()):
+        self.builder = builder
+        self.maxsize = maxsize
+        self.dependencies = tuple(dependencies)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sample_versions = {}
+        self._project_versions = {}
+        self._lock = Lock()
+
+    def sample_version(self, sample_code):
+        return self._sample_versions.get(sample_code, 0)
+
+    def project_version(self, project_id):
+        return self._project_versions.get(project_id, 0)
+
+    def etag(self, sample):
+        project_ids = [link.get("project_id") for link in sample.get("associated_projects") or []]
+        targets = [target.get("sample_code") for target in (sample.get("correlation") or {}).get("targets") or []]
+        return (
+            self.sample_version(sample.get("sample_code")),
+            tuple(self.project_version(project_id) for project_id in project_ids),
+            tuple(self.sample_version(code) for code in targets),
+            tuple(dependency(sample.get("sample_code")) for dependency in self.dependencies),
+            date.today(),
+        )
+
+    def get(self, sample):
+        key = sample.get("sample_code")
+        etag = self.etag(sample)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        formatted = MappingProxyType(self.builder(sample))
+        with self._lock:
+            self._entries[key] = (etag, formatted)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return formatted
+
+    def invalidate_sample(self, sample_code):
+        with self._lock:
+            self._sample_versions[sample_code] = self.sample_version(sample_code) + 1
+            self._entries.pop(sample_code, None)
+
+    def invalidate_project(self, project_id):
+        # Entries referencing the project go stale through their etag and are
+        # rebuilt lazily; there is no need to walk the whole cache here.
+        with self._lock:
+            self._project_versions[project_id] = self.project_version(project_id) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
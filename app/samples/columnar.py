@@ -0,0 +1,227 @@
+import json
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import fields
+from datetime import date
+from threading import RLock
+
+from app.samples.records import SampleRecord
+
+
+# Record fields stored in typed arrays; every other field is an interned value id.
+# A null is recorded in the column's null set, never as a sentinel value.
+NUMERIC_COLUMNS = {
+    "collected_on": "l",
+    "depth_cm": "d",
+    "lat": "d",
+    "lon": "d",
+    "is_flagged_for_review": "B",
+    "workflow_count": "I",
+    "attachment_count": "I",
+}
+
+# Top-level raw keys kept as interned JSON text rather than in the blob.
+HOT_KEYS = (
+    "id",
+    "sample_code",
+    "nickname",
+    "collected_on",
+    "collected_by",
+    "status",
+    "storage_location",
+    "igsn",
+    "is_flagged_for_review",
+    "metadata_flags",
+)
+
+# Decoded records kept per store; every write replaces or drops the entry.
+RECORD_CACHE_SIZE = 4096
+
+
+def _encode_numeric(name, value):
+    return value.toordinal() if name == "collected_on" else value
+
+
+def _decode_numeric(name, value):
+    if name == "collected_on":
+        return date.fromordinal(value)
+    if name == "is_flagged_for_review":
+        return bool(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _json_hook(value):
+    if "__date__" in value and len(value) == 1:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+
+class ValueTable:
+    """Interns repeated strings and tuples as small integer ids.
+
+    Values are keyed by type as well, so ``1``, ``1.0`` and ``True`` keep
+    distinct ids. The table only grows; values that stop being referenced
+    are kept until the store is rebuilt, which is fine for catalogs that are
+    mostly appended.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def intern(self, value):
+        key = (type(value), value)
+        value_id = self.ids.get(key)
+        if value_id is None:
+            value_id = self.ids[key] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+
+class ColumnarSampleStore(Mapping):
+    """Compact sample store: typed columns for hot fields, blobs for the rest.
+
+    Each ``SampleRecord`` field lives in a per-column ``array`` (numbers) or as
+    an id into a shared ``ValueTable`` (strings and tuples), so repeated
+    statuses, sites, people and flag sets cost one slot per sample. The raw
+    values of ``HOT_KEYS`` are interned as JSON text, so they come back
+    exactly as written (an absent key stays absent). Rarely read nested
+    payloads (site, attachments, processing, analyses, correlation,
+    workflow) are kept as zlib-compressed JSON and only decoded when a raw
+    sample is requested.
+
+    Behaves like the default dict store: a mapping of sample code to raw
+    sample plus ``record(code)`` for the parsed record. Raw samples returned
+    by ``__getitem__`` are freshly decoded copies; records are immutable and
+    the most recently used ``RECORD_CACHE_SIZE`` are kept decoded.
+    """
+
+    def __init__(self):
+        self.strings = ValueTable()
+        self.columns = {
+            field.name: array(NUMERIC_COLUMNS.get(field.name, "I"))
+            for field in fields(SampleRecord)
+        }
+        self.nulls = {name: set() for name in NUMERIC_COLUMNS}
+        self.raw_columns = {key: array("I") for key in HOT_KEYS}
+        self.blobs = []
+        self.rows = {}
+        self._free_rows = []
+        self._records = OrderedDict()
+        self._absent = self.strings.intern("")
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __contains__(self, sample_code):
+        return sample_code in self.rows
+
+    def __getitem__(self, sample_code):
+        with self._lock:
+            row = self.rows[sample_code]
+            sample = json.loads(zlib.decompress(self.blobs[row]), object_hook=_json_hook)
+            for key, column in self.raw_columns.items():
+                text = self.strings[column[row]]
+                if text:
+                    sample[key] = json.loads(text, object_hook=_json_hook)
+        return sample
+
+    def record(self, sample_code):
+        with self._lock:
+            record = self._records.get(sample_code)
+            if record is not None:
+                self._records.move_to_end(sample_code)
+                return record
+            row = self.rows.get(sample_code)
+            if row is None:
+                return None
+            record = self._record_at(row)
+            self._cache_record(record)
+            return record
+
+    def _cache_record(self, record):
+        self._records[record.sample_code] = record
+        self._records.move_to_end(record.sample_code)
+        if len(self._records) > RECORD_CACHE_SIZE:
+            self._records.popitem(last=False)
+
+    def _record_at(self, row):
+        values = {}
+        for name, column in self.columns.items():
+            if name not in NUMERIC_COLUMNS:
+                values[name] = self.strings[column[row]]
+            elif row in self.nulls[name]:
+                values[name] = None
+            else:
+                values[name] = _decode_numeric(name, column[row])
+        return SampleRecord(**values)
+
+    def _raw_text(self, sample, key):
+        if key not in sample:
+            return ""
+        return json.dumps(sample[key], default=_json_default, separators=(",", ":"))
+
+    def put(self, sample, record):
+        payload = {key: value for key, value in sample.items() if key not in HOT_KEYS}
+        blob = zlib.compress(json.dumps(payload, default=_json_default, separators=(",", ":")).encode())
+        raw = {key: self._raw_text(sample, key) for key in HOT_KEYS}
+        with self._lock:
+            row = self.rows.get(record.sample_code)
+            if row is None:
+                row = self._free_rows.pop() if self._free_rows else None
+            appending = row is None
+            if appending:
+                row = len(self.blobs)
+                self.blobs.append(blob)
+            else:
+                self.blobs[row] = blob
+            for name, column in self.columns.items():
+                value = getattr(record, name)
+                if name not in NUMERIC_COLUMNS:
+                    encoded = self.strings.intern(value)
+                elif value is None:
+                    self.nulls[name].add(row)
+                    encoded = 0
+                else:
+                    self.nulls[name].discard(row)
+                    encoded = _encode_numeric(name, value)
+                if appending:
+                    column.append(encoded)
+                else:
+                    column[row] = encoded
+            for key, column in self.raw_columns.items():
+                value_id = self.strings.intern(raw[key])
+                if appending:
+                    column.append(value_id)
+                else:
+                    column[row] = value_id
+            self.rows[record.sample_code] = row
+            self._cache_record(record)
+
+    def remove(self, sample_code):
+        with self._lock:
+            if sample_code not in self.rows:
+                return None
+            sample = self[sample_code]
+            row = self.rows.pop(sample_code)
+            self._records.pop(sample_code, None)
+            self.blobs[row] = b""
+            for name, column in self.raw_columns.items():
+                column[row] = self._absent
+            self._free_rows.append(row)
+            return sample
@@ -0,0 +1,335 @@
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from threading import RLock
+
+import numpy as np
+
+
+UNIT_MICRONS = {"µm": 1.0, "μm": 1.0, "um": 1.0, "micron": 1.0, "microns": 1.0, "mm": 1000.0, "cm": 10000.0}
+# Open-ended classes (">2 mm", "<63 µm", the pan) are closed one phi unit
+# beyond their sieve so percentiles falling in them can still be placed.
+OPEN_CLASS_PHI = 1.0
+PERCENTILES = (5, 16, 25, 50, 75, 84, 95)
+# Folk & Ward (1957) verbal sorting classes by upper bound of the graphic standard deviation.
+SORTING_CLASSES = (
+    (0.35, "Very well sorted"),
+    (0.50, "Well sorted"),
+    (0.71, "Moderately well sorted"),
+    (1.00, "Moderately sorted"),
+    (2.00, "Poorly sorted"),
+    (4.00, "Very poorly sorted"),
+    (math.inf, "Extremely poorly sorted"),
+)
+SKEWNESS_CLASSES = (
+    (-0.3, "Very coarse skewed"),
+    (-0.1, "Coarse skewed"),
+    (0.1, "Symmetrical"),
+    (0.3, "Fine skewed"),
+    (math.inf, "Very fine skewed"),
+)
+
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*(µm|μm|um|microns?|mm|cm)?", re.IGNORECASE)
+
+
+def microns_to_phi(microns):
+    """Krumbein phi, ``-log2(d / 1 mm)``."""
+    return -math.log2(microns / 1000.0)
+
+
+@lru_cache(maxsize=1024)
+def parse_fraction(label):
+    """Parse a sieve fraction label into ``(coarse_um, fine_um)``.
+
+    Handles ranges ("2-1 mm", "1 mm - 63 µm", "500-125 µm") and open classes
+    (">2 mm", "<63 µm", "Pan"); an open bound is None. A number without a
+    unit takes the unit of the other bound. Returns None for labels that do
+    not describe a size class.
+    """
+    text = (label or "").strip()
+    if not text:
+        return None
+    if text.lower() in ("pan", "fines"):
+        return 0.0, None
+    sizes = _SIZE.findall(text)
+    if not sizes or len(sizes) > 2:
+        return None
+    units = [unit.lower() for _, unit in sizes if unit]
+    if not units:
+        return None
+    values = [float(value) * UNIT_MICRONS[(unit or units[-1]).lower()] for value, unit in sizes]
+    if len(values) == 2:
+        coarse, fine = max(values), min(values)
+        return (coarse, fine) if fine > 0 else None
+    if text.startswith("<"):
+        return values[0], None
+    if text.startswith(">"):
+        return None, values[0]
+    return None
+
+
+def fraction_phi(label):
+    """``(phi_lo, phi_hi)`` of a fraction, open ends closed by ``OPEN_CLASS_PHI``."""
+    bounds = parse_fraction(label)
+    if bounds is None:
+        return None
+    coarse, fine = bounds
+    if coarse == 0.0 and fine is None:  # pan below an unknown last sieve
+        return None
+    if coarse is None:
+        phi_hi = microns_to_phi(fine)
+        return phi_hi - OPEN_CLASS_PHI, phi_hi
+    phi_lo = microns_to_phi(coarse)
+    return phi_lo, microns_to_phi(fine) if fine else phi_lo + OPEN_CLASS_PHI
+
+
+@lru_cache(maxsize=1024)
+def _label_key(label):
+    return re.sub(r"\s+", "", (label or "").lower()).replace("μ", "µ")
+
+
+def sorting_class(sorting):
+    return next(label for bound, label in SORTING_CLASSES if sorting < bound)
+
+
+def skewness_class(skewness):
+    return next(label for bound, label in SKEWNESS_CLASSES if skewness < bound)
+
+
+@lru_cache(maxsize=256)
+def _layout(labels):
+    """Phi-ordered layout for a tuple of fraction labels, or None if they do not tile.
+
+    Returns ``(order, edges)``: the coarse-to-fine permutation of ``labels``
+    and the ``len(labels) + 1`` phi class edges. A pan following the finest
+    sieve takes that sieve as its upper bound.
+    """
+    spans = []
+    for label in labels:
+        bounds = parse_fraction(label)
+        if bounds == (0.0, None):
+            spans.append(None)
+            continue
+        span = fraction_phi(label)
+        if span is None:
+            return None
+        spans.append(span)
+    pans = [i for i, span in enumerate(spans) if span is None]
+    if len(pans) > 1 or (pans and len(spans) == 1):
+        return None
+    order = sorted((i for i, span in enumerate(spans) if span is not None), key=lambda i: spans[i])
+    edges = [spans[order[0]][0]] + [spans[i][1] for i in order]
+    for i, j in zip(order, order[1:]):
+        if not math.isclose(spans[i][1], spans[j][0], abs_tol=1e-6):
+            return None
+    if pans:
+        order.append(pans[0])
+        edges.append(edges[-1] + OPEN_CLASS_PHI)
+    return tuple(order), np.array(edges)
+
+
+def _initial_mass(processing):
+    """Dry mass the sample went into the sieve stack with, if recorded.
+
+    Older records only carry a hand-typed ``derived_metrics`` recovery; the
+    initial mass is backed out of it so recovery tracks later mass edits.
+    """
+    initial = processing.get("initial_dry_mass_g")
+    if isinstance(initial, (int, float)) and initial > 0:
+        return float(initial)
+    derived = processing.get("derived_metrics") or {}
+    total, recovery = derived.get("total_dry_mass_g"), derived.get("mass_recovery_percent")
+    if isinstance(total, (int, float)) and isinstance(recovery, (int, float)) and total > 0 and recovery > 0:
+        return total * 100.0 / recovery
+    return None
+
+
+def _mass(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def _percentile_phi(cumulative, edges, percent):
+    """Phi at which each row of ``cumulative`` (percent at ``edges``) reaches ``percent``.
+
+    Mass is taken as uniform in phi within a class, so the cumulative curve
+    is linear between edges.
+    """
+    rows = np.arange(len(cumulative))
+    upper = np.clip(np.argmax(cumulative >= percent - 1e-9, axis=1), 1, len(edges) - 1)
+    c_lo, c_hi = cumulative[rows, upper - 1], cumulative[rows, upper]
+    step = np.where(c_hi > c_lo, c_hi - c_lo, 1.0)
+    return edges[upper - 1] + (percent - c_lo) / step * (edges[upper] - edges[upper - 1])
+
+
+def batch_statistics(samples):
+    """Particle-size statistics for many samples in one vectorized pass per sieve layout.
+
+    Samples are grouped by their set of fraction labels, which is parsed
+    once per distinct layout; each group becomes a ``samples x fractions``
+    mass matrix from which weight percentages, cumulative curves, graphic
+    percentiles, Folk & Ward (1957) mean, sorting, skewness and kurtosis and
+    deviations from ``fraction_targets`` are computed with array operations.
+    Returns ``{sample_code: stats}``; samples without mass entries are left
+    out.
+    """
+    groups = defaultdict(list)
+    results = {}
+    for sample in samples:
+        processing = sample.get("processing") or {}
+        entries = [entry for entry in processing.get("mass_entries") or [] if entry.get("fraction")]
+        if entries:
+            groups[tuple(entry["fraction"] for entry in entries)].append((sample, processing, entries))
+
+    for labels, members in groups.items():
+        dry = np.array([[_mass(entry.get("dry_mass_g")) for entry in entries] for _, _, entries in members])
+        wet = np.array([[_mass(entry.get("wet_mass_g")) for entry in entries] for _, _, entries in members])
+        initial = np.array([_initial_mass(processing) or np.nan for _, processing, _ in members])
+        total_dry = np.nansum(dry, axis=1)
+        total_wet = np.nansum(wet, axis=1)
+        complete = ~np.isnan(dry).any(axis=1) & (total_dry > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            recovery = total_dry / initial * 100.0
+            percent = np.nan_to_num(dry) / np.where(total_dry > 0, total_dry, np.nan)[:, None] * 100.0
+            moisture = (total_wet - total_dry) / np.where(total_wet > 0, total_wet, np.nan) * 100.0
+
+        expected = np.full(dry.shape, np.nan)
+        for row, (_, processing, _) in enumerate(members):
+            targets = {
+                _label_key(target.get("fraction")): _mass(target.get("expected_percent"))
+                for target in processing.get("fraction_targets") or []
+            }
+            expected[row] = [targets.get(_label_key(label), np.nan) for label in labels]
+        deviation = percent - expected
+
+        layout = _layout(labels)
+        graphic = {}
+        if layout is not None:
+            order, edges = layout
+            cumulative = np.zeros((len(members), len(edges)))
+            cumulative[:, 1:] = np.cumsum(percent[:, list(order)], axis=1)
+            phi = {p: _percentile_phi(cumulative, edges, p) for p in PERCENTILES}
+            with np.errstate(invalid="ignore", divide="ignore"):
+                graphic = {
+                    "mean_phi": (phi[16] + phi[50] + phi[84]) / 3,
+                    "sorting_phi": (phi[84] - phi[16]) / 4 + (phi[95] - phi[5]) / 6.6,
+                    "skewness": (phi[16] + phi[84] - 2 * phi[50]) / (2 * (phi[84] - phi[16]))
+                    + (phi[5] + phi[95] - 2 * phi[50]) / (2 * (phi[95] - phi[5])),
+                    "kurtosis": (phi[95] - phi[5]) / (2.44 * (phi[75] - phi[25])),
+                }
+            graphic.update({f"phi{p}": values for p, values in phi.items()})
+
+        magnitude = np.where(np.isnan(deviation), -np.inf, np.abs(deviation)).max(axis=1)
+        columns = {
+            "total_dry_mass_g": _values(total_dry, 2),
+            "total_wet_mass_g": _values(total_wet, 2),
+            "moisture_percent": _values(moisture, 1),
+            "mass_recovery_percent": _values(recovery, 1),
+            "max_deviation_percent": _values(magnitude, 1),
+        }
+        percent_rows, expected_rows, deviation_rows = _values(percent, 1), _values(expected, 1), _values(deviation, 1)
+        bounds = [parse_fraction(label) for label in labels]
+        if layout is not None:
+            phi_edges = _values(edges[1:], 2)
+            cumulative_rows = _values(cumulative[:, 1:], 1)
+            graphic_rows = {key: _values(array, 2) for key, array in graphic.items()}
+
+        for row, (sample, _, _) in enumerate(members):
+            stats = {key: column[row] for key, column in columns.items()}
+            stats["complete"] = bool(complete[row])
+            stats["fractions"] = [
+                {
+                    "fraction": label,
+                    "bounds_um": bounds[j],
+                    "percent": percent_rows[row][j],
+                    "expected_percent": expected_rows[row][j],
+                    "deviation_percent": deviation_rows[row][j],
+                }
+                for j, label in enumerate(labels)
+            ]
+            stats["cumulative"] = stats["folk_ward"] = None
+            if layout is not None and complete[row]:
+                stats["cumulative"] = [
+                    {"fraction": labels[j], "phi": phi_edges[i], "percent": cumulative_rows[row][i]}
+                    for i, j in enumerate(order)
+                ]
+                values = {key: column[row] for key, column in graphic_rows.items()}
+                if values["sorting_phi"] is not None and values["skewness"] is not None:
+                    values["sorting_class"] = sorting_class(values["sorting_phi"])
+                    values["skewness_class"] = skewness_class(values["skewness"])
+                    values["mean_um"] = round(1000.0 * 2 ** -values["mean_phi"], 1)
+                    stats["folk_ward"] = values
+            results[sample["sample_code"]] = stats
+    return results
+
+
+def _values(array, digits):
+    """Round an array into (nested) lists of floats with None for missing values."""
+    rounded = np.round(array, digits) + 0.0
+    return _none_for_nan(np.where(np.isfinite(rounded), rounded, np.nan).tolist())
+
+
+def _none_for_nan(values):
+    if isinstance(values, list):
+        return [_none_for_nan(value) for value in values]
+    return None if values != values else values
+
+
+
+class GrainSizeIndex:
+    """Particle-size statistics for the catalog, recomputed in batches.
+
+    Catalog changes only mark a sample stale. The first lookup afterwards
+    recomputes every stale sample of the affected projects together with
+    ``batch_statistics``, so a project's statistics are refreshed in one
+    pass instead of once per page view.
+    """
+
+    def __init__(self, sample_index):
+        self.sample_index = sample_index
+        self.stats = {}
+        self.version = 0
+        self._stale = dict.fromkeys(sample_index.codes())
+        self._lock = RLock()
+        sample_index.subscribe(self.invalidate)
+
+    def invalidate(self, sample_code):
+        with self._lock:
+            self._stale[sample_code] = None
+
+    def _recompute(self, codes):
+        samples = []
+        for code in codes:
+            self._stale.pop(code, None)
+            self.stats.pop(code, None)
+            sample = self.sample_index.get(code)
+            if sample is not None:
+                samples.append(sample)
+        self.stats.update(batch_statistics(samples))
+        self.version += 1
+
+    def for_sample(self, sample_code):
+        with self._lock:
+            if sample_code in self._stale:
+                record = self.sample_index.record(sample_code)
+                project_ids = set(record.project_ids) if record is not None else set()
+                batch = [
+                    code for code in self._stale
+                    if code == sample_code
+                    or (project_ids and project_ids.intersection(self._project_ids(code)))
+                ]
+                self._recompute(batch)
+            return self.stats.get(sample_code)
+
+    def for_project(self, project_id):
+        """``{sample_code: stats}`` for every sample of a project with mass entries."""
+        codes = self.sample_index.codes_for_project(project_id)
+        with self._lock:
+            stale = [code for code in codes if code in self._stale]
+            if stale:
+                self._recompute(stale)
+            return {code: self.stats[code] for code in codes if code in self.stats}
+
+    def _project_ids(self, sample_code):
+        record = self.sample_index.record(sample_code)
+        return record.project_ids if record is not None else ()
@@ -0,0 +1,268 @@
+from dataclasses import dataclass
+from threading import RLock
+
+
+def _grams(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def parent_code(sample):
+    """The parent sample code, whether stored as a string or ``{"sample_code": ...}``."""
+    parent = (sample or {}).get("parent_sample")
+    if isinstance(parent, dict):
+        parent = parent.get("sample_code")
+    return parent if isinstance(parent, str) and parent else None
+
+
+@dataclass(frozen=True, slots=True)
+class Material:
+    """Mass bookkeeping of one sample, parsed once per write.
+
+    ``mass_g`` is the material the sample holds: the sum of its sieve
+    fractions once it has been sieved, otherwise ``quantity_g`` or the
+    initial dry mass. ``fractions`` are ``(label, dry mass)`` pairs;
+    ``disbursed`` are ``(fraction or None, grams)`` pairs.
+    """
+
+    mass_g: float
+    fractions: tuple
+    disbursed: tuple
+    parent_fraction: str
+
+    @classmethod
+    def from_sample(cls, sample):
+        processing = sample.get("processing") or {}
+        fractions = tuple(
+            (entry.get("fraction"), _grams(entry.get("dry_mass_g")))
+            for entry in processing.get("mass_entries") or []
+            if entry.get("fraction") and _grams(entry.get("dry_mass_g")) is not None
+        )
+        if fractions:
+            mass = sum(grams for _, grams in fractions)
+        else:
+            mass = _grams(sample.get("quantity_g"))
+            if mass is None:
+                mass = _grams(processing.get("initial_dry_mass_g"))
+        disbursed = tuple(
+            (entry.get("fraction"), _grams(entry.get("quantity_g")))
+            for entry in sample.get("disbursements") or []
+            if _grams(entry.get("quantity_g")) is not None
+        )
+        return cls(mass_g=mass, fractions=fractions, disbursed=disbursed, parent_fraction=sample.get("parent_fraction"))
+
+
+class SubsampleTree:
+    """Split-sample hierarchy stored as a closure table with mass rollups.
+
+    ``ancestors[code]`` and ``descendants[code]`` map every related sample to
+    its distance, so ancestor/descendant checks and depth-limited subtree
+    fetches are dictionary reads. Re-parenting a sample moves its whole
+    subtree by rewriting only the closure rows between the subtree and its
+    old and new ancestors.
+
+    Each sample's remaining mass (its material less what was split off into
+    child samples and what was disbursed) is kept alongside a running
+    subtree total, which is adjusted along the ancestor chain whenever a
+    sample's own remaining mass changes. A parent code that is not in the
+    catalog is kept as a placeholder node without mass. A ``parent_sample``
+    that would close a cycle is left out and kept in ``rejected``; it is
+    linked as soon as a later move makes it valid. ``version_of(code)``
+    changes whenever anything in the sample's split tree changes, since the
+    views show the whole tree from its root.
+    """
+
+    def __init__(self, sample_index):
+        self.sample_index = sample_index
+        self.parent = {}
+        self.children = {}
+        self.ancestors = {}
+        self.descendants = {}
+        self.material = {}
+        self.remaining = {}
+        self.subtree_remaining = {}
+        self.versions = {}
+        self.rejected = {}
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code, notify=False)
+        sample_index.subscribe(self.refresh)
+
+    def _node(self, code):
+        if code not in self.ancestors:
+            self.ancestors[code] = {}
+            self.descendants[code] = {}
+            self.children[code] = set()
+            self.subtree_remaining[code] = 0.0
+
+    def refresh(self, sample_code, notify=True):
+        with self._lock:
+            moved = self._apply(sample_code, notify)
+            # A link held back as a cycle may have become valid once ancestors moved.
+            while moved and self.rejected:
+                moved = False
+                for code, parent in list(self.rejected.items()):
+                    if parent != code and parent not in self.descendants.get(code, ()):
+                        moved |= self._apply(code, notify)
+
+    def _apply(self, sample_code, notify):
+        """Bring one sample's node up to date; returns whether its parent changed."""
+        sample = self.sample_index.get(sample_code)
+        material = Material.from_sample(sample) if sample is not None else None
+        parent = parent_code(sample)
+        self._node(sample_code)
+        if parent == sample_code or parent in self.descendants[sample_code]:
+            self.rejected[sample_code] = parent
+            parent = None  # a split cannot contain its own ancestor
+        else:
+            self.rejected.pop(sample_code, None)
+        old_parent = self.parent.get(sample_code)
+        if parent == old_parent and material == self.material.get(sample_code):
+            return False
+        before = self._members(sample_code)
+        if parent != old_parent:
+            self._move(sample_code, parent)
+        if material is None:
+            self.material.pop(sample_code, None)
+        else:
+            self.material[sample_code] = material
+        for code in {sample_code, old_parent, parent} - {None}:
+            self._update_remaining(code)
+        if material is None and not self.children[sample_code] and parent is None:
+            self._drop(sample_code)
+        if old_parent is not None and old_parent not in self.material and not self.children[old_parent]:
+            self._drop(old_parent)
+        if notify:
+            for code in before | self._members(sample_code):
+                self.versions[code] = self.versions.get(code, 0) + 1
+        return parent != old_parent
+
+    def version_of(self, sample_code):
+        return self.versions.get(sample_code, 0)
+
+    def _members(self, code):
+        """The root of ``code``'s split tree and everything below it."""
+        root = self.root_of(code)
+        return {root, *self.descendants.get(root, ())}
+
+    def _move(self, code, parent):
+        subtree = dict(self.descendants[code], **{code: 0})
+        total = self.subtree_remaining[code]
+        for ancestor in list(self.ancestors[code]):
+            self.subtree_remaining[ancestor] -= total
+            for node in subtree:
+                self.ancestors[node].pop(ancestor, None)
+                self.descendants[ancestor].pop(node, None)
+        old_parent = self.parent.pop(code, None)
+        if old_parent is not None:
+            self.children[old_parent].discard(code)
+        if parent is None:
+            return
+        self._node(parent)
+        self.parent[code] = parent
+        self.children[parent].add(code)
+        new_ancestors = dict({parent: 1}, **{ancestor: depth + 1 for ancestor, depth in self.ancestors[parent].items()})
+        for ancestor, depth in new_ancestors.items():
+            self.subtree_remaining[ancestor] += total
+            for node, offset in subtree.items():
+                self.ancestors[node][ancestor] = depth + offset
+                self.descendants[ancestor][node] = depth + offset
+
+    def _drop(self, code):
+        for table in (self.ancestors, self.descendants, self.children, self.subtree_remaining, self.remaining):
+            table.pop(code, None)
+
+    def _own_remaining(self, code):
+        material = self.material.get(code)
+        if material is None or material.mass_g is None:
+            return None
+        split = sum(
+            self.material[child].mass_g or 0.0 for child in self.children[code] if child in self.material
+        )
+        disbursed = sum(grams for _, grams in material.disbursed)
+        return max(material.mass_g - split - disbursed, 0.0)
+
+    def _update_remaining(self, code):
+        value = self._own_remaining(code)
+        delta = (value or 0.0) - (self.remaining.get(code) or 0.0)
+        self.remaining[code] = value
+        if delta:
+            self.subtree_remaining[code] += delta
+            for ancestor in self.ancestors[code]:
+                self.subtree_remaining[ancestor] += delta
+
+    def ancestors_of(self, code):
+        """Ancestors from the root down to the direct parent."""
+        ancestors = self.ancestors.get(code, {})
+        return sorted(ancestors, key=ancestors.get, reverse=True)
+
+    def root_of(self, code):
+        ancestors = self.ancestors_of(code)
+        return ancestors[0] if ancestors else code
+
+    def descendants_of(self, code, max_depth=None):
+        """``(code, depth)`` pairs below ``code``, shallowest first."""
+        return sorted(
+            (
+                (descendant, depth)
+                for descendant, depth in self.descendants.get(code, {}).items()
+                if max_depth is None or depth <= max_depth
+            ),
+            key=lambda item: (item[1], item[0]),
+        )
+
+    def is_descendant(self, code, ancestor):
+        return code in self.descendants.get(ancestor, ())
+
+    def rollup(self, code):
+        material = self.material.get(code)
+        with self._lock:
+            return {
+                "sample_code": code,
+                "mass_g": material.mass_g if material else None,
+                "disbursed_g": sum((grams for _, grams in material.disbursed), 0.0) if material else 0.0,
+                "remaining_g": self.remaining.get(code),
+                "subtree_remaining_g": self.subtree_remaining.get(code, 0.0),
+                "descendants": len(self.descendants.get(code, ())),
+                "depth": len(self.ancestors.get(code, ())),
+            }
+
+    def subtree(self, code, max_depth=None):
+        """Nested rollups of ``code`` and its descendants down to ``max_depth`` levels."""
+        with self._lock:
+            node = dict(self.rollup(code), in_catalog=code in self.material)
+            if max_depth is not None and max_depth <= 0:
+                node["children"] = []
+                node["truncated"] = bool(self.children.get(code))
+                return node
+            next_depth = None if max_depth is None else max_depth - 1
+            node["children"] = [self.subtree(child, next_depth) for child in sorted(self.children.get(code, ()))]
+            node["truncated"] = False
+            return node
+
+    def fraction_inventory(self, code):
+        """Sieve fractions of a sample with what was split off or disbursed from each."""
+        material = self.material.get(code)
+        if material is None:
+            return []
+        with self._lock:
+            used = {}
+            for child in self.children.get(code, ()):
+                child_material = self.material.get(child)
+                if child_material is not None and child_material.parent_fraction:
+                    used[child_material.parent_fraction] = used.get(child_material.parent_fraction, 0.0) + (
+                        child_material.mass_g or 0.0
+                    )
+        disbursed = {}
+        for fraction, grams in material.disbursed:
+            if fraction:
+                disbursed[fraction] = disbursed.get(fraction, 0.0) + grams
+        return [
+            {
+                "fraction": fraction,
+                "mass_g": grams,
+                "split_g": used.get(fraction, 0.0),
+                "disbursed_g": disbursed.get(fraction, 0.0),
+                "remaining_g": max(grams - used.get(fraction, 0.0) - disbursed.get(fraction, 0.0), 0.0),
+            }
+            for fraction, grams in material.fractions
+        ]
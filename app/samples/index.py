@@ -0,0 +1,205 @@
+from collections import defaultdict
+from collections.abc import Mapping
+from threading import RLock
+
+from app.samples.records import SampleRecord
+
+
+def _normalize(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+class DictSampleStore(Mapping):
+    """Default primary store: raw sample dicts and parsed records in memory."""
+
+    def __init__(self):
+        self.by_code = {}
+        self.records = {}
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def __iter__(self):
+        return iter(self.by_code)
+
+    def __contains__(self, sample_code):
+        return sample_code in self.by_code
+
+    def __getitem__(self, sample_code):
+        return self.by_code[sample_code]
+
+    def record(self, sample_code):
+        return self.records.get(sample_code)
+
+    def put(self, sample, record):
+        self.by_code[record.sample_code] = sample
+        self.records[record.sample_code] = record
+
+    def remove(self, sample_code):
+        self.records.pop(sample_code, None)
+        return self.by_code.pop(sample_code, None)
+
+
+class SampleIndex:
+    """Hash indexes over the sample catalog.
+
+    Samples are indexed by ``sample_code`` and ``igsn`` (unique) and by
+    associated project id, status, storage location and metadata flag
+    (one-to-many). The one-to-many indexes map to insertion-ordered dicts used
+    as ordered sets so filtered listings keep catalog order without sorting.
+
+    Each indexed sample also gets a parsed ``SampleRecord``; the index keys
+    are taken from that record, which lets ``update`` and ``delete`` unhook a
+    sample even after its raw dict was edited in place.
+
+    Raw samples and records live in a pluggable primary ``store`` (a mapping
+    of sample code to raw sample with ``record``/``put``/``remove``), so the
+    in-memory dicts can be swapped for a more compact backend.
+
+    Callbacks registered with ``subscribe`` receive the sample code after
+    every insert or delete.
+    """
+
+    def __init__(self, samples=(), store=None):
+        self.store = store if store is not None else DictSampleStore()
+        self.by_igsn = {}
+        self.by_project = defaultdict(dict)
+        self.by_status = defaultdict(dict)
+        self.by_storage = defaultdict(dict)
+        self.by_flag = defaultdict(dict)
+        self._lock = RLock()
+        self._listeners = []
+        for sample in samples:
+            self.insert(sample)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, sample_code):
+        return sample_code in self.store
+
+    def use_store(self, store):
+        """Move every indexed sample into ``store`` and make it the primary store."""
+        with self._lock:
+            for code in list(self.store):
+                store.put(self.store[code], self.store.record(code))
+            self.store = store
+
+    def all(self):
+        return list(self.store.values())
+
+    def codes(self):
+        return list(self.store)
+
+    def get(self, sample_code):
+        return self.store.get(sample_code)
+
+    def record(self, sample_code):
+        return self.store.record(sample_code)
+
+    def get_by_igsn(self, igsn):
+        code = self.by_igsn.get(_normalize(igsn))
+        return self.store.get(code) if code else None
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, sample_code):
+        for callback in self._listeners:
+            callback(sample_code)
+
+    def insert(self, sample):
+        record = SampleRecord.from_dict(sample)
+        code = record.sample_code
+        with self._lock:
+            if code in self.store:
+                self._unhook(code)
+            self.store.put(sample, record)
+            if record.igsn:
+                self.by_igsn[_normalize(record.igsn)] = code
+            for project_id in record.project_ids:
+                self.by_project[project_id][code] = None
+            if record.status:
+                self.by_status[_normalize(record.status)][code] = None
+            if record.storage_location:
+                self.by_storage[record.storage_location][code] = None
+            for flag in record.metadata_flags:
+                self.by_flag[flag][code] = None
+        self._notify(code)
+
+    def update(self, sample):
+        self.insert(sample)
+
+    def delete(self, sample_code):
+        sample = self._unhook(sample_code)
+        if sample is not None:
+            self._notify(sample_code)
+        return sample
+
+    def _unhook(self, sample_code):
+        with self._lock:
+            record = self.store.record(sample_code)
+            if record is None:
+                return None
+            sample = self.store.remove(sample_code)
+            igsn = _normalize(record.igsn)
+            if igsn and self.by_igsn.get(igsn) == sample_code:
+                del self.by_igsn[igsn]
+            for project_id in record.project_ids:
+                self._discard(self.by_project, project_id, sample_code)
+            self._discard(self.by_status, _normalize(record.status), sample_code)
+            self._discard(self.by_storage, record.storage_location, sample_code)
+            for flag in record.metadata_flags:
+                self._discard(self.by_flag, flag, sample_code)
+            return sample
+
+    @staticmethod
+    def _discard(index, key, sample_code):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(sample_code, None)
+        if not bucket:
+            del index[key]
+
+    def codes_for_project(self, project_id):
+        return list(self.by_project.get(project_id, ()))
+
+    def codes_with_status(self, status):
+        return list(self.by_status.get(_normalize(status), ()))
+
+    def codes_at_location(self, storage_location):
+        return list(self.by_storage.get(storage_location, ()))
+
+    def filter(self, project_id=None, status=None, storage_location=None, flag=None):
+        """Return samples matching every given criterion, in catalog order."""
+        codes = self.filter_codes(
+            project_id=project_id, status=status, storage_location=storage_location, flag=flag
+        )
+        return [self.store[code] for code in codes]
+
+    def filter_codes(self, project_id=None, status=None, storage_location=None, flag=None):
+        return list(
+            self.iter_codes(project_id=project_id, status=status, storage_location=storage_location, flag=flag)
+        )
+
+    def iter_codes(self, project_id=None, status=None, storage_location=None, flag=None):
+        """Yield matching sample codes lazily, intersecting from the smallest bucket."""
+        buckets = []
+        if project_id is not None:
+            buckets.append(self.by_project.get(project_id, {}))
+        if status:
+            buckets.append(self.by_status.get(_normalize(status), {}))
+        if storage_location:
+            buckets.append(self.by_storage.get(storage_location, {}))
+        if flag:
+            buckets.append(self.by_flag.get(flag, {}))
+        if not buckets:
+            yield from list(self.store)
+            return
+
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        for code in list(smallest):
+            if all(code in bucket for bucket in others):
+                yield code
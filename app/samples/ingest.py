@@ -0,0 +1,429 @@
+import csv
+import io
+from copy import deepcopy
+from datetime import date, datetime
+
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+class IngestError(Exception):
+    """Raised when an upload cannot be read at all (bad format, missing columns)."""
+
+
+class RowError(ValueError):
+    """Raised by a row parser when a single row fails validation."""
+
+
+class BatchWriteError(Exception):
+    """Raised by ``write_batch`` when storage rejects a batch; nothing in it was saved."""
+
+
+# -- readers ---------------------------------------------------------------
+
+def iter_csv_rows(stream):
+    """Yield ``(row_number, {column: value})`` from a binary CSV stream."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        if not reader.fieldnames:
+            raise IngestError("The uploaded CSV file is empty.")
+        reader.fieldnames = [_column_name(name) for name in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise IngestError(f"Could not read the CSV file near line {reader.line_num}: {exc}") from exc
+
+
+def iter_xlsx_rows(stream):
+    """Yield ``(row_number, {column: value})`` from the first worksheet of an XLSX file.
+
+    Uses openpyxl's read-only mode, which streams rows from the archive
+    instead of loading the whole workbook.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise IngestError("XLSX uploads require the openpyxl package; upload a CSV export instead.") from exc
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise IngestError("The uploaded workbook is empty.")
+        columns = [_column_name(name) for name in header]
+        for row_number, values in enumerate(rows, start=2):
+            if values is None or all(value in (None, "") for value in values):
+                continue
+            yield row_number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+READERS = {
+    ".csv": iter_csv_rows,
+    ".xlsx": iter_xlsx_rows,
+}
+
+
+def reader_for(filename):
+    for extension, reader in READERS.items():
+        if (filename or "").lower().endswith(extension):
+            return reader
+    raise IngestError(f"Unsupported file type for {filename!r}; upload a CSV or XLSX file.")
+
+
+def _column_name(name):
+    return str(name or "").strip().lower().replace(" ", "_")
+
+
+# -- field helpers ---------------------------------------------------------
+
+def _text(row, column, required=False):
+    value = row.get(column)
+    value = value.strip() if isinstance(value, str) else value
+    if value in (None, ""):
+        if required:
+            raise RowError(f"Missing required column '{column}'.")
+        return None
+    return str(value)
+
+
+def _number(row, column, required=False):
+    value = _text(row, column, required)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError as exc:
+        raise RowError(f"'{column}' must be a number (got {value!r}).") from exc
+    return int(number) if number.is_integer() else number
+
+
+def _date(row, column):
+    value = row.get(column)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = _text(row, column)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise RowError(f"'{column}' must be a YYYY-MM-DD date (got {value!r}).") from exc
+
+
+def _list(row, column):
+    value = _text(row, column)
+    return [item.strip() for item in value.replace(",", ";").split(";") if item.strip()] if value else []
+
+
+def _new_sample(sample_code):
+    return {
+        "sample_code": sample_code,
+        "status": "active",
+        "metadata_flags": ["partial"],
+        "associated_projects": [],
+        "attachments": {"images": [], "notes": [], "instrument_logs": []},
+        "processing": None,
+        "physical_analysis": None,
+        "imaging": {"sessions": [], "next_steps": None},
+        "geochemistry": None,
+        "correlation": {"targets": [], "checklist": [], "summary": ""},
+        "workflow_status": [],
+    }
+
+
+# -- row parsers -----------------------------------------------------------
+# Each parser validates one row and returns a function that applies it to a
+# (copied) sample dict. Only the collection workbook may create samples.
+
+def _parse_collection_row(row):
+    collected_on = _date(row, "collected_on")
+    depth_cm = _number(row, "depth_cm")
+    lat, lon = _number(row, "lat"), _number(row, "lon")
+    if (lat is None) != (lon is None):
+        raise RowError("GPS needs both 'lat' and 'lon'.")
+    if lat is not None and not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise RowError("GPS coordinates are out of range.")
+    project_id = _number(row, "project_id")
+    fields = {
+        "nickname": _text(row, "nickname"),
+        "description": _text(row, "description"),
+        "status": _text(row, "status"),
+        "storage_location": _text(row, "storage_location"),
+        "igsn": _text(row, "igsn"),
+    }
+
+    def apply(sample):
+        for key, value in fields.items():
+            if value is not None:
+                sample[key] = value
+        if collected_on:
+            sample["collected_on"] = collected_on
+        collectors = _list(row, "collected_by")
+        if collectors:
+            sample["collected_by"] = collectors
+        site = sample.setdefault("site", {}) or {}
+        for key in ("site_name", "station", "stratum", "depositional_context"):
+            if _text(row, key):
+                site[key] = _text(row, key)
+        if depth_cm is not None:
+            site["depth_cm"] = depth_cm
+        if lat is not None:
+            site["gps"] = {"lat": lat, "lon": lon, "datum": _text(row, "datum") or "WGS84"}
+        if project_id is not None:
+            site.setdefault("project", project_id)
+            links = sample.setdefault("associated_projects", [])
+            if all(link.get("project_id") != project_id for link in links):
+                links.append({"project_id": project_id, "role": _text(row, "project_role") or "Primary"})
+        sample["site"] = site
+        if collected_on and not any(step.get("name") == "Collection" for step in sample.get("workflow_status") or []):
+            sample.setdefault("workflow_status", []).append(
+                {"name": "Collection", "state": "Complete", "updated": collected_on.isoformat()}
+            )
+
+    return apply
+
+
+def _parse_processing_row(row):
+    fraction = _text(row, "fraction", required=True)
+    wet_mass = _number(row, "wet_mass_g")
+    dry_mass = _number(row, "dry_mass_g")
+    expected = _number(row, "expected_percent")
+    initial_mass = _number(row, "initial_dry_mass_g")
+    if wet_mass is None and dry_mass is None and expected is None:
+        raise RowError("Provide a mass or an expected percent for the fraction.")
+    for value in (wet_mass, dry_mass, expected, initial_mass):
+        if value is not None and value < 0:
+            raise RowError("Masses and percentages cannot be negative.")
+
+    def apply(sample):
+        processing = sample.get("processing") or {"sieve_stack": [], "fraction_targets": [], "mass_entries": []}
+        if wet_mass is not None or dry_mass is not None:
+            entries = [e for e in processing.setdefault("mass_entries", []) if e.get("fraction") != fraction]
+            entries.append({"fraction": fraction, "wet_mass_g": wet_mass, "dry_mass_g": dry_mass})
+            processing["mass_entries"] = entries
+        if expected is not None:
+            targets = [t for t in processing.setdefault("fraction_targets", []) if t.get("fraction") != fraction]
+            targets.append({"fraction": fraction, "expected_percent": expected})
+            processing["fraction_targets"] = targets
+        if initial_mass is not None:
+            processing["initial_dry_mass_g"] = initial_mass
+        sample["processing"] = processing
+
+    return apply
+
+
+def _parse_physical_row(row):
+    fields = {
+        "density_g_cc": _number(row, "density_g_cc"),
+        "clast_size": _text(row, "clast_size"),
+        "componentry_summary": _text(row, "componentry_summary"),
+        "particle_size_distribution": _text(row, "particle_size_distribution"),
+    }
+    upload = _text(row, "upload_filename")
+    if not upload and all(value is None for value in fields.values()):
+        raise RowError("Row has no physical analysis values.")
+
+    def apply(sample):
+        physical = sample.get("physical_analysis") or {"uploads": []}
+        physical.update({key: value for key, value in fields.items() if value is not None})
+        if upload:
+            uploads = [u for u in physical.setdefault("uploads", []) if u.get("filename") != upload]
+            uploads.append({"filename": upload, "status": _text(row, "upload_status") or "Uploaded"})
+            physical["uploads"] = uploads
+        sample["physical_analysis"] = physical
+
+    return apply
+
+
+def _parse_geochem_row(row):
+    raw_upload = _text(row, "raw_upload")
+    processed_upload = _text(row, "processed_upload")
+    standards = _list(row, "reference_standards")
+    qa_notes = _text(row, "qa_notes")
+    if not (raw_upload or processed_upload or standards or qa_notes):
+        raise RowError("Row has no geochemistry values.")
+
+    def apply(sample):
+        geochem = sample.get("geochemistry") or {
+            "raw_uploads": [],
+            "processed_uploads": [],
+            "reference_standards": [],
+            "qa_notes": "",
+            "auto_processing": "Enabled - converts raw XRF to oxide percentages",
+        }
+        for key, value in (("raw_uploads", raw_upload), ("processed_uploads", processed_upload)):
+            if value and value not in geochem.setdefault(key, []):
+                geochem[key].append(value)
+        for standard in standards:
+            if standard not in geochem.setdefault("reference_standards", []):
+                geochem["reference_standards"].append(standard)
+        if qa_notes:
+            geochem["qa_notes"] = qa_notes
+        sample["geochemistry"] = geochem
+
+    return apply
+
+
+def _parse_correlation_row(row):
+    target_code = _text(row, "target_sample_code", required=True)
+    target = {
+        "sample_code": target_code,
+        "project": _text(row, "target_project"),
+        "basis": _text(row, "basis") or "Unspecified",
+        "confidence": _text(row, "confidence") or "Moderate",
+    }
+
+    def apply(sample):
+        correlation = sample.get("correlation") or {"targets": [], "checklist": [], "summary": ""}
+        targets = [t for t in correlation.setdefault("targets", []) if t.get("sample_code") != target_code]
+        targets.append(target)
+        correlation["targets"] = targets
+        sample["correlation"] = correlation
+
+    return apply
+
+
+WORKBOOKS = {
+    "collection": {"name": "Collection Workbook", "filename": "collection_template.xlsx", "parser": _parse_collection_row},
+    "processing": {"name": "Processing & Preparation", "filename": "processing_template.xlsx", "parser": _parse_processing_row},
+    "physical": {"name": "Physical Analysis", "filename": "physical_analysis_template.xlsx", "parser": _parse_physical_row},
+    "geochem": {"name": "Geochemical Analysis", "filename": "geochem_template.xlsx", "parser": _parse_geochem_row},
+    "correlation": {"name": "Correlation Workbook", "filename": "correlation_template.xlsx", "parser": _parse_correlation_row},
+}
+
+
+# -- pipeline --------------------------------------------------------------
+
+class IngestReport:
+    """Running totals and the per-row error report for one upload."""
+
+    def __init__(self, workbook, filename):
+        self.workbook = workbook
+        self.filename = filename
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.samples_created = 0
+        self.samples_updated = 0
+        self.batches_written = 0
+        self.error_count = 0
+        self.errors = []
+        self.finished = False
+
+    def add_error(self, row_number, sample_code, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "sample_code": sample_code, "message": message})
+
+    def as_dict(self):
+        return {
+            "workbook": self.workbook,
+            "filename": self.filename,
+            "rows_read": self.rows_read,
+            "rows_imported": self.rows_imported,
+            "samples_created": self.samples_created,
+            "samples_updated": self.samples_updated,
+            "batches_written": self.batches_written,
+            "error_count": self.error_count,
+            "errors": list(self.errors),
+            "finished": self.finished,
+        }
+
+
+def _igsn_key(igsn):
+    return igsn.strip().lower()
+
+
+def ingest_rows(rows, workbook, lookup, write_batch, filename=None, batch_size=DEFAULT_BATCH_SIZE, progress=None,
+                lookup_igsn=None):
+    """Validate and import rows from one workbook in bounded-size batches.
+
+    ``rows`` yields ``(row_number, row_dict)``; ``lookup(code)`` returns the
+    current raw sample or None; ``write_batch(samples)`` must persist and
+    index a list of updated samples in one transaction, raising
+    ``BatchWriteError`` if storage rejects it. Only the current batch of
+    touched samples is held in memory, so memory stays bounded by
+    ``batch_size`` regardless of file length. ``progress(report)`` is called
+    after every batch.
+
+    IGSNs are unique: a row is rejected if its IGSN belongs to another sample
+    in the catalog (``lookup_igsn(igsn)`` returns the owning raw sample or
+    None) or was claimed by another sample earlier in the same upload.
+    """
+    if workbook not in WORKBOOKS:
+        raise IngestError(f"Unknown workbook type {workbook!r}.")
+    parser = WORKBOOKS[workbook]["parser"]
+    creates_samples = workbook == "collection"
+    report = IngestReport(workbook, filename)
+    pending = {}
+    pending_rows = {}
+    created = set()
+    claimed_igsns = {}
+
+    def flush():
+        if not pending:
+            return
+        try:
+            write_batch(list(pending.values()))
+        except BatchWriteError as exc:
+            for sample_code, row_numbers in pending_rows.items():
+                for row_number in row_numbers:
+                    report.add_error(row_number, sample_code, f"Could not save this row's batch: {exc}")
+                report.rows_imported -= len(row_numbers)
+            for key, (owner, _) in list(claimed_igsns.items()):
+                if owner in pending:
+                    del claimed_igsns[key]
+        else:
+            report.samples_created += len(created)
+            report.samples_updated += len(pending) - len(created)
+            report.batches_written += 1
+        pending.clear()
+        pending_rows.clear()
+        created.clear()
+        if progress:
+            progress(report)
+
+    for row_number, row in rows:
+        report.rows_read += 1
+        sample_code = None
+        try:
+            sample_code = _text(row, "sample_code", required=True)
+            apply = parser(row)
+            igsn = _text(row, "igsn")
+            if igsn is not None:
+                owner, owner_row = claimed_igsns.get(_igsn_key(igsn), (None, None))
+                if owner is not None and owner != sample_code:
+                    raise RowError(f"IGSN {igsn} is already used by {owner} on row {owner_row} of this upload.")
+                existing = lookup_igsn(igsn) if lookup_igsn else None
+                if existing is not None and existing.get("sample_code") != sample_code:
+                    raise RowError(f"IGSN {igsn} is already registered to sample {existing.get('sample_code')}.")
+            sample = pending.get(sample_code)
+            if sample is None:
+                current = lookup(sample_code)
+                if current is None and not creates_samples:
+                    raise RowError(f"Sample {sample_code} does not exist; import its collection row first.")
+                sample = deepcopy(current) if current is not None else _new_sample(sample_code)
+                if current is None:
+                    created.add(sample_code)
+            apply(sample)
+        except RowError as exc:
+            report.add_error(row_number, sample_code, str(exc))
+            continue
+        if igsn is not None:
+            claimed_igsns.setdefault(_igsn_key(igsn), (sample_code, row_number))
+        pending[sample_code] = sample
+        pending_rows.setdefault(sample_code, []).append(row_number)
+        report.rows_imported += 1
+        if len(pending) >= batch_size:
+            flush()
+
+    flush()
+    report.finished = True
+    if progress:
+        progress(report)
+    return report
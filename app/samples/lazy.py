@@ -0,0 +1,51 @@
+from collections.abc import Mapping
+from threading import RLock
+
+
+class LazyMapping(Mapping):
+    """Read-only mapping whose derived fields are built on first access.
+
+    ``source`` holds the eagerly computed values. ``fields`` maps a key to
+    ``builder(mapping)``, which runs the first time that key is read; the
+    result is memoized for the lifetime of the mapping. A derived field
+    shadows a ``source`` key of the same name, so builders that need the
+    underlying value read it from ``mapping.source``.
+
+    Instances are shared between requests and threads, so builders run under
+    a per-mapping lock (re-entrant, as one field may read another).
+    """
+
+    def __init__(self, source, fields):
+        self.source = source
+        self.fields = fields
+        self._computed = {}
+        self._lock = RLock()
+
+    def __getitem__(self, key):
+        try:
+            return self._computed[key]
+        except KeyError:
+            pass
+        builder = self.fields.get(key)
+        if builder is None:
+            return self.source[key]
+        with self._lock:
+            if key not in self._computed:
+                self._computed[key] = builder(self)
+            return self._computed[key]
+
+    def __contains__(self, key):
+        return key in self.fields or key in self.source
+
+    def __iter__(self):
+        yield from self.fields
+        for key in self.source:
+            if key not in self.fields:
+                yield key
+
+    def __len__(self):
+        return len(self.fields) + sum(1 for key in self.source if key not in self.fields)
+
+    def computed(self):
+        """Names of the derived fields built so far."""
+        return tuple(self._computed)
@@ -0,0 +1,94 @@
+from bisect import bisect_left, insort
+from math import log2
+from threading import RLock
+
+
+class SampleOrderings:
+    """Maintained sort orders and running totals over the sample index.
+
+    Each sort key keeps an ascending list of ``(key, sample code)`` entries
+    updated by bisection on every sample write, and on writes to a project
+    the sample belongs to (keys may read project fields such as the title).
+    Descending order is read from the same list back to front.
+    ``workflow_total`` is the running number of workflow entries over the
+    catalog.
+
+    An unfiltered page is a slice of one list. Filtered pages either sort a
+    small candidate set or walk the list in order, so no request sorts the
+    whole catalog.
+    """
+
+    def __init__(self, sample_index, sort_keys, project_registry=None):
+        self.sample_index = sample_index
+        self.sort_keys = sort_keys
+        self.orders = {name: [] for name in sort_keys}
+        self.workflow_total = 0
+        self._entries = {}
+        self._workflow = {}
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code)
+        sample_index.subscribe(self.refresh)
+        if project_registry is not None:
+            project_registry.subscribe(self.refresh_project)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def refresh(self, sample_code):
+        with self._lock:
+            for name, entry in self._entries.pop(sample_code, {}).items():
+                order = self.orders[name]
+                del order[bisect_left(order, entry)]
+            self.workflow_total -= self._workflow.pop(sample_code, 0)
+            record = self.sample_index.record(sample_code)
+            if record is None:
+                return
+            entries = {name: (key(record), sample_code) for name, key in self.sort_keys.items()}
+            for name, entry in entries.items():
+                insort(self.orders[name], entry)
+            self._entries[sample_code] = entries
+            self._workflow[sample_code] = record.workflow_count
+            self.workflow_total += record.workflow_count
+
+    def refresh_project(self, project_id):
+        for sample_code in self.sample_index.codes_for_project(project_id):
+            self.refresh(sample_code)
+
+    def select(self, sort_by, descending, start, limit, candidates=None, predicate=None):
+        """Return ``(page codes, matching count, matching workflow entries)``.
+
+        ``candidates`` (a set of codes from the index filters) and
+        ``predicate(code)`` narrow the samples; without either the page is a
+        slice of the maintained order.
+        """
+        with self._lock:
+            order = self.orders[sort_by]
+            if candidates is None and predicate is None:
+                if descending:
+                    stop = max(len(order) - start, 0)
+                    entries = order[max(stop - limit, 0):stop][::-1]
+                else:
+                    entries = order[start:start + limit]
+                return [code for _, code in entries], len(order), self.workflow_total
+
+            if candidates is not None and len(candidates) * log2(len(candidates) + 1) < len(order):
+                entries = self._entries
+                walk = sorted(
+                    (code for code in candidates if code in entries),
+                    key=lambda code: entries[code][sort_by],
+                    reverse=descending,
+                )
+            else:
+                walk = (code for _, code in (reversed(order) if descending else order))
+            page, total, workflow = [], 0, 0
+            for code in walk:
+                if candidates is not None and code not in candidates:
+                    continue
+                if predicate is not None and not predicate(code):
+                    continue
+                if start <= total < start + limit:
+                    page.append(code)
+                total += 1
+                workflow += self._workflow[code]
+            return page, total, workflow
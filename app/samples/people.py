@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from threading import RLock
+
+from app.projects.registry import member_key
+
+
+ROLE_COLLECTOR = "Field Collector"
+ROLE_PI = "Project PI"
+ROLE_COLLABORATOR = "Collaborator"
+
+
+@dataclass(frozen=True, slots=True)
+class Person:
+    key: str
+    full_name: str
+    slug: str
+
+
+@dataclass(frozen=True, slots=True)
+class SampleLink:
+    """One person attached to a sample, in sample-view order.
+
+    ``position`` is the index in the sample's ``collected_by`` list for
+    collectors; ``project_id`` is set for project PIs and collaborators.
+    """
+
+    person: Person
+    role: str
+    position: int = None
+    project_id: int = None
+
+
+class PeopleGraph:
+    """People, project membership and sample collection kept as a graph.
+
+    Person nodes are keyed like the project registry's member sets
+    (case- and whitespace-insensitive names). Project edges carry the
+    member's role (owner as PI, then collaborators); sample edges link a
+    sample to its collectors and to its projects. Both sides are updated
+    from the sample index and project registry subscriptions, so
+    neighbourhood queries are dictionary lookups and no request re-parses
+    collaborator strings. A person left without project or sample edges is
+    dropped; slugs are unique, with a numeric suffix on collision.
+    """
+
+    def __init__(self, sample_index, project_registry):
+        self.sample_index = sample_index
+        self.project_registry = project_registry
+        self.people = {}
+        self.by_slug = {}
+        self.project_members = {}
+        self.person_projects = {}
+        self.sample_collectors = {}
+        self.person_samples = {}
+        self.sample_projects = {}
+        self.project_samples = {}
+        self._lock = RLock()
+        for project in project_registry.all():
+            self.refresh_project(project.id)
+        for sample_code in sample_index.codes():
+            self.refresh_sample(sample_code)
+        project_registry.subscribe(self.refresh_project)
+        sample_index.subscribe(self.refresh_sample)
+
+    def _person(self, name):
+        key = member_key(name)
+        if not key:
+            return None
+        person = self.people.get(key)
+        if person is None:
+            base = "-".join(key.split())
+            slug, suffix = base, 2
+            while slug in self.by_slug:
+                slug, suffix = f"{base}-{suffix}", suffix + 1
+            person = Person(key=key, full_name=" ".join(name.split()), slug=slug)
+            self.people[key] = person
+            self.by_slug[slug] = person
+        return person
+
+    def _prune(self, people):
+        """Forget the people in ``people`` that no longer have any project or sample edge."""
+        for person in people:
+            if self.person_projects.get(person.key) or self.person_samples.get(person.key):
+                continue
+            self.person_projects.pop(person.key, None)
+            self.person_samples.pop(person.key, None)
+            if self.people.get(person.key) is person:
+                del self.people[person.key]
+                del self.by_slug[person.slug]
+
+    def refresh_project(self, project_id):
+        project = self.project_registry.get(project_id)
+        with self._lock:
+            released = [person for person, _ in self.project_members.pop(project_id, ())]
+            for person in released:
+                projects = self.person_projects.get(person.key)
+                if projects is not None:
+                    projects.pop(project_id, None)
+            if project is None:
+                self._prune(released)
+                return
+            members = []
+            seen = set()
+            names = [(project.owner, ROLE_PI)] + [(name, ROLE_COLLABORATOR) for name in project.collaborator_names]
+            for name, role in names:
+                person = self._person(name)
+                if person is None or person.key in seen:
+                    continue
+                seen.add(person.key)
+                members.append((person, role))
+                self.person_projects.setdefault(person.key, {})[project_id] = role
+            self.project_members[project_id] = tuple(members)
+            self._prune(released)
+
+    def refresh_sample(self, sample_code):
+        sample = self.sample_index.get(sample_code)
+        with self._lock:
+            released = [person for _, person in self.sample_collectors.pop(sample_code, ())]
+            for person in released:
+                self.person_samples.get(person.key, set()).discard(sample_code)
+            for project_id in self.sample_projects.pop(sample_code, ()):
+                self.project_samples.get(project_id, set()).discard(sample_code)
+            if sample is None:
+                self._prune(released)
+                return
+            collectors = []
+            for position, name in enumerate(sample.get("collected_by") or []):
+                person = self._person(name) if isinstance(name, str) else None
+                if person is None:
+                    continue
+                collectors.append((position, person))
+                self.person_samples.setdefault(person.key, set()).add(sample_code)
+            self.sample_collectors[sample_code] = tuple(collectors)
+            project_ids = tuple(
+                link.get("project_id") for link in sample.get("associated_projects") or []
+                if link.get("project_id") is not None
+            )
+            self.sample_projects[sample_code] = project_ids
+            for project_id in project_ids:
+                self.project_samples.setdefault(project_id, set()).add(sample_code)
+            self._prune(released)
+
+    def person(self, name):
+        return self.people.get(member_key(name))
+
+    def links_for_sample(self, sample_code):
+        """Collectors, then each linked project's PI and collaborators."""
+        links = [
+            SampleLink(person=person, role=ROLE_COLLECTOR, position=position)
+            for position, person in self.sample_collectors.get(sample_code, ())
+        ]
+        for project_id in self.sample_projects.get(sample_code, ()):
+            links.extend(
+                SampleLink(person=person, role=role, project_id=project_id)
+                for person, role in self.project_members.get(project_id, ())
+            )
+        return links
+
+    def projects_for(self, person_key):
+        """``project_id -> role`` for every project the person belongs to."""
+        return dict(self.person_projects.get(person_key, {}))
+
+    def samples_collected_by(self, person_key):
+        return frozenset(self.person_samples.get(person_key, ()))
+
+    def samples_in_projects_of(self, person_key):
+        codes = set()
+        for project_id in self.person_projects.get(person_key, ()):
+            codes.update(self.project_samples.get(project_id, ()))
+        return codes
+
+    def coworkers(self, person_key, project_ids=None, sample_codes=None):
+        """``person_key -> number of shared projects and samples`` for everyone the person works with.
+
+        ``project_ids`` and ``sample_codes`` limit the count to those projects
+        and collected samples (e.g. the ones the viewer may see).
+        """
+        counts = {}
+        for project_id in self.person_projects.get(person_key, ()) if project_ids is None else project_ids:
+            for person, _ in self.project_members.get(project_id, ()):
+                counts[person.key] = counts.get(person.key, 0) + 1
+        for sample_code in self.person_samples.get(person_key, ()) if sample_codes is None else sample_codes:
+            for _, person in self.sample_collectors.get(sample_code, ()):
+                counts[person.key] = counts.get(person.key, 0) + 1
+        counts.pop(person_key, None)
+        return counts
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from datetime import date
+
+from app.projects.records import parse_date
+
+
+def _float_or_none(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def current_workflow_stage(workflow_status):
+    """First workflow step that is not finished, else the last step."""
+    for step in workflow_status or []:
+        if step.get("state") not in ("Complete", "Legacy"):
+            return step
+    return (workflow_status or [None])[-1]
+
+
+@dataclass(frozen=True, slots=True)
+class SampleRecord:
+    """Immutable, typed view of a sample's hot scalar fields.
+
+    Built once whenever a sample is indexed so listings, sorting and filtering
+    read parsed values (dates, coordinates, project links) instead of walking
+    the nested raw dict on every request. The nested payload stays on the raw
+    sample and is only touched when a sample is formatted in full.
+    """
+
+    id: int
+    sample_code: str
+    nickname: str
+    collected_on: date
+    collected_by: tuple
+    status: str
+    storage_location: str
+    igsn: str
+    project_links: tuple
+    metadata_flags: tuple
+    is_flagged_for_review: bool
+    site_name: str
+    station: str
+    stratum: str
+    depth_cm: float
+    lat: float
+    lon: float
+    datum: str
+    workflow_stage: str
+    workflow_count: int
+    attachment_count: int
+
+    @classmethod
+    def from_dict(cls, data):
+        site = data.get("site") or {}
+        gps = site.get("gps") or {}
+        attachments = data.get("attachments") or {}
+        stage = current_workflow_stage(data.get("workflow_status")) or {}
+        return cls(
+            id=data.get("id"),
+            sample_code=data["sample_code"],
+            nickname=data.get("nickname") or "",
+            collected_on=parse_date(data.get("collected_on")),
+            collected_by=tuple(name for name in data.get("collected_by") or [] if isinstance(name, str)),
+            status=(data.get("status") or "active").strip(),
+            storage_location=data.get("storage_location") or "",
+            igsn=data.get("igsn") or "",
+            project_links=tuple(
+                (link["project_id"], link.get("role"))
+                for link in data.get("associated_projects") or []
+                if link.get("project_id") is not None
+            ),
+            metadata_flags=tuple(data.get("metadata_flags") or ()),
+            is_flagged_for_review=bool(data.get("is_flagged_for_review")),
+            site_name=site.get("site_name") or "",
+            station=site.get("station") or "",
+            stratum=site.get("stratum") or "",
+            depth_cm=_float_or_none(site.get("depth_cm")),
+            lat=_float_or_none(gps.get("lat")),
+            lon=_float_or_none(gps.get("lon")),
+            datum=gps.get("datum") or "",
+            workflow_stage=stage.get("name") or "",
+            workflow_count=len(data.get("workflow_status") or []),
+            attachment_count=sum(
+                len(attachments.get(key) or []) for key in ("images", "notes", "instrument_logs")
+            ),
+        )
+
+    @property
+    def name(self):
+        return self.nickname or self.sample_code
+
+    @property
+    def project_ids(self):
+        return tuple(project_id for project_id, _ in self.project_links)
+
+    @property
+    def primary_project_id(self):
+        return self.project_links[0][0] if self.project_links else None
+
+    @property
+    def collected_on_display(self):
+        return self.collected_on.strftime("%Y-%m-%d") if self.collected_on else "Unknown"
+
+    @property
+    def has_gps(self):
+        return self.lat is not None and self.lon is not None
@@ -1,12 +1,31 @@
-from copy import deepcopy
+import sqlite3
+from collections import ChainMap, OrderedDict
 from datetime import date, timedelta
+from functools import lru_cache, partial
+from threading import Lock
 
-from flask import render_template, abort
+from flask import render_template, abort, jsonify, redirect, request, url_for
 
 from app.samples import bp
-from app.projects.routes import projects as project_catalog
-
-
+from app.samples.aggregates import AggregateTable, CatalogAggregates
+from app.samples.cache import FormattedSampleCache
+from app.samples.columnar import ColumnarSampleStore
+from app.samples.grainsize import GrainSizeIndex
+from app.samples.hierarchy import SubsampleTree
+from app.samples.index import DictSampleStore, SampleIndex
+from app.samples.lazy import LazyMapping
+from app.samples.ordering import SampleOrderings
+from app.samples.people import ROLE_COLLECTOR, ROLE_PI, PeopleGraph
+from app.samples.ingest import WORKBOOKS, BatchWriteError, IngestError, ingest_rows, reader_for
+from app.samples.records import SampleRecord
+from app.samples.spatial import MAX_ZOOM, SampleSpatialIndex
+from app.geochem.correlation import MIN_SUGGESTED_SC, CorrelationIndex
+from app.geochem.network import CONFIDENCE_LEVELS, CorrelationNetwork
+from app.projects.routes import project_registry, user_has_project_access
+from app.storage import get_repository
+
+
+# Seed data; sample_index holds the live catalog
 samples = [
     {
         "id": 1,
@@ -401,8 +420,20 @@ samples = [
 ]
 
 
-project_lookup = {project["id"]: project for project in project_catalog}
-sample_lookup = {sample["sample_code"]: sample for sample in samples}
+project_lookup = project_registry.by_id
+sample_index = SampleIndex(samples)
+sample_lookup = sample_index
+correlation_index = CorrelationIndex(sample_index)
+correlation_network = CorrelationNetwork(sample_index)
+spatial_index = SampleSpatialIndex(sample_index)
+grain_size_index = GrainSizeIndex(sample_index)
+people_graph = PeopleGraph(sample_index, project_registry)
+subsample_tree = SubsampleTree(sample_index)
+SUBSAMPLE_TREE_DEPTH = 4
+SAMPLE_STORES = {
+    "memory": DictSampleStore,
+    "columnar": ColumnarSampleStore,
+}
 ALLOWED_PEOPLE = (
     "Carlos Cortes Garcia",
     "Matthew Kenner",
@@ -420,6 +451,7 @@ def _slugify_name(name):
     return cleaned or "unknown"
 
 
+@lru_cache(maxsize=1024)
 def _default_email(name):
     slug = _slugify_name(name)
     return f"{slug}@culs.example.edu"
@@ -448,60 +480,30 @@ def _relative_time(date_value):
 def _build_linked_people(sample):
     people = []
     seen = set()
-    for idx, name in enumerate(sample.get("collected_by") or []):
-        if not name or not isinstance(name, str):
-            continue
-        if name not in ALLOWED_PEOPLE_SET:
-            continue
-        key = name.lower()
-        if key in seen:
+    sample_code = sample.get("sample_code")
+    for link in people_graph.links_for_sample(sample_code):
+        person = link.person
+        if person.key in seen or person.full_name not in ALLOWED_PEOPLE_SET:
             continue
-        seen.add(key)
+        seen.add(person.key)
+        if link.role == ROLE_COLLECTOR:
+            person_id, institution = f"{sample_code or 'sample'}-collector-{link.position}", "Lab Field Team"
+        elif link.role == ROLE_PI:
+            person_id, institution = f"{link.project_id}-pi", "[LAB NAME]"
+        else:
+            project = project_lookup.get(link.project_id)
+            person_id = f"{link.project_id}-collab-{len(people)}"
+            institution = (project.type if project else None) or "Partner Lab"
         people.append(
             {
-                "id": f"{sample.get('sample_code', 'sample')}-collector-{idx}",
-                "full_name": name,
-                "role": "Field Collector",
-                "institution": "Lab Field Team",
-                "email": _default_email(name),
-                "profile_url": "#",
+                "id": person_id,
+                "full_name": person.full_name,
+                "role": link.role,
+                "institution": institution,
+                "email": _default_email(person.full_name),
+                "profile_url": url_for("main.person_dashboard", slug=person.slug),
             }
         )
-    for link in sample.get("associated_projects") or []:
-        project = project_lookup.get(link.get("project_id"))
-        if not project:
-            continue
-        owner = project.get("owner")
-        if owner and owner in ALLOWED_PEOPLE_SET:
-            key = owner.lower()
-            if key not in seen:
-                seen.add(key)
-                people.append(
-                    {
-                        "id": f"{project['id']}-pi",
-                        "full_name": owner,
-                        "role": "Project PI",
-                        "institution": "[LAB NAME]",
-                        "email": _default_email(owner),
-                        "profile_url": "#",
-                    }
-                )
-        collaborators = project.get("collaborators", "")
-        for collaborator in [c.strip() for c in collaborators.split(",") if c.strip()]:
-            key = collaborator.lower()
-            if key in seen or collaborator not in ALLOWED_PEOPLE_SET:
-                continue
-            seen.add(key)
-            people.append(
-                {
-                    "id": f"{project['id']}-collab-{len(people)}",
-                    "full_name": collaborator,
-                    "role": "Collaborator",
-                    "institution": project.get("type", "Partner Lab"),
-                    "email": _default_email(collaborator),
-                    "profile_url": "#",
-                }
-            )
     if not people:
         fallback = ALLOWED_PEOPLE[0]
         people.append(
@@ -517,6 +519,9 @@ def _build_linked_people(sample):
     return people
 
 
+SUGGESTED_CORRELATIONS = 5
+
+
 def _build_related_samples(sample):
     related = []
     for target in sample.get("correlation", {}).get("targets", []):
@@ -529,9 +534,97 @@ def _build_related_samples(sample):
                 "project": target.get("project"),
             }
         )
+
+    # Samples reached only through other curated links (the rest of the tephra family).
+    sample_code = sample.get("sample_code")
+    listed = {entry["sample_code"] for entry in related} | {sample_code}
+    for code in correlation_network.family(sample_code):
+        if code in listed:
+            continue
+        record = sample_index.record(code)
+        project = project_lookup.get(record.primary_project_id) if record else None
+        related.append(
+            {
+                "sample_code": code,
+                "name": (record.nickname if record else None) or code,
+                "relationship": f"Tephra family via {correlation_network.linkage(sample_code, code)} links",
+                "project": project.title if project else None,
+                "family": True,
+            }
+        )
+        listed.add(code)
+
+    # Suggested targets from glass composition similarity, after the curated ones.
+    for match in correlation_index.similar_to(sample_code, k=SUGGESTED_CORRELATIONS, track=True):
+        record = sample_index.record(match["sample_code"])
+        if match["similarity_coefficient"] < MIN_SUGGESTED_SC or record is None or record.sample_code in listed:
+            continue
+        project = project_lookup.get(record.primary_project_id)
+        related.append(
+            {
+                "sample_code": record.sample_code,
+                "name": record.nickname or record.sample_code,
+                "relationship": (
+                    f"Suggested · glass SC {match['similarity_coefficient']:.2f} ({match['confidence']})"
+                ),
+                "project": project.title if project else None,
+                "suggested": True,
+                "match": match,
+            }
+        )
     return related
 
 
+def _build_inventory(sample):
+    """Sieve fractions held by the sample followed by the sub-samples split from it."""
+    sample_code = sample.get("sample_code")
+    storage = sample.get("storage_location")
+    rows = [
+        {
+            "label": fraction["fraction"],
+            "storage_location": f"{storage} · Vial {position}" if storage else "Not tracked",
+            "quantity_g": fraction["remaining_g"],
+            "status": "Available" if fraction["remaining_g"] > 0 else "Depleted",
+        }
+        for position, fraction in enumerate(subsample_tree.fraction_inventory(sample_code), start=1)
+    ]
+    for child, _ in subsample_tree.descendants_of(sample_code, max_depth=1):
+        record = sample_index.record(child)
+        rollup = subsample_tree.rollup(child)
+        rows.append(
+            {
+                "label": child,
+                "sample_code": child if record else None,
+                "storage_location": (record.storage_location if record else None) or "Not tracked",
+                "quantity_g": rollup["subtree_remaining_g"],
+                "status": record.status.capitalize() if record else "Not registered",
+            }
+        )
+    return rows
+
+
+def _build_disbursements(sample):
+    return [
+        {
+            "date": entry.get("date"),
+            "recipient": entry.get("recipient"),
+            "institution": entry.get("institution"),
+            "quantity_g": entry.get("quantity_g"),
+            "fraction": entry.get("fraction"),
+            "purpose": entry.get("purpose"),
+        }
+        for entry in sample.get("disbursements") or []
+    ]
+
+
+def _build_subsample_tree(sample):
+    """The split tree the sample belongs to, from its root down ``SUBSAMPLE_TREE_DEPTH`` levels below the sample."""
+    sample_code = sample.get("sample_code")
+    root = subsample_tree.root_of(sample_code)
+    depth = len(subsample_tree.ancestors_of(sample_code)) + SUBSAMPLE_TREE_DEPTH
+    return subsample_tree.subtree(root, max_depth=depth)
+
+
 def _build_qc_flags(flags):
     mapping = {
         "complete": ("Metadata complete", "low"),
@@ -593,16 +686,52 @@ def _build_physical_sections(sample):
             }
         )
 
+    grain_size = sample.get("grain_size") or {}
+    fractions = {fraction["fraction"]: fraction for fraction in grain_size.get("fractions") or []}
     for entry in processing.get("mass_entries", []) or []:
+        fraction = fractions.get(entry.get("fraction")) or {}
+        notes = [f"Wet mass {entry.get('wet_mass_g', '—')} g"]
+        if fraction.get("percent") is not None:
+            notes.append(f"{fraction['percent']} wt%")
+        if fraction.get("deviation_percent") is not None:
+            notes.append(f"{fraction['deviation_percent']:+} % vs target {fraction['expected_percent']} %")
         sections["particle_size"].append(
             {
                 "parameter": entry.get("fraction", "Fraction"),
                 "value": entry.get("dry_mass_g", entry.get("wet_mass_g", "—")),
                 "unit": "g",
                 "method": "Sieving workflow",
-                "notes": f"Wet mass {entry.get('wet_mass_g', '—')} g",
+                "notes": " · ".join(notes),
+            }
+        )
+    if grain_size:
+        recovery = grain_size.get("mass_recovery_percent")
+        sections["particle_size"].append(
+            {
+                "parameter": "Total dry mass",
+                "value": grain_size["total_dry_mass_g"],
+                "unit": "g",
+                "method": "Sum of fractions",
+                "notes": f"Recovery {recovery}%" if recovery is not None else "Initial mass not recorded",
             }
         )
+    folk_ward = grain_size.get("folk_ward")
+    if folk_ward:
+        for parameter, value, unit, notes in (
+            ("Graphic mean (Mz)", folk_ward["mean_phi"], "φ", f"{folk_ward['mean_um']} µm"),
+            ("Sorting (σI)", folk_ward["sorting_phi"], "φ", folk_ward["sorting_class"]),
+            ("Skewness (SkI)", folk_ward["skewness"], "", folk_ward["skewness_class"]),
+            ("Kurtosis (KG)", folk_ward["kurtosis"], "", ""),
+        ):
+            sections["particle_size"].append(
+                {
+                    "parameter": parameter,
+                    "value": value,
+                    "unit": unit,
+                    "method": "Folk & Ward (1957)",
+                    "notes": notes,
+                }
+            )
 
     if physical.get("clast_size"):
         sections["max_clast"].append(
@@ -724,6 +853,45 @@ def _detect_geochem_section(label):
     return "geochronology"
 
 
+SUBSCRIPT_DIGITS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+
+
+def _reduction_rows(summary):
+    """Table rows for one stored reduction: mean oxide wt% plus the analytical total."""
+    rows = []
+    for oxide, stats in summary["oxides"].items():
+        label = oxide.translate(SUBSCRIPT_DIGITS)
+        if oxide == "FeO" and not summary.get("fe3_ratio"):
+            label += "*"
+        spread = stats["sd"] if summary["spots"] > 1 else stats["sigma"]
+        rows.append(
+            {
+                "element": label,
+                "value": f"{stats['mean']:.2f}",
+                "unit": "wt%",
+                "uncertainty": f"±{spread:.2f}",
+                "qc_flag": "pass",
+                "notes": "",
+            }
+        )
+    if rows:
+        rows[0]["notes"] = (
+            f"Mean of {summary['spots']} spot(s) from {summary['processed_file']}, normalized anhydrous"
+        )
+    rejected = summary.get("rejected_spots", 0)
+    rows.append(
+        {
+            "element": "Analytical total",
+            "value": f"{summary['analytical_total']:.2f}",
+            "unit": "wt%",
+            "uncertainty": "—",
+            "qc_flag": "fail" if rejected else "pass",
+            "notes": f"{rejected} spot(s) outside the accepted total range" if rejected else "All spots within range",
+        }
+    )
+    return rows
+
+
 def _build_geochem_sections(sample):
     section_keys = [
         "micro_xrf",
@@ -739,40 +907,38 @@ def _build_geochem_sections(sample):
     processed = geochem.get("processed_uploads", []) or []
     raw_uploads = geochem.get("raw_uploads", []) or []
 
+    reductions = geochem.get("reductions") or {}
+    reduced = {summary["processed_file"]: raw for raw, summary in reductions.items()}
     for filename in processed:
-        key = _detect_geochem_section(filename)
-        base_value = 70 + sample.get("id", 0)
-        sections[key].append(
-            {
-                "element": "SiO₂",
-                "value": f"{base_value + 0.8:.2f}",
-                "unit": "wt%",
-                "uncertainty": "±0.45",
-                "qc_flag": "pass",
-                "notes": f"Derived from {filename}",
-            }
-        )
-        sections[key].append(
+        if filename in reduced:
+            raw = reduced[filename]
+            sections[_detect_geochem_section(raw)].extend(_reduction_rows(reductions[raw]))
+            continue
+        sections[_detect_geochem_section(filename)].append(
             {
-                "element": "FeO*",
-                "value": f"{7 + sample.get('id', 0) * 0.4:.2f}",
-                "unit": "wt%",
-                "uncertainty": "±0.15",
-                "qc_flag": "pass",
-                "notes": "QC verified against internal standards",
+                "element": "Dataset",
+                "value": "Processed upload",
+                "unit": "—",
+                "uncertainty": "—",
+                "qc_flag": "review",
+                "notes": f"{filename} was reduced outside the pipeline; values not imported",
             }
         )
 
+    reduction_errors = geochem.get("reduction_errors") or {}
     for filename in raw_uploads:
+        if filename in reductions:
+            continue
         key = _detect_geochem_section(filename)
+        failed = filename in reduction_errors
         sections[key].append(
             {
                 "element": "Dataset",
-                "value": "Pending reduction",
+                "value": "Reduction failed" if failed else "Pending reduction",
                 "unit": "—",
                 "uncertainty": "—",
-                "qc_flag": "pending",
-                "notes": f"Awaiting processing of {filename}",
+                "qc_flag": "fail" if failed else "pending",
+                "notes": reduction_errors[filename] if failed else f"Awaiting processing of {filename}",
             }
         )
 
@@ -918,8 +1084,8 @@ def _build_audit_log(sample):
             }
         )
 
-    processing = sample.get("processing") or {}
-    if processing.get("derived_metrics"):
+    recovery = (sample.get("grain_size") or {}).get("mass_recovery_percent")
+    if recovery is not None:
         processed_on = collected_on + timedelta(days=5) if collected_on else date.today()
         events.append(
             {
@@ -928,7 +1094,7 @@ def _build_audit_log(sample):
                 "user": {"full_name": primary},
                 "event_type": "analysis",
                 "summary": "Processing mass recovery calculated.",
-                "details": f"Mass recovery {processing['derived_metrics']['mass_recovery_percent']}%.",
+                "details": f"Mass recovery {recovery}%.",
             }
         )
 
@@ -976,71 +1142,494 @@ def _build_audit_log(sample):
 
 
 def format_sample(sample):
-    formatted = deepcopy(sample)
-    collected_on = formatted.get("collected_on")
-    if isinstance(collected_on, date):
-        formatted["collected_on_display"] = collected_on.strftime("%Y-%m-%d")
-    else:
-        formatted["collected_on_display"] = "Unknown"
-
-    formatted["projects"] = [
+    """Build the read-only view of a sample shared by the sample page, sections and API.
+
+    Identity, location and project fields are filled in up front, layered
+    over the raw sample without copying it; nested payloads are read from
+    the raw sample as stored. The derived fields in ``SAMPLE_FIELDS``
+    (analysis sections, people, related samples, attachments, audit log,
+    ...) are built the first time they are read and memoized, so a caller
+    pays only for what it touches.
+    """
+    collected_on = sample.get("collected_on")
+    site = sample.get("site") or {}
+    projects = [
         {
             "project": project_lookup.get(link.get("project_id")),
             "role": link.get("role"),
         }
-        for link in formatted.get("associated_projects", [])
+        for link in sample.get("associated_projects", [])
         if link.get("project_id") in project_lookup
     ]
-    formatted["project"] = formatted["projects"][0]["project"] if formatted["projects"] else None
-
-    formatted["name"] = formatted.get("nickname") or formatted.get("sample_code", "Sample")
-    site = formatted.get("site") or {}
+    formatted = {
+        "collected_on_display": collected_on.strftime("%Y-%m-%d") if isinstance(collected_on, date) else "Unknown",
+        "projects": projects,
+        "project": projects[0]["project"] if projects else None,
+        "name": sample.get("nickname") or sample.get("sample_code", "Sample"),
+        "location": {},
+        "description": sample.get("description") or site.get("depositional_context") or "No description provided",
+        "igsn": sample.get("igsn") or f"IGSN:{sample.get('sample_code', '').replace('-', '')}",
+        "storage_location": sample.get("storage_location") or "Not tracked",
+        "status": sample.get("status", "active"),
+        "placeholder_image_url": sample.get("placeholder_image_url") or "https://placehold.co/200x150?text=Sample",
+        "edit_url": sample.get("edit_url") or "#",
+        "add_analysis_url": sample.get("add_analysis_url") or "#",
+    }
     location_parts = [site.get("site_name"), site.get("station"), site.get("stratum")]
     if any(location_parts):
         formatted["location"] = {"summary": ", ".join(part for part in location_parts if part)}
         formatted["location_name"] = formatted["location"]["summary"]
-    else:
-        formatted["location"] = {}
-    formatted["description"] = formatted.get("description") or site.get("depositional_context") or "No description provided"
-    formatted["igsn"] = formatted.get("igsn") or f"IGSN:{formatted.get('sample_code', '').replace('-', '')}"
-    formatted["storage_location"] = formatted.get("storage_location") or "Not tracked"
-    formatted["status"] = formatted.get("status", "active")
-
-    formatted["analyses"] = _build_analyses(formatted)
-    formatted["linked_people"] = _build_linked_people(formatted)
-    formatted["related_samples"] = _build_related_samples(formatted)
-    formatted["qc_flags"] = _build_qc_flags(formatted.get("metadata_flags"))
-    formatted["physical_analysis"] = _build_physical_sections(formatted)
-    formatted["physical_microanalysis"] = _build_micro_sections(formatted)
-    formatted["geochemical_analysis"] = _build_geochem_sections(formatted)
-
-    attachments_list = _build_attachments(formatted)
-    formatted["attachments_list"] = attachments_list
-    formatted["attachment_summary"] = _summarize_attachments(attachments_list)
-
-    formatted["audit_log"] = _build_audit_log(formatted)
-    formatted["placeholder_image_url"] = formatted.get("placeholder_image_url") or "https://placehold.co/200x150?text=Sample"
-    formatted["edit_url"] = formatted.get("edit_url") or "#"
-    formatted["add_analysis_url"] = formatted.get("add_analysis_url") or "#"
-
-    parent_sample = formatted.get("parent_sample")
+
+    parent_sample = sample.get("parent_sample")
     if isinstance(parent_sample, str):
         formatted["parent_sample"] = {"sample_code": parent_sample}
-    formatted["is_flagged_for_review"] = formatted.get("is_flagged_for_review") or any(
+
+    return LazyMapping(ChainMap(formatted, sample), SAMPLE_FIELDS)
+
+
+def _physical_analysis_field(formatted):
+    # reads the raw ``physical_analysis`` entries this field replaces
+    return _build_physical_sections(dict(formatted.source, grain_size=formatted["grain_size"]))
+
+
+def _audit_log_field(formatted):
+    # the audit log records the review flag as stored, not the QC-derived one
+    return _build_audit_log(dict(formatted.source, grain_size=formatted["grain_size"]))
+
+
+def _is_flagged_field(formatted):
+    return bool(formatted.source.get("is_flagged_for_review")) or any(
         flag.get("severity") == "high" for flag in formatted["qc_flags"]
     )
 
-    return formatted
+
+# derived field -> builder(formatted), run on first access
+SAMPLE_FIELDS = {
+    "grain_size": lambda formatted: grain_size_index.for_sample(formatted.get("sample_code")),
+    "analyses": _build_analyses,
+    "linked_people": _build_linked_people,
+    "related_samples": _build_related_samples,
+    "qc_flags": lambda formatted: _build_qc_flags(formatted.get("metadata_flags")),
+    "is_flagged_for_review": _is_flagged_field,
+    "physical_analysis": _physical_analysis_field,
+    "physical_microanalysis": _build_micro_sections,
+    "geochemical_analysis": _build_geochem_sections,
+    "attachments_list": _build_attachments,
+    "attachment_summary": lambda formatted: _summarize_attachments(formatted["attachments_list"]),
+    "audit_log": _audit_log_field,
+    "inventory": _build_inventory,
+    "disbursements": lambda formatted: _build_disbursements(formatted.source),
+    "subsample_tree": _build_subsample_tree,
+    "mass_rollup": lambda formatted: subsample_tree.rollup(formatted.get("sample_code")),
+}
+
+# sample page tab -> partial template
+SAMPLE_SECTIONS = {
+    "physical": "samples/sections/physical.html",
+    "microanalysis": "samples/sections/microanalysis.html",
+    "geochem": "samples/sections/geochem.html",
+    "files": "samples/sections/files.html",
+    "history": "samples/sections/history.html",
+}
+
+
+def summarize_sample(sample):
+    """Build the lightweight projection shown on the sample list page.
+
+    Unlike ``format_sample`` this skips the analysis sections, audit log and
+    attachment records, reads scalar fields from the parsed ``SampleRecord``
+    and shares the workflow list with the raw sample instead of copying it.
+    """
+    record = sample_index.record(sample["sample_code"]) or SampleRecord.from_dict(sample)
+    projects = [
+        {"project": project_lookup[project_id], "role": role}
+        for project_id, role in record.project_links
+        if project_id in project_lookup
+    ]
+    return {
+        "sample_code": record.sample_code,
+        "name": record.name,
+        "nickname": record.nickname,
+        "status": record.status,
+        "collected_on": record.collected_on,
+        "collected_on_display": record.collected_on_display,
+        "collected_by": record.collected_by,
+        "site": {"site_name": record.site_name, "station": record.station, "stratum": record.stratum},
+        "projects": projects,
+        "project": projects[0]["project"] if projects else None,
+        "metadata_flags": record.metadata_flags,
+        "is_flagged_for_review": record.is_flagged_for_review,
+        "workflow_status": sample.get("workflow_status") or [],
+        "workflow_stage": record.workflow_stage,
+        "attachment_summary": {"total": record.attachment_count},
+    }
+
+
+
+GEOCHEM_METHOD_LABELS = {
+    "micro_xrf": "Micro-XRF",
+    "whole_xrf": "XRF (Whole Rock)",
+    "icp_ms": "ICP-MS",
+    "epma": "EPMA",
+    "la_icp_ms": "LA-ICP-MS",
+    "sims": "SIMS",
+    "geochronology": "Other",
+}
+IMAGING_METHOD_LABELS = {
+    "optical": "Optical microscopy",
+    "electron": "EPMA/SEM",
+    "tomography": "Micro-CT",
+}
+
+
+def _admin_row(sample):
+    """Columns shared by every admin aggregate row of a sample."""
+    record = sample_index.record(sample["sample_code"]) or SampleRecord.from_dict(sample)
+    project = project_lookup.get(record.primary_project_id)
+    lab_catalog = sample.get("lab_catalog")
+    if not lab_catalog and record.id is not None:
+        lab_catalog = f"LAB-{record.collected_on.year if record.collected_on else '0000'}-{record.id:03d}"
+    return record, project, {
+        "sample_id": record.sample_code,
+        "lab_catalog": lab_catalog or "—",
+        "project_title": project.title if project else "Unassigned",
+    }
+
+
+def _workflow_updated(sample, step_name):
+    for step in sample.get("workflow_status") or []:
+        if step.get("name") == step_name and step.get("updated"):
+            return step["updated"]
+    return "—"
+
+
+def admin_sample_rows(sample):
+    record, project, row = _admin_row(sample)
+    processing = sample.get("processing") or {}
+    physical = sample.get("physical_analysis") or {}
+    geochem = sample.get("geochemistry") or {}
+    row.update(
+        {
+            "short_description": record.nickname or sample.get("description") or "—",
+            "project_owner": project.owner if project else "—",
+            "collection_date": record.collected_on_display,
+            "status": record.status.title(),
+            "has_physical": bool(processing.get("mass_entries") or any(physical.values())),
+            "has_micro": bool((sample.get("imaging") or {}).get("sessions")),
+            "has_geochem": bool(geochem.get("raw_uploads") or geochem.get("processed_uploads")),
+        }
+    )
+    return [row]
+
+
+def admin_geochemical_rows(sample):
+    _, _, base = _admin_row(sample)
+    geochem = sample.get("geochemistry") or {}
+    reductions = geochem.get("reductions") or {}
+    reduction_errors = geochem.get("reduction_errors") or {}
+    updated = _workflow_updated(sample, "Geochemical Analysis")
+    rows = []
+
+    def add(filename, **columns):
+        rows.append(dict(base, analysis_type=GEOCHEM_METHOD_LABELS[_detect_geochem_section(filename)], **columns))
+
+    for filename, summary in reductions.items():
+        add(
+            filename,
+            run_date=summary.get("reduced_on") or updated,
+            analyst="Batch pipeline",
+            elements_analyzed=f"Major oxides ({len(summary.get('oxides') or {})}, {summary.get('spots', 0)} spots)",
+            status="Complete",
+            qc_status="Review" if summary.get("rejected_spots") else "Passed",
+        )
+    reduced = {summary.get("processed_file") for summary in reductions.values()}
+    for filename in geochem.get("processed_uploads") or []:
+        if filename not in reduced:
+            add(filename, run_date=updated, analyst="—", elements_analyzed=filename, status="Complete", qc_status="Review")
+    for filename in geochem.get("raw_uploads") or []:
+        if filename in reductions:
+            continue
+        failed = filename in reduction_errors
+        add(
+            filename,
+            run_date="—",
+            analyst="Batch pipeline",
+            elements_analyzed=filename,
+            status="Failed" if failed else "In Progress",
+            qc_status="Failed" if failed else "Pending",
+        )
+    return rows
+
+
+def admin_microanalysis_rows(sample):
+    _, _, base = _admin_row(sample)
+    rows = []
+    for session in (sample.get("imaging") or {}).get("sessions") or []:
+        instrument = session.get("instrument") or "Imaging session"
+        status = (session.get("status") or "Pending").title()
+        rows.append(
+            dict(
+                base,
+                analysis_type=IMAGING_METHOD_LABELS.get(_categorize_imaging_session(instrument), instrument),
+                run_date=session.get("date") or "—",
+                analyst=session.get("operator") or "—",
+                minerals_analyzed=session.get("targets") or session.get("settings") or "—",
+                points_analyzed=session.get("points_analyzed") or len(session.get("files") or []),
+                status=status,
+                qc_status=session.get("qc_status") or "Pending",
+            )
+        )
+    return rows
+
+
+def admin_physical_rows(sample):
+    record, _, base = _admin_row(sample)
+    processing = sample.get("processing") or {}
+    physical = sample.get("physical_analysis") or {}
+    analyst = record.collected_by[0] if record.collected_by else "Lab Field Team"
+    updated = _workflow_updated(sample, "Physical Analysis")
+    rows = []
+    grain_size = grain_size_index.for_sample(record.sample_code)
+    if grain_size:
+        fractions = grain_size["fractions"]
+        parameters = f"{len(fractions)} fractions ({fractions[0]['fraction']} … {fractions[-1]['fraction']})"
+        if grain_size.get("folk_ward"):
+            parameters += f", Mz {grain_size['folk_ward']['mean_phi']} φ"
+        rows.append(
+            dict(
+                base,
+                analysis_type="Sieve Analysis",
+                run_date=_workflow_updated(sample, "Processing"),
+                analyst=analyst,
+                parameters=parameters,
+                total_mass=f"{grain_size['total_dry_mass_g']} g",
+                status="Complete" if grain_size["complete"] else "In Progress",
+            )
+        )
+    if physical.get("density_g_cc"):
+        rows.append(
+            dict(
+                base,
+                analysis_type="Bulk Density",
+                run_date=updated,
+                analyst=analyst,
+                parameters=f"{physical['density_g_cc']} g/cm³ (pycnometer)",
+                total_mass="—",
+                status="Complete",
+            )
+        )
+    if physical.get("componentry_summary"):
+        rows.append(
+            dict(
+                base,
+                analysis_type="Componentry",
+                run_date=updated,
+                analyst=analyst,
+                parameters=physical["componentry_summary"],
+                total_mass="—",
+                status="Complete",
+            )
+        )
+    return rows
+
+
+formatted_sample_cache = FormattedSampleCache(
+    format_sample,
+    maxsize=2048,
+    dependencies=(
+        correlation_index.version_of,
+        correlation_network.version_of,
+        subsample_tree.version_of,
+    ),
+)
+sample_summary_cache = FormattedSampleCache(summarize_sample, maxsize=20000)
+project_registry.subscribe(formatted_sample_cache.invalidate_project)
+project_registry.subscribe(sample_summary_cache.invalidate_project)
+admin_aggregates = CatalogAggregates(
+    sample_index,
+    project_registry,
+    {
+        "samples": AggregateTable(
+            admin_sample_rows, count_fields=("status", "has_physical", "has_micro", "has_geochem")
+        ),
+        "geochemical": AggregateTable(admin_geochemical_rows, count_fields=("status", "qc_status")),
+        "microanalysis": AggregateTable(
+            admin_microanalysis_rows, count_fields=("qc_status",), sum_fields=("points_analyzed",)
+        ),
+        "physical": AggregateTable(admin_physical_rows, count_fields=("status", "analysis_type")),
+    },
+)
+
+SAMPLE_PAGE_SIZES = (10, 20, 50, 100)
+SAMPLE_SORT_KEYS = {
+    "collected_on": lambda record: (record.collected_on or date.min, record.sample_code),
+    "sample_code": lambda record: record.sample_code,
+    "project": lambda record: (
+        project_lookup[record.primary_project_id].title.lower()
+        if record.primary_project_id in project_lookup else "",
+        record.sample_code,
+    ),
+    "workflow": lambda record: (record.workflow_stage.lower(), record.sample_code),
+}
+
+
+sample_orderings = SampleOrderings(sample_index, SAMPLE_SORT_KEYS, project_registry)
+
+
+def _matches_sample_query(record, query):
+    haystack = (
+        record.sample_code,
+        record.nickname,
+        record.igsn,
+        record.site_name,
+        record.station,
+    ) + record.collected_by
+    return any(query in value.lower() for value in haystack if value)
+
+
+def get_formatted_sample(sample):
+    """Return the cached formatted view of a raw sample (read-only)."""
+    return formatted_sample_cache.get(sample)
+
+
+def get_sample_summary(sample):
+    """Return the cached list-page projection of a raw sample (read-only)."""
+    return sample_summary_cache.get(sample)
+
+
+def _invalidate_sample_caches(sample_code):
+    formatted_sample_cache.invalidate_sample(sample_code)
+    sample_summary_cache.invalidate_sample(sample_code)
+
+
+def load_sample(sample):
+    """Index a raw sample without persisting it (used when syncing from storage)."""
+    sample_index.insert(sample)
+    _invalidate_sample_caches(sample["sample_code"])
+    return sample
+
+
+def unload_sample(sample_code):
+    """Drop a sample from the in-memory catalog without touching storage."""
+    sample = sample_index.delete(sample_code)
+    if sample is not None:
+        _invalidate_sample_caches(sample_code)
+    return sample
+
+
+def add_sample(sample):
+    """Register a new raw sample, persist it and index it."""
+    repository = get_repository()
+    if repository is not None:
+        repository.save_sample(sample)
+    return load_sample(sample)
+
+
+def update_sample(sample_code, **changes):
+    """Replace a raw sample with an updated copy, persist it and re-index it."""
+    current = sample_index.get(sample_code)
+    if current is None:
+        return None
+    sample = dict(current, **changes)
+    repository = get_repository()
+    if repository is not None:
+        repository.save_sample(sample)
+        if sample["sample_code"] != sample_code:
+            repository.delete_sample(sample_code)
+    if sample["sample_code"] != sample_code:
+        unload_sample(sample_code)
+    return load_sample(sample)
+
+
+def delete_sample(sample_code):
+    """Remove a raw sample from storage, the catalog and its indexes."""
+    repository = get_repository()
+    if repository is not None:
+        repository.delete_sample(sample_code)
+    return unload_sample(sample_code)
+
+
+@bp.record_once
+def _configure_sample_store(state):
+    backend = state.app.config.get("SAMPLE_STORE_BACKEND", "memory")
+    if backend not in SAMPLE_STORES:
+        raise ValueError(f"Unknown SAMPLE_STORE_BACKEND {backend!r}; expected one of {sorted(SAMPLE_STORES)}")
+    if not isinstance(sample_index.store, SAMPLE_STORES[backend]):
+        sample_index.use_store(SAMPLE_STORES[backend]())
 
 
 @bp.route("/")
 def sample_list():
-    formatted_samples = [format_sample(sample) for sample in samples]
-    workflow_entry_count = sum(len(sample["workflow_status"]) for sample in samples)
+    project_id = request.args.get("project", type=int)
+    status = request.args.get("status", "").strip()
+    storage_location = request.args.get("storage", "").strip()
+    flag = request.args.get("flag", "").strip()
+    search_query = request.args.get("q", "").strip().lower()
+
+    sort_by = request.args.get("sort_by", "collected_on")
+    if sort_by not in SAMPLE_SORT_KEYS:
+        sort_by = "collected_on"
+    sort_order = "asc" if request.args.get("sort_order") == "asc" else "desc"
+
+    per_page = request.args.get("per_page", 20, type=int)
+    if per_page not in SAMPLE_PAGE_SIZES:
+        per_page = 20
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    # Pages come from the maintained sort orders; the summary projection is
+    # built (or fetched from cache) for the rows on the requested page only.
+    candidates = None
+    if project_id is not None or status or storage_location or flag:
+        candidates = set(
+            sample_index.iter_codes(project_id=project_id, status=status, storage_location=storage_location, flag=flag)
+        )
+    predicate = None
+    if search_query:
+        def predicate(code):
+            return _matches_sample_query(sample_index.record(code), search_query)
+    select = partial(sample_orderings.select, sort_by, sort_order == "desc", candidates=candidates, predicate=predicate)
+
+    start_idx = (page - 1) * per_page
+    page_codes, total_samples, workflow_entry_count = select(start_idx, per_page)
+    total_pages = (total_samples + per_page - 1) // per_page
+    if page > total_pages and total_pages > 0:
+        page = total_pages
+        start_idx = (page - 1) * per_page
+        page_codes, total_samples, workflow_entry_count = select(start_idx, per_page)
+    page_samples = [get_sample_summary(sample_index.get(code)) for code in page_codes]
+
+    pagination = {
+        "page": page,
+        "per_page": per_page,
+        "total_samples": total_samples,
+        "total_pages": total_pages,
+        "has_prev": page > 1,
+        "has_next": page < total_pages,
+        "prev_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if page < total_pages else None,
+    }
+    # Only active filters are kept so they can be passed straight to url_for.
+    filters = {
+        key: value
+        for key, value in {
+            "project": project_id,
+            "status": status,
+            "storage": storage_location,
+            "flag": flag,
+            "q": search_query,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "per_page": per_page,
+        }.items()
+        if value
+    }
+
     return render_template(
         "samples/sample_list.html",
         title="Samples",
-        samples=formatted_samples,
+        samples=page_samples,
+        pagination=pagination,
+        filters=filters,
         workflow_entry_count=workflow_entry_count,
     )
 
@@ -1050,34 +1639,301 @@ def sample_register():
     return render_template(
         "samples/sample_register.html",
         title="Register Sample",
-        projects=project_catalog,
+        projects=project_registry.all(),
     )
 
 
-@bp.route("/bulk-upload")
+# Progress of recent uploads, keyed by the client-supplied upload id and
+# capped so abandoned uploads do not accumulate.
+MAX_TRACKED_UPLOADS = 100
+upload_progress = OrderedDict()
+_upload_progress_lock = Lock()
+
+
+def _track_upload(upload_id, report):
+    with _upload_progress_lock:
+        upload_progress[upload_id] = report.as_dict()
+        upload_progress.move_to_end(upload_id)
+        while len(upload_progress) > MAX_TRACKED_UPLOADS:
+            upload_progress.popitem(last=False)
+
+
+def write_sample_batch(batch):
+    """Persist a batch of raw samples in one transaction, then index them."""
+    repository = get_repository()
+    if repository is not None:
+        try:
+            repository.save_samples(batch)
+        except sqlite3.Error as exc:
+            raise BatchWriteError(str(exc)) from exc
+    for sample in batch:
+        load_sample(sample)
+
+
+@bp.route("/bulk-upload", methods=["GET", "POST"])
 def sample_bulk_upload():
     workbook_templates = [
-        {"name": "Collection Workbook", "filename": "collection_template.xlsx"},
-        {"name": "Processing & Preparation", "filename": "processing_template.xlsx"},
-        {"name": "Physical Analysis", "filename": "physical_analysis_template.xlsx"},
-        {"name": "Geochemical Analysis", "filename": "geochem_template.xlsx"},
-        {"name": "Correlation Workbook", "filename": "correlation_template.xlsx"},
+        {"kind": kind, "name": workbook["name"], "filename": workbook["filename"]}
+        for kind, workbook in WORKBOOKS.items()
     ]
+    report = None
+    upload_error = None
+    if request.method == "POST":
+        kind = request.form.get("kind", "")
+        upload = request.files.get("file")
+        upload_id = request.form.get("upload_id") or None
+        if kind not in WORKBOOKS:
+            upload_error = "Choose which workbook you are uploading."
+        elif upload is None or not upload.filename:
+            upload_error = "Choose a CSV or XLSX file to upload."
+        else:
+            progress = (lambda current: _track_upload(upload_id, current)) if upload_id else None
+            try:
+                rows = reader_for(upload.filename)(upload.stream)
+                report = ingest_rows(
+                    rows,
+                    kind,
+                    lookup=sample_index.get,
+                    lookup_igsn=sample_index.get_by_igsn,
+                    write_batch=write_sample_batch,
+                    filename=upload.filename,
+                    progress=progress,
+                ).as_dict()
+            except IngestError as exc:
+                upload_error = str(exc)
     return render_template(
         "samples/sample_bulk_upload.html",
         title="Bulk Upload Samples",
         templates=workbook_templates,
+        report=report,
+        upload_error=upload_error,
     )
 
 
-@bp.route("/<sample_code>")
-def sample_detail(sample_code):
-    sample = next((s for s in samples if s["sample_code"] == sample_code), None)
+@bp.route("/bulk-upload/progress/<upload_id>")
+def sample_bulk_upload_progress(upload_id):
+    with _upload_progress_lock:
+        progress = upload_progress.get(upload_id)
+    if progress is None:
+        abort(404)
+    return jsonify(progress)
+
+
+@bp.route("/<sample_code>/correlations")
+def sample_correlations(sample_code):
+    if sample_code not in sample_index:
+        abort(404)
+    k = min(max(request.args.get("k", SUGGESTED_CORRELATIONS, type=int), 1), 100)
+    return jsonify(
+        {
+            "sample_code": sample_code,
+            "indexed": sample_code in correlation_index.compositions,
+            "matches": correlation_index.similar_to(sample_code, k=k),
+        }
+    )
+
+
+def _readable_project(project_id):
+    """The project, or 404 when it is unknown or the current user may not read it."""
+    project = project_lookup.get(project_id)
+    if project is None or not user_has_project_access(project):
+        abort(404)
+    return project
+
+
+def sample_visibility():
+    """``(readable project ids, visible(code))`` for the current user.
+
+    A sample is visible if it is unlinked or in at least one readable
+    project. ``visible`` is None when every project is readable.
+    """
+    projects = project_registry.all()
+    project_ids = frozenset(project.id for project in projects if user_has_project_access(project))
+    if len(project_ids) == len(projects):
+        return project_ids, None
+
+    def visible(sample_code):
+        record = sample_index.record(sample_code)
+        return record is not None and (not record.project_ids or not project_ids.isdisjoint(record.project_ids))
+
+    return project_ids, visible
+
+
+def _min_confidence():
+    level = (request.args.get("min_confidence") or "Low").capitalize()
+    return level if level in CONFIDENCE_LEVELS else "Low"
+
+
+@bp.route("/<sample_code>/family")
+def sample_correlation_family(sample_code):
+    """Every sample transitively correlated with this one through curated links."""
+    project_ids, visible = sample_visibility()
+    if sample_code not in sample_index or (visible is not None and not visible(sample_code)):
+        abort(404)
+    min_confidence = _min_confidence()
+    codes = correlation_network.family(sample_code, min_confidence)
+    neighbours = correlation_network.neighbours(sample_code, min_confidence)
+    if visible is not None:
+        codes = [code for code in codes if visible(code)]
+        neighbours = {code: level for code, level in neighbours.items() if visible(code)}
+    summary = correlation_network.summarize(codes, min_confidence)
+    summary["project_ids"] = [project_id for project_id in summary["project_ids"] if project_id in project_ids]
+    summary["neighbours"] = neighbours
+    return jsonify(dict(summary, sample_code=sample_code, min_confidence=min_confidence))
+
+
+@bp.route("/<sample_code>/tree")
+def sample_subsample_tree(sample_code):
+    """Split tree around a sample: ancestors, rollups and a depth-limited subtree."""
+    if sample_code not in sample_index:
+        abort(404)
+    depth = request.args.get("depth", type=int)
+    return jsonify(
+        {
+            "sample_code": sample_code,
+            "ancestors": subsample_tree.ancestors_of(sample_code),
+            "rollup": subsample_tree.rollup(sample_code),
+            "tree": subsample_tree.subtree(sample_code, max_depth=depth if depth is None else max(depth, 0)),
+        }
+    )
+
+
+@bp.route("/correlation-families/<int:project_id>")
+def project_correlation_families(project_id):
+    _readable_project(project_id)
+    project_ids, visible = sample_visibility()
+    min_confidence = _min_confidence()
+    families = correlation_network.project_families(project_id, min_confidence, visible=visible)
+    for summary in families:
+        summary["project_ids"] = [pid for pid in summary["project_ids"] if pid in project_ids]
+    return jsonify({"project_id": project_id, "min_confidence": min_confidence, "families": families})
+
+
+@bp.route("/correlations/batch", methods=["POST"])
+def sample_correlations_batch():
+    """Score a set of new glass compositions against the whole library.
+
+    Expects ``{"k": 5, "samples": {"<id>": {"SiO2": 74.1, ...}, ...}}``.
+    """
+    body = request.get_json(silent=True)
+    compositions = body.get("samples") if isinstance(body, dict) else None
+    if not isinstance(compositions, dict):
+        return jsonify({"error": "expected a JSON object with a \"samples\" object"}), 400
+    try:
+        k = min(max(int(body.get("k") or SUGGESTED_CORRELATIONS), 1), 100)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+    try:
+        matches = correlation_index.score_batch(compositions, k=k)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"k": k, "matches": matches})
+
+
+MAX_MAP_RESULTS = 2000
+
+
+def _map_point(sample_code, distance_km=None):
+    record = sample_index.record(sample_code)
+    point = {
+        "sample_code": sample_code,
+        "name": record.name,
+        "site_name": record.site_name,
+        "lat": record.lat,
+        "lon": record.lon,
+        "url": url_for("samples.sample_detail", sample_code=sample_code),
+    }
+    if distance_km is not None:
+        point["distance_km"] = round(distance_km, 3)
+    return point
+
+
+def _map_origin():
+    """Query origin from ``lat``/``lon`` or from the site of ``sample``."""
+    sample_code = request.args.get("sample")
+    if sample_code:
+        record = sample_index.record(sample_code)
+        _, visible = sample_visibility()
+        if record is None or not record.has_gps or (visible is not None and not visible(sample_code)):
+            abort(404)
+        return record.lat, record.lon
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        abort(400)
+    return lat, lon
+
+
+def _map_bbox():
+    try:
+        west, south, east, north = (float(value) for value in request.args.get("bbox", "").split(","))
+    except ValueError:
+        abort(400)
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        abort(400)
+    return south, west, north, east
+
+
+@bp.route("/map/near")
+def sample_map_near():
+    lat, lon = _map_origin()
+    radius_km = min(max(request.args.get("radius_km", 5.0, type=float), 0.0), 20000.0)
+    matches = spatial_index.within_radius(lat, lon, radius_km)
+    _, visible = sample_visibility()
+    if visible is not None:
+        matches = [match for match in matches if visible(match[1])]
+    return jsonify(
+        {
+            "total": len(matches),
+            "samples": [_map_point(code, distance) for distance, code in matches[:MAX_MAP_RESULTS]],
+        }
+    )
+
+
+@bp.route("/map/nearest")
+def sample_map_nearest():
+    lat, lon = _map_origin()
+    k = min(max(request.args.get("k", 10, type=int), 1), 100)
+    exclude = request.args.get("sample")
+    _, visible = sample_visibility()
+    matches = [
+        match for match in spatial_index.nearest(lat, lon, k + bool(exclude), visible=visible) if match[1] != exclude
+    ]
+    return jsonify({"samples": [_map_point(code, distance) for distance, code in matches[:k]]})
+
+
+@bp.route("/map/within")
+def sample_map_within():
+    codes = spatial_index.within_bbox(*_map_bbox())
+    _, visible = sample_visibility()
+    if visible is not None:
+        codes = [code for code in codes if visible(code)]
+    return jsonify({"total": len(codes), "samples": [_map_point(code) for code in codes[:MAX_MAP_RESULTS]]})
+
+
+@bp.route("/map/clusters")
+def sample_map_clusters():
+    zoom = min(max(request.args.get("zoom", 2, type=int), 0), MAX_ZOOM)
+    _, visible = sample_visibility()
+    return jsonify({"zoom": zoom, "clusters": spatial_index.clusters_in_view(zoom, *_map_bbox(), visible=visible)})
+
+
+@bp.route("/particle-size/<int:project_id>")
+def project_particle_size(project_id):
+    _readable_project(project_id)
+    return jsonify({"project_id": project_id, "samples": grain_size_index.for_project(project_id)})
+
+
+@bp.route("/igsn/<path:igsn>")
+def sample_by_igsn(igsn):
+    sample = sample_index.get_by_igsn(igsn)
     if not sample:
         abort(404)
-    formatted = format_sample(sample)
-    metadata_flags = formatted.get("metadata_flags", [])
-    # Check user permissions from session
+    return redirect(url_for("samples.sample_detail", sample_code=sample["sample_code"]))
+
+
+def _sample_permissions(formatted):
+    """Session permissions combined with the sample's status restrictions."""
     from flask import session
     user = session.get('user', {})
     user_can_edit = user.get('can_edit_sample', False)
@@ -1085,17 +1941,41 @@ def sample_detail(sample_code):
     user_can_create_subsample = user.get('can_create_subsample', False)
     user_can_flag = user.get('can_flag_samples', False)
 
-    # Combine user permissions with sample status restrictions
-    can_edit_sample = user_can_edit and (formatted["status"].lower() != "archived" and "legacy" not in metadata_flags)
-    can_manage_analysis = user_can_manage_analysis and (formatted["status"].lower() != "archived")
-    can_create_subsample = user_can_create_subsample and (formatted["status"].lower() == "active")
-    can_flag_samples = user_can_flag
+    status = formatted["status"].lower()
+    return {
+        "can_edit_sample": user_can_edit and (status != "archived" and "legacy" not in formatted.get("metadata_flags", [])),
+        "can_manage_analysis": user_can_manage_analysis and status != "archived",
+        "can_create_subsample": user_can_create_subsample and status == "active",
+        "can_flag_samples": user_can_flag,
+    }
+
+
+@bp.route("/<sample_code>")
+def sample_detail(sample_code):
+    """Page shell; the analysis, files and history tabs load from ``sample_section``."""
+    sample = sample_index.get(sample_code)
+    if not sample:
+        abort(404)
+    formatted = get_formatted_sample(sample)
     return render_template(
         "samples/sample_view.html",
         title=f"{formatted['sample_code']} · Sample View",
         sample=formatted,
-        can_edit_sample=can_edit_sample,
-        can_manage_analysis=can_manage_analysis,
-        can_create_subsample=can_create_subsample,
-        can_flag_samples=can_flag_samples,
+        **_sample_permissions(formatted),
+    )
+
+
+@bp.route("/<sample_code>/sections/<section>")
+def sample_section(sample_code, section):
+    """Render one tab of the sample page; only the fields it reads are built."""
+    sample = sample_index.get(sample_code)
+    if not sample or section not in SAMPLE_SECTIONS:
+        abort(404)
+    formatted = get_formatted_sample(sample)
+    return render_template(
+        SAMPLE_SECTIONS[section],
+        sample=formatted,
+        section=section,
+        sample_version=formatted_sample_cache.etag(sample),
+        **_sample_permissions(formatted),
     )
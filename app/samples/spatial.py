@@ -0,0 +1,287 @@
+import math
+from collections import defaultdict
+from threading import RLock
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+CELL_DEGREES = 0.05  # ~5.5 km of latitude; roughly a precision-5 geohash cell
+CELL_COLUMNS = round(360 / CELL_DEGREES)
+MAX_MERCATOR_LAT = 85.05112878
+MAX_ZOOM = 16
+CLUSTER_PIXELS = 64  # cluster cell edge at every zoom (256 px tiles -> 4 x 4 cells per tile)
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points (WGS84 sphere)."""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def cluster_cell(lat, lon, zoom):
+    """Web-mercator cluster cell ``(x, y)`` containing a point at ``zoom``."""
+    n = 2 ** zoom * 256 // CLUSTER_PIXELS
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+class SampleSpatialIndex:
+    """Grid index over sample GPS positions with pre-aggregated map clusters.
+
+    Positions are bucketed into ``CELL_DEGREES`` lat/lon cells, so radius,
+    bounding-box and nearest-neighbour queries only look at the handful of
+    cells that can contain an answer. For map views every zoom level keeps
+    running counts and coordinate sums per web-mercator cluster cell, which
+    are updated on every catalog change; a cluster request only reads the
+    cells in the viewport. Coordinates are treated as WGS84 whatever datum a
+    sample records.
+    """
+
+    def __init__(self, sample_index):
+        self.sample_index = sample_index
+        self.points = {}
+        self.cells = defaultdict(dict)
+        self.clusters = [defaultdict(lambda: [0, 0.0, 0.0]) for _ in range(MAX_ZOOM + 1)]
+        self._arrays = None
+        self._lock = RLock()
+        for sample_code in sample_index.codes():
+            self.refresh(sample_code)
+        sample_index.subscribe(self.refresh)
+
+    def __len__(self):
+        return len(self.points)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+    def refresh(self, sample_code):
+        record = self.sample_index.record(sample_code)
+        point = (record.lat, record.lon) if record is not None and record.has_gps else None
+        with self._lock:
+            current = self.points.get(sample_code)
+            if current == point:
+                return
+            self._arrays = None
+            if current is not None:
+                self._remove(sample_code, current)
+            if point is not None:
+                self._add(sample_code, point)
+
+    def _add(self, sample_code, point):
+        lat, lon = point
+        self.points[sample_code] = point
+        self.cells[self._cell(lat, lon)][sample_code] = None
+        for zoom, level in enumerate(self.clusters):
+            cluster = level[cluster_cell(lat, lon, zoom)]
+            cluster[0] += 1
+            cluster[1] += lat
+            cluster[2] += lon
+
+    def _remove(self, sample_code, point):
+        lat, lon = point
+        del self.points[sample_code]
+        cell = self._cell(lat, lon)
+        self.cells[cell].pop(sample_code, None)
+        if not self.cells[cell]:
+            del self.cells[cell]
+        for zoom, level in enumerate(self.clusters):
+            key = cluster_cell(lat, lon, zoom)
+            cluster = level[key]
+            cluster[0] -= 1
+            cluster[1] -= lat
+            cluster[2] -= lon
+            if cluster[0] <= 0:
+                del level[key]
+
+    # -- queries ----------------------------------------------------------
+
+    def _codes_in_cells(self, south, west, north, east):
+        """Codes in every grid cell overlapping a box that does not cross the antimeridian."""
+        (row_lo, col_lo), (row_hi, col_hi) = self._cell(south, west), self._cell(north, east)
+        span = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+        if span > len(self.cells):
+            cells = (
+                codes for (row, col), codes in self.cells.items()
+                if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+            )
+        else:
+            cells = (
+                self.cells.get((row, col), ())
+                for row in range(row_lo, row_hi + 1)
+                for col in range(col_lo, col_hi + 1)
+            )
+        return [code for codes in cells for code in codes]
+
+    def _box_codes(self, south, west, north, east):
+        if west <= east:
+            return self._codes_in_cells(south, west, north, east)
+        return self._codes_in_cells(south, west, north, 180.0) + self._codes_in_cells(south, -180.0, north, east)
+
+    def _with_distances(self, codes, lat, lon):
+        if not codes:
+            return np.empty(0), []
+        points = np.array([self.points[code] for code in codes])
+        return haversine_km(lat, lon, points[:, 0], points[:, 1]), codes
+
+    def within_bbox(self, south, west, north, east):
+        """Codes of samples inside a lat/lon box (``west > east`` crosses the antimeridian)."""
+        crosses = west > east
+        with self._lock:
+            return [
+                code for code in self._box_codes(south, west, north, east)
+                if south <= self.points[code][0] <= north
+                and ((west <= self.points[code][1] or self.points[code][1] <= east) if crosses
+                     else west <= self.points[code][1] <= east)
+            ]
+
+    def within_radius(self, lat, lon, radius_km):
+        """``[(distance_km, code), ...]`` within ``radius_km`` of a point, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+        if north >= 90.0 or south <= -90.0 or radius_km / KM_PER_DEGREE >= 180.0 * cos_lat:
+            west, east = -180.0, 180.0
+        else:
+            dlon = dlat / cos_lat
+            west, east = (lon - dlon + 180.0) % 360.0 - 180.0, (lon + dlon + 180.0) % 360.0 - 180.0
+        with self._lock:
+            distances, codes = self._with_distances(self._box_codes(south, west, north, east), lat, lon)
+        order = np.argsort(distances, kind="stable")
+        return [(float(distances[i]), codes[i]) for i in order if distances[i] <= radius_km]
+
+    def nearest(self, lat, lon, k=10, visible=None):
+        """The ``k`` samples closest to a point as ``[(distance_km, code), ...]``.
+
+        Searches outward ring by ring of grid cells and stops once no cell
+        further out can beat the current k-th distance. Once the rings would
+        cover more cells than are occupied (sparse regions), it scans every
+        point in one vectorized pass instead. ``visible(code)`` skips the
+        samples it rejects.
+        """
+        with self._lock:
+            if not self.points:
+                return []
+            k = min(k, len(self.points))
+            row, col = self._cell(lat, lon)
+            codes, chunks = [], []
+            ring = 0
+            while (2 * ring + 1) ** 2 <= len(self.cells):
+                found = self._ring_codes(row, col, ring)
+                if visible is not None:
+                    found = [code for code in found if visible(code)]
+                if found:
+                    chunks.append(self._with_distances(found, lat, lon)[0])
+                    codes.extend(found)
+                if len(codes) >= k:
+                    distances = np.concatenate(chunks)
+                    kth = float(np.partition(distances, k - 1)[k - 1])
+                    reach_lat = min(abs(lat) + (ring + 1) * CELL_DEGREES, 90.0)
+                    if kth <= ring * CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(reach_lat)):
+                        break
+                ring += 1
+            else:
+                codes, lats, lons = self._all_points()
+                if visible is not None:
+                    keep = np.fromiter(map(visible, codes), dtype=bool, count=len(codes))
+                    codes, lats, lons = [code for code, kept in zip(codes, keep) if kept], lats[keep], lons[keep]
+                distances = haversine_km(lat, lon, lats, lons)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(float(distances[i]), codes[i]) for i in order]
+
+    def _all_points(self):
+        """``(codes, lats, lons)`` for every point, cached until the next change."""
+        if self._arrays is None:
+            codes = list(self.points)
+            coordinates = np.array([self.points[code] for code in codes]).reshape(-1, 2)
+            self._arrays = codes, coordinates[:, 0], coordinates[:, 1]
+        return self._arrays
+
+    def _ring_codes(self, row, col, ring):
+        if ring == 0:
+            return list(self.cells.get((row, col), ()))
+        cells = [(row + dr, col + dc) for dr in (-ring, ring) for dc in range(-ring, ring + 1)]
+        cells += [(row + dr, col + dc) for dr in range(-ring + 1, ring) for dc in (-ring, ring)]
+        wrap = CELL_COLUMNS // 2
+        return [
+            code
+            for cell_row, cell_col in cells
+            for code in self.cells.get((cell_row, (cell_col + wrap) % CELL_COLUMNS - wrap), ())
+        ]
+
+    def clusters_in_view(self, zoom, south, west, north, east, visible=None):
+        """Marker clusters for a map viewport at ``zoom`` from the maintained aggregates.
+
+        Each cluster is ``{"count", "lat", "lon"}`` (the members' centroid)
+        plus ``sample_code`` for single-sample clusters. With ``visible(code)``
+        the clusters are aggregated instead from the accepted points of the
+        cluster cells in view.
+        """
+        zoom = min(max(int(zoom), 0), MAX_ZOOM)
+        level = self.clusters[zoom]
+        x_lo, y_lo = cluster_cell(north, west, zoom)
+        x_hi, y_hi = cluster_cell(south, east, zoom)
+        n = 2 ** zoom * 256 // CLUSTER_PIXELS
+        if west <= east:
+            x_ranges = [(x_lo, x_hi)]
+        elif x_lo <= x_hi:  # crosses the antimeridian and wraps into its own columns
+            x_ranges = [(0, n - 1)]
+        else:
+            x_ranges = [(x_lo, n - 1), (0, x_hi)]
+        results = []
+        with self._lock:
+            if visible is not None:
+                level = self._visible_clusters(zoom, x_ranges, y_lo, y_hi, visible)
+            span = sum(x_end - x_start + 1 for x_start, x_end in x_ranges) * (y_hi - y_lo + 1)
+            if span > len(level):
+                keys = [
+                    key for key in level
+                    if y_lo <= key[1] <= y_hi and any(start <= key[0] <= end for start, end in x_ranges)
+                ]
+            else:
+                keys = [
+                    (x, y)
+                    for start, end in x_ranges
+                    for x in range(start, end + 1)
+                    for y in range(y_lo, y_hi + 1)
+                    if (x, y) in level
+                ]
+            for key in keys:
+                count, lat_sum, lon_sum = level[key]
+                cluster = {"count": count, "lat": round(lat_sum / count, 6), "lon": round(lon_sum / count, 6)}
+                if count == 1:
+                    cluster["sample_code"] = self._code_at(lat_sum, lon_sum, visible)
+                results.append(cluster)
+        return results
+
+    def _visible_clusters(self, zoom, x_ranges, y_lo, y_hi, visible):
+        """Cluster aggregates like ``self.clusters[zoom]`` over the visible points of a cell range."""
+        n = 2 ** zoom * 256 // CLUSTER_PIXELS
+        north = 90.0 if y_lo == 0 else math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y_lo / n))))
+        south = -90.0 if y_hi == n - 1 else math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y_hi + 1) / n))))
+        level = defaultdict(lambda: [0, 0.0, 0.0])
+        for x_start, x_end in x_ranges:
+            west, east = x_start / n * 360.0 - 180.0, (x_end + 1) / n * 360.0 - 180.0
+            for code in self.within_bbox(south, west, north, east):
+                if visible(code):
+                    lat, lon = self.points[code]
+                    cluster = level[cluster_cell(lat, lon, zoom)]
+                    cluster[0] += 1
+                    cluster[1] += lat
+                    cluster[2] += lon
+        return dict(level)
+
+    def _code_at(self, lat, lon, visible=None):
+        for code in self.cells.get(self._cell(lat, lon), ()):
+            if visible is not None and not visible(code):
+                continue
+            point = self.points[code]
+            if abs(point[0] - lat) < 1e-6 and abs(point[1] - lon) < 1e-6:
+                return code
+        return None
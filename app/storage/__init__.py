@@ -0,0 +1,98 @@
+import os
+from threading import Lock
+
+from app.storage.repository import SqliteCatalogRepository
+from app.storage.sqlite import SqliteEngine
+
+
+_repository = None
+
+
+def get_repository():
+    """Return the configured persistent repository, or None for in-memory mode."""
+    return _repository
+
+
+class CatalogSync:
+    """Keeps this worker's in-memory catalog in step with the repository.
+
+    The project registry and sample index remain the read path for every
+    request; they are loaded from SQLite at startup and then refreshed from
+    the change log before each request, which picks up writes made by other
+    gunicorn workers with a single indexed query.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.last_seq = 0
+        self._lock = Lock()
+
+    def load_all(self):
+        from app.projects.routes import project_registry
+        from app.samples.routes import load_sample, sample_index, unload_sample
+
+        with self._lock:
+            self.last_seq = self.repository.latest_change()
+            stored_projects = {project.id: project for project in self.repository.list_projects()}
+            for project_id in [p.id for p in project_registry.all() if p.id not in stored_projects]:
+                project_registry.remove(project_id)
+            for project in stored_projects.values():
+                project_registry.add(project)
+
+            stored_samples = {sample["sample_code"]: sample for sample in self.repository.list_samples()}
+            for code in [code for code in sample_index.codes() if code not in stored_samples]:
+                unload_sample(code)
+            for sample in stored_samples.values():
+                load_sample(sample)
+
+    def poll(self):
+        from app.projects.routes import project_registry
+        from app.samples.routes import load_sample, unload_sample
+
+        latest, changes = self.repository.changes_since(self.last_seq)
+        if not changes:
+            return
+        with self._lock:
+            for entity, key in changes:
+                if entity == "project":
+                    project = self.repository.get_project(int(key))
+                    if project is None:
+                        project_registry.remove(int(key))
+                    else:
+                        project_registry.add(project)
+                elif entity == "sample":
+                    sample = self.repository.get_sample(key)
+                    if sample is None:
+                        unload_sample(key)
+                    else:
+                        load_sample(sample)
+            self.last_seq = max(self.last_seq, latest)
+
+
+def init_app(app):
+    """Attach the persistent catalog selected by ``STORAGE_BACKEND``."""
+    global _repository
+
+    backend = app.config.get("STORAGE_BACKEND", "memory")
+    if backend == "memory":
+        return
+    if backend != "sqlite":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'memory' or 'sqlite'")
+
+    path = app.config.get("DATABASE_PATH") or os.path.join(app.instance_path, "catalog.sqlite3")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    engine = SqliteEngine(path, pool_size=app.config.get("DATABASE_POOL_SIZE", 4))
+    engine.create_schema()
+    repository = SqliteCatalogRepository(engine)
+
+    if repository.is_empty():
+        from app.projects.routes import projects as seed_projects
+        from app.samples.routes import samples as seed_samples
+
+        repository.seed(seed_projects, seed_samples)
+
+    _repository = repository
+    catalog_sync = CatalogSync(repository)
+    catalog_sync.load_all()
+    app.before_request(catalog_sync.poll)
+    app.extensions["catalog_repository"] = repository
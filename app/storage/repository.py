@@ -0,0 +1,225 @@
+from app.projects.records import ProjectRecord
+from app.projects.registry import member_key
+from app.storage.sqlite import from_json, to_json
+
+
+class SqliteCatalogRepository:
+    """Reads and persists projects and samples in the SQLite catalog.
+
+    Samples are stored as a JSON payload plus the columns we filter on, with
+    project links, analyses and attachments broken out into their own indexed
+    tables. Every write appends to ``change_log`` so other workers can pick up
+    the change with ``changes_since``.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    # -- projects ---------------------------------------------------------
+
+    def list_projects(self):
+        with self.engine.connection() as conn:
+            rows = conn.execute("SELECT * FROM projects ORDER BY id").fetchall()
+        return [self._project_from_row(row) for row in rows]
+
+    def get_project(self, project_id):
+        with self.engine.connection() as conn:
+            row = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+        return self._project_from_row(row) if row else None
+
+    def project_ids_for_member(self, name):
+        with self.engine.connection() as conn:
+            rows = conn.execute(
+                "SELECT project_id FROM project_members WHERE member_key = ?", (member_key(name),)
+            ).fetchall()
+        return [row["project_id"] for row in rows]
+
+    def save_project(self, project, conn=None):
+        if not isinstance(project, ProjectRecord):
+            project = ProjectRecord.from_dict(project)
+        if conn is None:
+            with self.engine.transaction() as conn:
+                return self.save_project(project, conn)
+
+        data = project.to_dict()
+        conn.execute(
+            """
+            INSERT INTO projects (id, slug, title, owner, status, type, is_private,
+                                  last_updated, priority, collaborators, tags, description)
+            VALUES (:id, :slug, :title, :owner, :status, :type, :is_private,
+                    :last_updated, :priority, :collaborators, :tags, :description)
+            ON CONFLICT (id) DO UPDATE SET
+                slug = excluded.slug, title = excluded.title, owner = excluded.owner,
+                status = excluded.status, type = excluded.type, is_private = excluded.is_private,
+                last_updated = excluded.last_updated, priority = excluded.priority,
+                collaborators = excluded.collaborators, tags = excluded.tags,
+                description = excluded.description, version = projects.version + 1
+            """,
+            dict(data, is_private=int(project.is_private), tags=to_json(data["tags"])),
+        )
+        conn.execute("DELETE FROM project_members WHERE project_id = ?", (project.id,))
+        members = [(project.id, member_key(project.owner), "owner")] + [
+            (project.id, member_key(name), "collaborator") for name in project.collaborator_names
+        ]
+        conn.executemany(
+            "INSERT OR IGNORE INTO project_members (project_id, member_key, role) VALUES (?, ?, ?)",
+            [member for member in members if member[1]],
+        )
+        self._log_change(conn, "project", project.id)
+        return project
+
+    def delete_project(self, project_id):
+        with self.engine.transaction() as conn:
+            conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+            self._log_change(conn, "project", project_id)
+
+    @staticmethod
+    def _project_from_row(row):
+        data = dict(row)
+        data["tags"] = from_json(data["tags"])
+        return ProjectRecord.from_dict(data)
+
+    # -- samples ----------------------------------------------------------
+
+    def list_samples(self):
+        with self.engine.connection() as conn:
+            rows = conn.execute("SELECT payload FROM samples ORDER BY rowid").fetchall()
+        return [from_json(row["payload"]) for row in rows]
+
+    def get_sample(self, sample_code):
+        with self.engine.connection() as conn:
+            row = conn.execute("SELECT payload FROM samples WHERE sample_code = ?", (sample_code,)).fetchone()
+        return from_json(row["payload"]) if row else None
+
+    def sample_codes_for_project(self, project_id):
+        with self.engine.connection() as conn:
+            rows = conn.execute(
+                "SELECT sample_code FROM sample_projects WHERE project_id = ? ORDER BY sample_code",
+                (project_id,),
+            ).fetchall()
+        return [row["sample_code"] for row in rows]
+
+    def save_sample(self, sample, conn=None):
+        if conn is None:
+            with self.engine.transaction() as conn:
+                return self.save_sample(sample, conn)
+
+        code = sample["sample_code"]
+        gps = (sample.get("site") or {}).get("gps") or {}
+        collected_on = sample.get("collected_on")
+        conn.execute(
+            """
+            INSERT INTO samples (sample_code, id, igsn, status, storage_location,
+                                 collected_on, lat, lon, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (sample_code) DO UPDATE SET
+                id = excluded.id, igsn = excluded.igsn, status = excluded.status,
+                storage_location = excluded.storage_location, collected_on = excluded.collected_on,
+                lat = excluded.lat, lon = excluded.lon, payload = excluded.payload,
+                version = samples.version + 1
+            """,
+            (
+                code,
+                sample.get("id"),
+                sample.get("igsn") or None,
+                sample.get("status") or "active",
+                sample.get("storage_location"),
+                collected_on.isoformat() if hasattr(collected_on, "isoformat") else collected_on,
+                gps.get("lat"),
+                gps.get("lon"),
+                to_json(sample),
+            ),
+        )
+        for table in ("sample_projects", "analyses", "attachments"):
+            conn.execute(f"DELETE FROM {table} WHERE sample_code = ?", (code,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO sample_projects (sample_code, project_id, role, position) VALUES (?, ?, ?, ?)",
+            [
+                (code, link["project_id"], link.get("role"), position)
+                for position, link in enumerate(sample.get("associated_projects") or [])
+                if link.get("project_id") is not None
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO analyses (sample_code, category, filename, status) VALUES (?, ?, ?, ?)",
+            list(self._analysis_rows(sample)),
+        )
+        conn.executemany(
+            "INSERT INTO attachments (sample_code, kind, filename, description) VALUES (?, ?, ?, ?)",
+            list(self._attachment_rows(sample)),
+        )
+        self._log_change(conn, "sample", code)
+        return sample
+
+    def save_samples(self, samples):
+        """Upsert a batch of samples in a single transaction."""
+        with self.engine.transaction() as conn:
+            for sample in samples:
+                self.save_sample(sample, conn)
+        return samples
+
+    def delete_sample(self, sample_code):
+        with self.engine.transaction() as conn:
+            conn.execute("DELETE FROM samples WHERE sample_code = ?", (sample_code,))
+            self._log_change(conn, "sample", sample_code)
+
+    @staticmethod
+    def _analysis_rows(sample):
+        code = sample["sample_code"]
+        geochem = sample.get("geochemistry") or {}
+        for filename in geochem.get("raw_uploads") or []:
+            yield code, "geochemistry", filename, "raw"
+        for filename in geochem.get("processed_uploads") or []:
+            yield code, "geochemistry", filename, "processed"
+        for upload in (sample.get("physical_analysis") or {}).get("uploads") or []:
+            yield code, "physical", upload.get("filename"), upload.get("status") or "Uploaded"
+        for session in (sample.get("imaging") or {}).get("sessions") or []:
+            for filename in session.get("files") or []:
+                yield code, "imaging", filename, session.get("status") or "Uploaded"
+
+    @staticmethod
+    def _attachment_rows(sample):
+        code = sample["sample_code"]
+        attachments = sample.get("attachments") or {}
+        for image in attachments.get("images") or []:
+            yield code, "image", image.get("filename"), image.get("caption")
+        for note in attachments.get("notes") or []:
+            yield code, "note", None, note
+        for log in attachments.get("instrument_logs") or []:
+            yield code, "log", log.get("instrument"), log.get("detail")
+
+    # -- bookkeeping ------------------------------------------------------
+
+    def is_empty(self):
+        with self.engine.connection() as conn:
+            row = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM projects) + (SELECT COUNT(*) FROM samples) AS total"
+            ).fetchone()
+        return row["total"] == 0
+
+    def seed(self, projects, samples):
+        with self.engine.transaction() as conn:
+            for project in projects:
+                self.save_project(project, conn)
+            for sample in samples:
+                self.save_sample(sample, conn)
+
+    def latest_change(self):
+        with self.engine.connection() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM change_log").fetchone()
+        return row["seq"]
+
+    def changes_since(self, seq):
+        """Return ``(latest seq, [(entity, key), ...])`` for writes after ``seq``."""
+        with self.engine.connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, entity, entity_key FROM change_log WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        if not rows:
+            return seq, []
+        changed = dict.fromkeys((row["entity"], row["entity_key"]) for row in rows)
+        return rows[-1]["seq"], list(changed)
+
+    @staticmethod
+    def _log_change(conn, entity, key):
+        conn.execute("INSERT INTO change_log (entity, entity_key) VALUES (?, ?)", (entity, str(key)))
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+from queue import Empty, LifoQueue
+from threading import Lock
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    is_private INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    priority TEXT NOT NULL DEFAULT '',
+    collaborators TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '[]',
+    description TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_projects_last_updated ON projects (last_updated);
+CREATE INDEX IF NOT EXISTS idx_projects_owner ON projects (owner);
+
+CREATE TABLE IF NOT EXISTS project_members (
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    member_key TEXT NOT NULL,
+    role TEXT NOT NULL,
+    PRIMARY KEY (project_id, member_key)
+);
+CREATE INDEX IF NOT EXISTS idx_project_members_member ON project_members (member_key);
+
+CREATE TABLE IF NOT EXISTS samples (
+    sample_code TEXT PRIMARY KEY,
+    id INTEGER,
+    igsn TEXT,
+    status TEXT NOT NULL DEFAULT 'active',
+    storage_location TEXT,
+    collected_on TEXT,
+    lat REAL,
+    lon REAL,
+    payload TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_samples_igsn ON samples (igsn) WHERE igsn IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_samples_status ON samples (status);
+CREATE INDEX IF NOT EXISTS idx_samples_storage ON samples (storage_location);
+CREATE INDEX IF NOT EXISTS idx_samples_collected_on ON samples (collected_on);
+
+CREATE TABLE IF NOT EXISTS sample_projects (
+    sample_code TEXT NOT NULL REFERENCES samples (sample_code) ON DELETE CASCADE,
+    project_id INTEGER NOT NULL,
+    role TEXT,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (sample_code, project_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sample_projects_project ON sample_projects (project_id);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sample_code TEXT NOT NULL REFERENCES samples (sample_code) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_sample ON analyses (sample_code);
+CREATE INDEX IF NOT EXISTS idx_analyses_category_status ON analyses (category, status);
+
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sample_code TEXT NOT NULL REFERENCES samples (sample_code) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    filename TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attachments_sample ON attachments (sample_code);
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity TEXT NOT NULL,
+    entity_key TEXT NOT NULL
+);
+"""
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after REAL NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    last_error TEXT,
+    UNIQUE (kind, job_key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_run_after ON jobs (state, run_after);
+"""
+
+
+def to_json(value):
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def from_json(text):
+    return json.loads(text, object_hook=_json_hook)
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _json_hook(value):
+    if "__date__" in value and len(value) == 1:
+        return date.fromisoformat(value["__date__"])
+    return value
+
+
+class SqliteEngine:
+    """Per-process pool of SQLite connections to a WAL-mode database.
+
+    WAL lets readers in every gunicorn worker proceed while a single writer
+    commits. Connections are checked out for one unit of work at a time and
+    returned to a LIFO queue so the warmest connection (with its statement
+    cache) is reused first. The pool is discarded after a fork so children
+    never share a parent's sqlite handles.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=5.0, statement_cache_size=128):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        self._pool = LifoQueue()
+        self._pid = os.getpid()
+        self._lock = Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+            isolation_level=None,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _reset_after_fork(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = LifoQueue()
+                self._pid = os.getpid()
+
+    @contextmanager
+    def connection(self):
+        self._reset_after_fork()
+        try:
+            conn = self._pool.get_nowait()
+        except Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in an IMMEDIATE transaction so writers queue up front."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def create_schema(self, script=None):
+        with self.connection() as conn:
+            conn.executescript(script or SCHEMA + JOBS_SCHEMA)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                return
@@ -7,6 +7,20 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or "dev"
     WTF_CSRF_ENABLED = True
+    # "memory" keeps raw sample dicts; "columnar" packs them into typed arrays
+    SAMPLE_STORE_BACKEND = os.environ.get("SAMPLE_STORE_BACKEND") or "memory"
+    # "memory" keeps the seed catalog per process; "sqlite" persists it (WAL mode)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND") or "memory"
+    DATABASE_PATH = os.environ.get("DATABASE_PATH")  # defaults to instance/catalog.sqlite3
+    DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE") or 4)
+    UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER")  # defaults to instance/uploads
+    # background reduction processes per web worker; 0 (default) queues jobs without running them
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS") or 0)
+    JOB_DATABASE_PATH = os.environ.get("JOB_DATABASE_PATH")  # jobs table when STORAGE_BACKEND=memory; defaults to instance/jobs.sqlite3
+    # Fe3+/total Fe used to recast FeO* into FeO + Fe2O3 during reduction; 0 reports FeO*
+    GEOCHEM_FE3_RATIO = float(os.environ.get("GEOCHEM_FE3_RATIO") or 0.0)
+    # upper bound on rendered template fragments kept in memory; 0 disables the cache
+    FRAGMENT_CACHE_BYTES = int(os.environ.get("FRAGMENT_CACHE_BYTES", 32 * 1024 * 1024))
     
 class DevelopmentConfig(Config):
     DEBUG = True
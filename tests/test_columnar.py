@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from app.samples.columnar import ColumnarSampleStore
+from app.samples.index import DictSampleStore, SampleIndex
+from app.samples.records import SampleRecord
+
+
+SAMPLES = [
+    {
+        "id": 7,
+        "sample_code": "A-1",
+        "nickname": "Layer A",
+        "collected_on": date(2024, 5, 1),
+        "collected_by": ["Ann Lee", "Bo Chen"],
+        "status": "Active",
+        "igsn": "IGSN:A1",
+        "metadata_flags": ["partial"],
+        "site": {"site_name": "Ridge", "depth_cm": 12.5, "gps": {"lat": 46.2, "lon": -122.2, "datum": "WGS84"}},
+        "workflow_status": [{"name": "Collection", "state": "Complete", "updated": "2024-05-01"}],
+        "associated_projects": [{"project_id": 1, "role": "Primary"}],
+    },
+    {
+        "id": "LAB-2025-001",
+        "sample_code": "B-1",
+        "nickname": None,
+        "collected_on": "2024-05-02",
+        "status": " archived ",
+        "storage_location": None,
+        "is_flagged_for_review": True,
+    },
+    {"id": True, "sample_code": "C-1"},
+    {"id": 1.0, "sample_code": "D-1", "site": {"gps": {"lat": 0.0, "lon": 0.0}}},
+    {"sample_code": "E-1", "collected_by": ["Ann Lee", 3], "metadata_flags": []},
+]
+
+
+def _store(samples):
+    store = ColumnarSampleStore()
+    for sample in samples:
+        store.put(sample, SampleRecord.from_dict(sample))
+    return store
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda sample: sample["sample_code"])
+def test_raw_sample_round_trips_exactly(sample):
+    store = _store(SAMPLES)
+    decoded = store[sample["sample_code"]]
+    assert decoded == sample
+    assert {key: type(value) for key, value in decoded.items()} == {key: type(value) for key, value in sample.items()}
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda sample: sample["sample_code"])
+def test_record_decodes_like_the_parsed_record(sample):
+    store = _store(SAMPLES)
+    store._records.clear()
+    assert store.record(sample["sample_code"]) == SampleRecord.from_dict(sample)
+
+
+def test_writes_replace_cached_records():
+    store = _store(SAMPLES)
+    first = store.record("A-1")
+    updated = dict(SAMPLES[0], nickname="Layer A (revised)", site={})
+    store.put(updated, SampleRecord.from_dict(updated))
+    record = store.record("A-1")
+    assert record is not first
+    assert record.nickname == "Layer A (revised)"
+    assert record.lat is None and record.depth_cm is None
+    assert store.remove("A-1") == updated
+    assert store.record("A-1") is None
+    assert "A-1" not in store
+
+
+def test_index_can_move_to_the_columnar_store():
+    index = SampleIndex(SAMPLES)
+    assert isinstance(index.store, DictSampleStore)
+    index.use_store(ColumnarSampleStore())
+    assert [index.get(sample["sample_code"]) for sample in SAMPLES] == SAMPLES
+    assert index.get_by_igsn("igsn:a1")["sample_code"] == "A-1"
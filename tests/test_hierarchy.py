@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from app.samples.hierarchy import SubsampleTree
+from app.samples.index import SampleIndex
+
+
+CODES = [f"S{i}" for i in range(12)]
+
+
+def _sample(code, parent, quantity_g):
+    return {"sample_code": code, "parent_sample": parent, "quantity_g": quantity_g}
+
+
+def _acyclic(parents):
+    for code in parents:
+        seen = set()
+        while code is not None:
+            if code in seen:
+                return False
+            seen.add(code)
+            code = parents.get(code)
+    return True
+
+
+def _state(tree):
+    return {
+        "parent": dict(tree.parent),
+        "children": {code: children for code, children in tree.children.items() if children},
+        "ancestors": dict(tree.ancestors),
+        "descendants": dict(tree.descendants),
+        "remaining": dict(tree.remaining),
+        "subtree_remaining": {code: pytest.approx(total) for code, total in tree.subtree_remaining.items()},
+        "rejected": dict(tree.rejected),
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_moves_match_a_fresh_build(seed):
+    rng = random.Random(seed)
+    index = SampleIndex()
+    tree = SubsampleTree(index)
+    parents = {}
+    for _ in range(400):
+        code = rng.choice(CODES)
+        if code in parents and rng.random() < 0.1:
+            del parents[code]
+            index.delete(code)
+        else:
+            parents[code] = rng.choice(CODES + [None, None, "MISSING"])
+            index.insert(_sample(code, parents[code], rng.choice([None, 5, 20, 80])))
+        if _acyclic(parents):
+            assert _state(tree) == _state(SubsampleTree(index))
+
+
+def test_cycle_is_held_back_until_it_is_broken():
+    index = SampleIndex([_sample("A", None, 10), _sample("B", "A", 5)])
+    tree = SubsampleTree(index)
+    index.insert(_sample("A", "B", 10))
+    assert tree.rejected == {"A": "B"}
+    assert tree.parent == {"B": "A"}
+    index.insert(_sample("B", None, 5))
+    assert tree.rejected == {}
+    assert tree.parent == {"A": "B"}
+    assert _state(tree) == _state(SubsampleTree(index))
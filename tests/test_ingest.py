@@ -0,0 +1,63 @@
+import io
+
+from app.samples.index import SampleIndex
+from app.samples.ingest import BatchWriteError, ingest_rows, iter_csv_rows
+
+
+def _rows(text):
+    return iter_csv_rows(io.BytesIO(text.encode()))
+
+
+def _ingest(index, text, write_batch=None, batch_size=500):
+    def write(batch):
+        for sample in batch:
+            index.insert(sample)
+
+    return ingest_rows(
+        _rows(text),
+        "collection",
+        lookup=index.get,
+        lookup_igsn=index.get_by_igsn,
+        write_batch=write_batch or write,
+        batch_size=batch_size,
+    )
+
+
+def test_igsn_already_in_the_catalog_is_rejected():
+    index = SampleIndex([{"sample_code": "OLD-1", "igsn": "IGSN:OLD1"}])
+    report = _ingest(index, "sample_code,igsn\nNEW-1, igsn:old1\nOLD-1,IGSN:OLD1\n")
+    assert report.rows_imported == 1
+    assert [(error["row"], error["sample_code"]) for error in report.errors] == [(2, "NEW-1")]
+    assert "NEW-1" not in index
+
+
+def test_igsn_repeated_within_the_upload_is_rejected():
+    index = SampleIndex()
+    report = _ingest(index, "sample_code,igsn\nNEW-1,IGSN:X\nNEW-2,igsn:x\nNEW-1,IGSN:X\n", batch_size=1)
+    assert report.rows_imported == 2
+    assert [(error["row"], error["sample_code"]) for error in report.errors] == [(3, "NEW-2")]
+    assert "NEW-1 on row 2" in report.errors[0]["message"]
+    assert "NEW-2" not in index
+    assert index.get_by_igsn("IGSN:X")["sample_code"] == "NEW-1"
+
+
+def test_rejected_batch_is_reported_per_row():
+    index = SampleIndex()
+    attempts = []
+
+    def write(batch):
+        attempts.append([sample["sample_code"] for sample in batch])
+        if len(attempts) == 1:
+            raise BatchWriteError("UNIQUE constraint failed: samples.igsn")
+        for sample in batch:
+            index.insert(sample)
+
+    report = _ingest(index, "sample_code\nA\nA\nB\nC\n", write_batch=write, batch_size=2)
+    assert attempts == [["A", "B"], ["C"]]
+    assert report.rows_read == 4
+    assert report.rows_imported == 1
+    assert report.batches_written == 1
+    assert report.samples_created == 1
+    assert [(error["row"], error["sample_code"]) for error in report.errors] == [(2, "A"), (3, "A"), (4, "B")]
+    assert report.finished
+    assert "C" in index and "A" not in index
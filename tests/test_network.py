@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from app.geochem.network import CONFIDENCE_LEVELS, CorrelationNetwork
+from app.samples.index import SampleIndex
+
+
+CODES = [f"T{i}" for i in range(12)]
+
+
+def _sample(code, targets):
+    return {
+        "sample_code": code,
+        "correlation": {
+            "targets": [{"sample_code": target, "confidence": confidence} for target, confidence in targets.items()]
+        },
+    }
+
+
+def _families(network):
+    return {level: network.families(level) for level in CONFIDENCE_LEVELS}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_relinks_match_a_fresh_build(seed):
+    rng = random.Random(seed)
+    index = SampleIndex()
+    network = CorrelationNetwork(index)
+    for step in range(200):
+        code = rng.choice(CODES)
+        if code in index and rng.random() < 0.1:
+            index.delete(code)
+        else:
+            targets = {rng.choice(CODES): rng.choice(CONFIDENCE_LEVELS) for _ in range(rng.randint(0, 3))}
+            index.insert(_sample(code, targets))
+        if step % 3 == 0:
+            _families(network)  # build some forests so later relinks update them in place
+        fresh = CorrelationNetwork(index)
+        assert network.links == fresh.links
+        assert _families(network) == _families(fresh)
+
+
+def test_weakened_link_splits_the_family():
+    index = SampleIndex([_sample("A", {"B": "High"}), _sample("B", {"C": "High"}), _sample("C", {})])
+    network = CorrelationNetwork(index)
+    assert network.family("A", "High") == ["A", "B", "C"]
+    before = network.version_of("C")
+    index.insert(_sample("B", {"C": "Low"}))
+    assert network.family("A", "High") == ["A", "B"]
+    assert network.family("A", "Low") == ["A", "B", "C"]
+    assert network.version_of("C") > before
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+
+from app.projects.ordering import SORT_KEYS, ProjectOrderings, decode_cursor, encode_cursor
+from app.projects.registry import ProjectRegistry
+
+
+def _project(project_id, title, priority="Medium", last_updated=None):
+    return {
+        "id": project_id,
+        "title": title,
+        "owner": f"Owner {project_id % 3}",
+        "status": "Active",
+        "priority": priority,
+        "last_updated": last_updated,
+    }
+
+
+def _registry():
+    return ProjectRegistry(
+        _project(i, f"Project {i % 7}", ("High", "Medium", "Low")[i % 3], date(2025, 1, 1 + i % 28) if i % 4 else None)
+        for i in range(1, 24)
+    )
+
+
+def _walk(orderings, sort_by, sort_order, per_page):
+    """Every project id, page by page, following ``after`` cursors as the index page does."""
+    seen, cursor = [], None
+    while True:
+        start = orderings.position_after(sort_by, sort_order, cursor) if cursor else 0
+        page = orderings.slice(sort_by, sort_order, start, per_page)
+        if not page:
+            return seen
+        seen.extend(project.id for project in page)
+        cursor = orderings.cursor_for(sort_by, page[-1])
+
+
+@pytest.mark.parametrize("sort_by", sorted(SORT_KEYS))
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_cursor_pages_follow_the_full_sort(sort_by, sort_order):
+    registry = _registry()
+    orderings = ProjectOrderings(registry)
+    expected = [
+        project.id
+        for project in sorted(
+            registry.all(), key=lambda project: (SORT_KEYS[sort_by](project), project.id), reverse=sort_order == "desc"
+        )
+    ]
+    assert _walk(orderings, sort_by, sort_order, per_page=5) == expected
+
+
+def test_before_cursor_returns_to_the_previous_page():
+    orderings = ProjectOrderings(_registry())
+    first = orderings.slice("title", "asc", 0, 5)
+    after = orderings.position_after("title", "asc", orderings.cursor_for("title", first[-1]))
+    second = orderings.slice("title", "asc", after, 5)
+    start = max(orderings.position_before("title", "asc", orderings.cursor_for("title", second[0])) - 5, 0)
+    assert orderings.slice("title", "asc", start, 5) == first
+
+
+def test_cursor_survives_writes_before_it():
+    registry = _registry()
+    orderings = ProjectOrderings(registry)
+    page = orderings.slice("title", "asc", 0, 5)
+    cursor = orderings.cursor_for("title", page[-1])
+    following = orderings.slice("title", "asc", orderings.position_after("title", "asc", cursor), 5)
+    registry.add(_project(99, "AAA first"))
+    registry.remove(page[0].id)
+    assert orderings.slice("title", "asc", orderings.position_after("title", "asc", cursor), 5) == following
+
+
+@pytest.mark.parametrize(
+    "cursor, sort_by",
+    [
+        ("not a cursor!", "title"),
+        (encode_cursor([1, 2]), "title"),
+        (encode_cursor(["high", 2]), "priority"),
+        (encode_cursor([["nested"], 2]), None),
+        (encode_cursor(["title", True]), "title"),
+        (encode_cursor(["title", "2"]), "title"),
+        (encode_cursor(["title"]), "title"),
+    ],
+)
+def test_malformed_cursors_are_rejected(cursor, sort_by):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, sort_by)
+
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor(("project 1", 4)), "title") == ("project 1", 4)
+    assert decode_cursor(encode_cursor((0, 4)), "priority") == (0, 4)